@@ -14,6 +14,8 @@ class MainWindow(QMainWindow):
         self.showMaximized()
         
         self.reset_camera_on_next_load = True
+        self.current_coords = None
+        self.current_volume = None
 
         # Configurar UI
         self._setup_ui()
@@ -36,6 +38,7 @@ class MainWindow(QMainWindow):
         # Conectar señales
         self.side_panel.archive_page.modelo_cargado.connect(self._on_modelo_cargado)
         self.side_panel.archive_page.carpeta_cambiada.connect(self._on_carpeta_cambiada)
+        self.side_panel.archive_page.resultados_actualizados.connect(self._on_resultados_actualizados)
         
         # Añadir widgets al layout
         main_layout.addWidget(self.side_panel)
@@ -52,23 +55,20 @@ class MainWindow(QMainWindow):
         line_indices = datos_modelo['line_indices']
         desplazamientos = datos_modelo['desplazamientos']
         
-        # Convertir coords a numpy array si no lo es
-        if not isinstance(coords, np.ndarray):
-            coords = np.array(coords)
-        
-        # Convertir índices a listas para OpenGL
-        tri_list = triangle_indices.tolist() if hasattr(triangle_indices, 'tolist') else triangle_indices
-        line_list = line_indices.tolist() if hasattr(line_indices, 'tolist') else line_indices
+        # Los arreglos (del almacén compilado, mapeados en memoria) pasan tal
+        # cual: BufferManager los convierte con np.asarray sin listas intermedias
+        coords = np.asarray(coords)
         
         # Guardar el modo actual antes de inicializar
         current_mode = self.gl_widget.current_mode
         
         # Inicializar widget OpenGL con flag de reset de cámara
         self.gl_widget.initialize_geometry(
-            coords.tolist(), 
-            tri_list, 
-            line_list,
-            reset_camera=self.reset_camera_on_next_load
+            coords,
+            triangle_indices,
+            line_indices,
+            reset_camera=self.reset_camera_on_next_load,
+            groups=datos_modelo.get('grupos')
         )
         
         # Después del primer modelo de la carpeta, no resetear más
@@ -78,4 +78,19 @@ class MainWindow(QMainWindow):
         self.gl_widget.set_mode(current_mode)
         
         # Establecer datos de desplazamientos
-        self.side_panel.displacements_page.set_data(coords, desplazamientos)
\ No newline at end of file
+        self.side_panel.displacements_page.set_data(coords, desplazamientos)
+        self.current_coords = coords
+        self.current_volume = datos_modelo['volumen']
+        
+        # Datos de volumen para cortes y filtros
+        self.side_panel.cortes_page.set_volume(datos_modelo['volumen'])
+        self.side_panel.cortes_page.refresh_parts()
+    
+    def _on_resultados_actualizados(self, datos):
+        """Callback cuando el .RES del modelo cargado agrega pasos (modo vigilancia)"""
+        if self.current_coords is None:
+            return
+        self.side_panel.displacements_page.set_data(self.current_coords, datos['desplazamientos'])
+        self.current_volume = dict(self.current_volume, resultados=datos['resultados'])
+        # Misma malla: el filtro por umbral conserva su topología
+        self.side_panel.cortes_page.set_results(datos['resultados'])
\ No newline at end of file
@@ -5,5 +5,6 @@ from .side_panel import SidePanel
 from .visualizacion import VisualizationPage
 from .desplazamientos import DisplacementsPage
 from .paleta import PaletaPage
+from .cortes import CortesPage
 
-__all__ = ['SidePanel', 'VisualizationPage', 'DisplacementsPage','PaletaPage']
\ No newline at end of file
+__all__ = ['SidePanel', 'VisualizationPage', 'DisplacementsPage','PaletaPage','CortesPage']
\ No newline at end of file
@@ -2,29 +2,433 @@
 Página de selección de archivos con barra de progreso
 """
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QGroupBox, 
-                             QLabel, QPushButton,
-                             QButtonGroup, QFileDialog, QScrollArea,
+                             QLabel, QPushButton, QLineEdit, QCheckBox,
+                             QTreeView, QHeaderView, QFileDialog,
                              QProgressDialog, QApplication)
-from PyQt6.QtCore import Qt, pyqtSignal
-from .styles import (get_page_style, FILE_BUTTON_STYLE, FOLDER_SELECT_BUTTON_STYLE, 
+from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QModelIndex, QThread, QTimer, QSize, QFileSystemWatcher
+from PyQt6.QtGui import QPixmap, QPixmapCache
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import os
+import re
+import operator
+import threading
+import numpy as np
+from .styles import (get_page_style, FILE_LIST_STYLE, FOLDER_SELECT_BUTTON_STYLE, 
                      FILE_INFO_LABEL_STYLE, FILE_SCROLL_AREA_STYLE, PROGRESS_DIALOG_STYLE)
 from utils import Lector, filtrar_elementos_visibles, mapear_nodos
+from utils.indice import indexar_carpeta
+from utils.almacen import firma_archivo
+from utils.comprimidos import es_msh
+from utils.miniaturas import (LADO, ruta_miniatura, clave_contenido, leer_claves, escribir_claves,
+                              clave_vigente, preparar_superficie, bajar_prioridad)
+from widgets.OpenGLWidget.modules import ThumbnailRenderer
+
+# Columnas de la lista de modelos y abreviatura de cada resultado
+COLUMNAS = ("Archivo", "Nodos", "Elementos", "Tipo", "Dim.", "Resultados", "|u| máx.")
+COLUMNAS_NUMERICAS = (1, 2, 4, 6)
+ABREVIATURAS_RESULTADOS = {'desplazamientos': 'U', 'esfuerzos_nodos': 'S', 'esfuerzos_gauss': 'SG'}
+ROL_INDICE = Qt.ItemDataRole.UserRole
+
+# Condiciones del filtro sobre metadatos, p. ej. "nodos>10000" o "u<=0.01"
+CAMPOS_FILTRO = {'nodos': 'nodos', 'elementos': 'elementos', 'dim': 'dimension', 'pasos': 'pasos', 'u': 'u_max'}
+OPERADORES = {'>=': operator.ge, '<=': operator.le, '>': operator.gt, '<': operator.lt, '=': operator.eq}
+RE_CONDICION = re.compile(r'^(nodos|elementos|dim|pasos|u)(>=|<=|>|<|=)([-+0-9.eE]+)$')
+
+# Modo vigilancia: espera desde el primer aviso del sistema de archivos y
+# cantidad de modelos hasta la que se vigila cada archivo (por encima, solo
+# la carpeta y el modelo cargado)
+ESPERA_VIGILANCIA_MS = 500
+MAX_MODELOS_VIGILADOS = 2000
+
+class ModeloArchivos(QAbstractTableModel):
+    """
+    Lista de modelos de la carpeta para una QTreeView: la vista solo pide los
+    datos de las filas visibles, así que el costo no depende de la cantidad
+    de archivos. El filtro y el orden se aplican aquí; cada fila guarda el
+    índice de su archivo en Lector.archivos_msh.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.archivos = []
+        self.metadatos = {}
+        self.miniaturas = {}
+        self.filas = []
+        self.filtro = ""
+        self.condiciones = []
+        self.columna_orden = 0
+        self.orden = Qt.SortOrder.AscendingOrder
+    
+    # ---- Interfaz de QAbstractTableModel ----
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.filas)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNAS)
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNAS[section]
+        return None
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        idx = self.filas[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._texto(idx, index.column())
+        if role == Qt.ItemDataRole.DecorationRole and index.column() == 0:
+            return self._miniatura(idx)
+        if role == Qt.ItemDataRole.TextAlignmentRole and index.column() in COLUMNAS_NUMERICAS:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        if role == ROL_INDICE:
+            return idx
+        return None
+    
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        """Ordena las filas filtradas conservando la selección de la vista"""
+        self.columna_orden = column
+        self.orden = order
+        self.layoutAboutToBeChanged.emit()
+        anteriores = self.persistentIndexList()
+        archivos_anteriores = [self.filas[i.row()] for i in anteriores]
+        self._ordenar()
+        fila_de = {idx: fila for fila, idx in enumerate(self.filas)}
+        self.changePersistentIndexList(anteriores, [self.index(fila_de[idx], i.column())
+                                                    for idx, i in zip(archivos_anteriores, anteriores)])
+        self.layoutChanged.emit()
+    
+    # ---- Datos ----
+    
+    def set_archivos(self, archivos):
+        """Reemplaza la lista de archivos (sin metadatos hasta set_metadatos)"""
+        self.beginResetModel()
+        self.archivos = archivos
+        self.metadatos = {}
+        self.miniaturas = {}
+        self.filas = self._filtrar(range(len(archivos)))
+        self._ordenar()
+        self.endResetModel()
+    
+    def actualizar_archivos(self, archivos):
+        """Cambia la lista de archivos conservando metadatos, miniaturas, filtro y orden"""
+        self.beginResetModel()
+        self.archivos = archivos
+        self.filas = self._filtrar(range(len(archivos)))
+        self._ordenar()
+        self.endResetModel()
+    
+    def set_metadatos(self, metadatos):
+        """Agrega los metadatos del índice; se vuelve a filtrar y ordenar si dependen de ellos"""
+        self.metadatos = metadatos
+        if self.condiciones or self.columna_orden > 0:
+            self.beginResetModel()
+            self.filas = self._filtrar(range(len(self.archivos)))
+            self._ordenar()
+            self.endResetModel()
+        elif self.filas:
+            self.dataChanged.emit(self.index(0, 1), self.index(len(self.filas) - 1, len(COLUMNAS) - 1))
+    
+    def set_miniaturas(self, rutas):
+        """Agrega miniaturas ({archivo: ruta del PNG}); solo se repintan las filas visibles"""
+        self.miniaturas.update(rutas)
+        if self.filas:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.filas) - 1, 0),
+                                  [Qt.ItemDataRole.DecorationRole])
+    
+    def set_filtro(self, texto):
+        """
+        Filtra por palabras (en el nombre, el tipo o los resultados) y por
+        condiciones sobre metadatos. Si el texto solo agrega letras a un
+        filtro de palabras, se filtran únicamente las filas ya visibles.
+        """
+        texto = texto.strip().lower()
+        refina = bool(self.filtro) and texto.startswith(self.filtro) and not re.search(r'[<>=]', texto)
+        self.filtro = texto
+        self.condiciones = [self._condicion(palabra) for palabra in texto.split()]
+        
+        self.beginResetModel()
+        if refina:
+            self.filas = self._filtrar(self.filas)
+        else:
+            self.filas = self._filtrar(range(len(self.archivos)))
+            self._ordenar()
+        self.endResetModel()
+    
+    def fila_de(self, archivo):
+        """Fila visible de un archivo, o -1"""
+        for fila, idx in enumerate(self.filas):
+            if self.archivos[idx] == archivo:
+                return fila
+        return -1
+    
+    # ---- Auxiliares ----
+    
+    @staticmethod
+    def _condicion(palabra):
+        """(campo, operador, valor) para una condición sobre metadatos, o la palabra a buscar"""
+        coincidencia = RE_CONDICION.match(palabra)
+        if coincidencia:
+            try:
+                campo, operador, valor = coincidencia.groups()
+                return CAMPOS_FILTRO[campo], OPERADORES[operador], float(valor)
+            except ValueError:
+                pass
+        return palabra
+    
+    def _miniatura(self, idx):
+        """Imagen de la miniatura, cargada del disco al mostrarse (QPixmapCache limita la memoria)"""
+        ruta = self.miniaturas.get(self.archivos[idx])
+        if ruta is None:
+            return None
+        pixmap = QPixmapCache.find(ruta)
+        if pixmap is None:
+            pixmap = QPixmap(ruta)
+            QPixmapCache.insert(ruta, pixmap)
+        return pixmap
+    
+    def _resultados(self, datos):
+        texto = ", ".join(ABREVIATURAS_RESULTADOS[r] for r in datos.get('resultados', []))
+        if datos.get('pasos', 0) > 1:
+            texto += f" ({datos['pasos']} pasos)"
+        return texto
+    
+    def _acepta(self, idx):
+        archivo = self.archivos[idx]
+        datos = self.metadatos.get(archivo, {})
+        for condicion in self.condiciones:
+            if isinstance(condicion, str):
+                if (condicion not in archivo.lower() and condicion not in datos.get('tipo', '').lower()
+                        and condicion not in self._resultados(datos).lower()):
+                    return False
+            else:
+                campo, operador, valor = condicion
+                if datos.get(campo) is None or not operador(datos[campo], valor):
+                    return False
+        return True
+    
+    def _filtrar(self, candidatos):
+        if not self.condiciones:
+            return list(candidatos)
+        return [idx for idx in candidatos if self._acepta(idx)]
+    
+    def _clave(self, idx, columna):
+        """Clave de orden de una celda; los valores ausentes van primero"""
+        if columna == 0:
+            return idx
+        datos = self.metadatos.get(self.archivos[idx], {})
+        campo = (None, 'nodos', 'elementos', 'tipo', 'dimension', None, 'u_max')[columna]
+        if campo is None:
+            return self._resultados(datos)
+        if campo == 'tipo':
+            return datos.get('tipo', '')
+        valor = datos.get(campo)
+        return -1 if valor is None else valor
+    
+    def _ordenar(self):
+        # archivos ya está en orden natural: la columna del nombre ordena por índice
+        self.filas.sort(key=lambda idx: self._clave(idx, self.columna_orden),
+                        reverse=self.orden == Qt.SortOrder.DescendingOrder)
+    
+    def _texto(self, idx, columna):
+        archivo = self.archivos[idx]
+        if columna == 0:
+            return archivo
+        datos = self.metadatos.get(archivo)
+        if not datos:
+            return ""
+        if columna == 1:
+            return f"{datos['nodos']:,}"
+        if columna == 2:
+            return f"{datos['elementos']:,}"
+        if columna == 3:
+            return datos['tipo']
+        if columna == 4:
+            return f"{datos['dimension']}D"
+        if columna == 5:
+            return self._resultados(datos)
+        return f"{datos['u_max']:.4g}" if datos['u_max'] is not None else ""
+
+class IndexadorCarpeta(QThread):
+    """Indexa los metadatos de una carpeta fuera del hilo de la interfaz"""
+    
+    indexada = pyqtSignal(str, dict)
+    
+    def __init__(self, carpeta, pares, parent=None):
+        super().__init__(parent)
+        self.carpeta = carpeta
+        self.pares = pares
+    
+    def run(self):
+        try:
+            metadatos = indexar_carpeta(self.carpeta, self.pares, formatos=Lector.formatos)
+        except Exception as e:
+            print(f"Error al indexar la carpeta: {e}")
+            metadatos = {}
+        self.indexada.emit(self.carpeta, metadatos)
+
+class GeneradorMiniaturas(QThread):
+    """
+    Busca o prepara la miniatura de cada modelo de una carpeta. Las que ya
+    están en disco se anuncian por lotes; para las demás la superficie
+    reducida se calcula en un proceso de prioridad baja (la lectura del .msh
+    no compite por el GIL con la interfaz) y se entrega a la interfaz, que la
+    dibuja con ThumbnailRenderer. Mientras está en pausa no empieza ningún
+    modelo nuevo.
+    """
+    
+    miniaturas_listas = pyqtSignal(str, dict)
+    superficie_lista = pyqtSignal(str, str, str, object)  # None: mismo contenido que una ya enviada
+    
+    LOTE = 256
+    GUARDAR_CADA = 64
+    
+    def __init__(self, carpeta, archivos, compilado, parent=None):
+        super().__init__(parent)
+        self.carpeta = carpeta
+        self.archivos = list(archivos)
+        self.compilado = dict(compilado)
+        self.continuar = threading.Event()
+        self.continuar.set()
+        self.detenido = False
+    
+    def pausar(self, pausado):
+        """Detiene o reanuda el avance entre modelos"""
+        if pausado:
+            self.continuar.clear()
+        else:
+            self.continuar.set()
+    
+    def detener(self):
+        """Termina el hilo después del modelo en curso"""
+        self.detenido = True
+        self.continuar.set()
+    
+    def _seguir(self):
+        """Espera mientras está en pausa; retorna False si se detuvo"""
+        self.continuar.wait()
+        return not self.detenido
+    
+    def run(self):
+        try:
+            self._generar()
+        except Exception as e:
+            print(f"Error al generar miniaturas: {e}")
+    
+    def _generar(self):
+        claves = leer_claves(self.carpeta)
+        
+        # Miniaturas ya guardadas: basta con la firma de cada archivo
+        listas = {}
+        pendientes = []
+        for archivo in self.archivos:
+            if self.detenido:
+                return
+            clave = clave_vigente(self.carpeta, claves, archivo)
+            if clave is not None and os.path.exists(ruta_miniatura(self.carpeta, clave)):
+                listas[archivo] = ruta_miniatura(self.carpeta, clave)
+                if len(listas) >= self.LOTE:
+                    self.miniaturas_listas.emit(self.carpeta, listas)
+                    listas = {}
+            else:
+                pendientes.append(archivo)
+        if listas:
+            self.miniaturas_listas.emit(self.carpeta, listas)
+        if not pendientes:
+            return
+        
+        preparadas = set()
+        with ProcessPoolExecutor(max_workers=1, initializer=bajar_prioridad) as pool:
+            for hechos, archivo in enumerate(pendientes, 1):
+                if not self._seguir():
+                    break
+                
+                # La firma se toma antes del hash, como en el almacén compilado
+                ruta_msh = os.path.join(self.carpeta, archivo)
+                try:
+                    firma = firma_archivo(ruta_msh)
+                    clave = clave_contenido(ruta_msh)
+                except OSError as e:
+                    print(f"Error al leer {archivo} para su miniatura: {e}")
+                    continue
+                claves[archivo] = {'msh': firma, 'clave': clave}
+                if hechos % self.GUARDAR_CADA == 0:
+                    escribir_claves(self.carpeta, claves)
+                
+                # Otro archivo con el mismo contenido ya tiene miniatura, o
+                # la tendrá cuando la interfaz dibuje la superficie ya enviada
+                ruta = ruta_miniatura(self.carpeta, clave)
+                if os.path.exists(ruta):
+                    self.miniaturas_listas.emit(self.carpeta, {archivo: ruta})
+                    continue
+                if clave in preparadas:
+                    self.superficie_lista.emit(self.carpeta, archivo, ruta, None)
+                    continue
+                
+                if not self._seguir():
+                    break
+                try:
+                    superficie = pool.submit(preparar_superficie, self.carpeta, archivo,
+                                             self.compilado.get(archivo)).result()
+                except Exception as e:
+                    print(f"Error al preparar la miniatura de {archivo}: {e}")
+                    continue
+                if superficie is not None:
+                    preparadas.add(clave)
+                    self.superficie_lista.emit(self.carpeta, archivo, ruta, superficie)
+        
+        presentes = set(self.archivos)
+        escribir_claves(self.carpeta, {f: c for f, c in claves.items() if f in presentes})
 
 class ArchivePage(QWidget):
     archivo_seleccionado = pyqtSignal(str)
     modelo_cargado = pyqtSignal(dict)
     carpeta_cambiada = pyqtSignal()
     carpeta_seleccionada = pyqtSignal(str)
+    resultados_actualizados = pyqtSignal(dict)
     
     def __init__(self):
         super().__init__()
         self.lector = Lector()
-        self.botones_archivos = QButtonGroup()
-        self.botones_archivos.setExclusive(True)
         self.carpeta_actual = None
         self.archivo_actual = None
         self.progress_dialog = None
+        self.indexadores = []
+        self.reindexar = False
+        
+        # Modelo cargado: nodos de su superficie y lector reanudable de su .RES
+        self.mapa_superficie = None
+        self.resultados_actuales = None
+        self.pasos_sin_mostrar = False
+        
+        # Vigilancia de la carpeta: los avisos se agrupan con un temporizador
+        self.vigilante = QFileSystemWatcher(self)
+        self.vigilante.directoryChanged.connect(self._on_ruta_cambiada)
+        self.vigilante.fileChanged.connect(self._on_ruta_cambiada)
+        self.timer_vigilancia = QTimer(self)
+        self.timer_vigilancia.setSingleShot(True)
+        self.timer_vigilancia.setInterval(ESPERA_VIGILANCIA_MS)
+        self.timer_vigilancia.timeout.connect(self._aplicar_cambios)
+        self.msh_cambiados = False
+        
+        # Miniaturas: el hilo las prepara y la interfaz las dibuja de a una
+        # cuando el visor no está en uso
+        self.generadores = []
+        self.interaccion = False
+        self.miniaturas_por_dibujar = deque()
+        self.renderizador_miniaturas = ThumbnailRenderer(LADO)
+        self.timer_miniaturas = QTimer(self)
+        self.timer_miniaturas.setSingleShot(True)
+        self.timer_miniaturas.setInterval(0)
+        self.timer_miniaturas.timeout.connect(self._dibujar_miniatura)
+        
         self._setup_ui()
+        
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._esperar_hilos)
     
     def _setup_ui(self):
         layout_principal = QVBoxLayout(self)
@@ -47,6 +451,31 @@ class ArchivePage(QWidget):
         self.label_ruta.setWordWrap(True)
         layout_carpeta.addWidget(self.label_ruta)
         
+        # Botón para compilar la carpeta (lectura en paralelo a un almacén con mmap)
+        self.btn_compilar_carpeta = QPushButton("Compilar Carpeta")
+        self.btn_compilar_carpeta.setStyleSheet(FOLDER_SELECT_BUTTON_STYLE)
+        self.btn_compilar_carpeta.setToolTip("Lee todos los modelos en paralelo para abrirlos al instante")
+        self.btn_compilar_carpeta.clicked.connect(self._compilar_carpeta)
+        self.btn_compilar_carpeta.setEnabled(False)
+        layout_carpeta.addWidget(self.btn_compilar_carpeta)
+        
+        # Vigilancia para resultados que el solver sigue escribiendo
+        self.check_vigilar = QCheckBox("Vigilar carpeta")
+        self.check_vigilar.setToolTip("Agrega los modelos nuevos y lee los pasos que el solver escribe")
+        self.check_vigilar.stateChanged.connect(self._on_toggle_vigilar)
+        layout_carpeta.addWidget(self.check_vigilar)
+        
+        self.check_seguir = QCheckBox("Seguir último paso")
+        self.check_seguir.setToolTip("Muestra cada paso nuevo del modelo cargado al leerse")
+        self.check_seguir.setEnabled(False)
+        self.check_seguir.stateChanged.connect(self._on_toggle_seguir)
+        layout_carpeta.addWidget(self.check_seguir)
+        
+        self.label_seguimiento = QLabel("")
+        self.label_seguimiento.setStyleSheet(FILE_INFO_LABEL_STYLE)
+        self.label_seguimiento.hide()
+        layout_carpeta.addWidget(self.label_seguimiento)
+        
         layout_principal.addWidget(grupo_carpeta)
         
         # Grupo para la lista de archivos (inicialmente oculto)
@@ -55,28 +484,42 @@ class ArchivePage(QWidget):
         layout_archivos.setSpacing(8)
         layout_archivos.setContentsMargins(8, 12, 8, 8)
         
-        # Área de scroll para la lista de archivos
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        self.scroll_area.setStyleSheet(FILE_SCROLL_AREA_STYLE)
+        # Filtro por nombre o metadatos
+        self.filtro_archivos = QLineEdit()
+        self.filtro_archivos.setPlaceholderText("Filtrar: nombre, tipo, nodos>10000, u<0.01...")
+        self.filtro_archivos.setClearButtonEnabled(True)
+        layout_archivos.addWidget(self.filtro_archivos)
         
-        # Widget contenedor para los botones de archivos
-        self.contenedor_archivos = QWidget()
-        self.layout_archivos = QVBoxLayout(self.contenedor_archivos)
-        self.layout_archivos.setAlignment(Qt.AlignmentFlag.AlignTop)
-        self.layout_archivos.setSpacing(4)
-        self.layout_archivos.setContentsMargins(0, 0, 0, 0)
+        # Lista de archivos con sus metadatos (modelo/vista: solo se crean las filas visibles)
+        self.modelo_archivos = ModeloArchivos(self)
+        self.lista_archivos = QTreeView()
+        self.lista_archivos.setModel(self.modelo_archivos)
+        self.lista_archivos.setRootIsDecorated(False)
+        self.lista_archivos.setUniformRowHeights(True)
+        self.lista_archivos.setIconSize(QSize(LADO // 2, LADO // 2))
+        self.lista_archivos.setSortingEnabled(True)
+        self.lista_archivos.sortByColumn(0, Qt.SortOrder.AscendingOrder)
+        header = self.lista_archivos.header()
+        header.setResizeContentsPrecision(200)
+        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.lista_archivos.setStyleSheet(FILE_LIST_STYLE + FILE_SCROLL_AREA_STYLE)
+        self.lista_archivos.clicked.connect(self._on_indice_seleccionado)
+        layout_archivos.addWidget(self.lista_archivos)
         
-        self.scroll_area.setWidget(self.contenedor_archivos)
-        layout_archivos.addWidget(self.scroll_area)
+        self.filtro_archivos.textChanged.connect(self.modelo_archivos.set_filtro)
+        self.modelo_archivos.modelReset.connect(self._seleccionar_actual)
+        
+        # Estado del índice de metadatos
+        self.label_indexando = QLabel("Indexando metadatos...")
+        self.label_indexando.setStyleSheet(FILE_INFO_LABEL_STYLE)
+        layout_archivos.addWidget(self.label_indexando)
+        self.label_indexando.hide()
         
         # Label para cuando no hay archivos
         self.label_sin_archivos = QLabel("No hay archivos validos en la carpeta seleccionada")
         self.label_sin_archivos.setStyleSheet(FILE_INFO_LABEL_STYLE)
         self.label_sin_archivos.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.layout_archivos.addWidget(self.label_sin_archivos)
+        layout_archivos.addWidget(self.label_sin_archivos)
         self.label_sin_archivos.hide()
         
         layout_principal.addWidget(self.grupo_archivos)
@@ -137,20 +580,26 @@ class ArchivePage(QWidget):
             # Si cambió de carpeta, resetear archivo actual
             if carpeta_cambio:
                 self.archivo_actual = None
+                self.resultados_actuales = None
+                self.label_seguimiento.hide()
             
             self.lector.abrir_carpeta(ruta)
             self.label_ruta.setText(f"Carpeta seleccionada: {ruta}")
+            self.btn_compilar_carpeta.setEnabled(self.lector.total_modelos > 0)
             
             self.carpeta_seleccionada.emit(ruta)
             
-            self._limpiar_botones_archivos()
+            self._limpiar_lista_archivos()
             
             # Obtener la lista de archivos
             archivos = self.lector.archivos_msh
             
             if archivos:
                 self.label_sin_archivos.hide()
-                self._crear_botones_archivos(archivos)
+                self.modelo_archivos.set_archivos(archivos)
+                self._indexar_en_segundo_plano(ruta)
+                self._generar_miniaturas(ruta)
+                self.lista_archivos.show()
                 self.grupo_archivos.show()
                 
                 # Emitir señal solo si cambió de carpeta
@@ -158,38 +607,288 @@ class ArchivePage(QWidget):
                     self.carpeta_cambiada.emit()
             else:
                 self.label_sin_archivos.setText("No se encontraron archivos validos en la carpeta seleccionada")
+                self.lista_archivos.hide()
                 self.label_sin_archivos.show()
                 self.grupo_archivos.show()
                 
         except Exception as e:
             self.label_ruta.setText(f"Error al cargar la carpeta: {str(e)}")
-            self._limpiar_botones_archivos()
+            self._limpiar_lista_archivos()
+            self.lista_archivos.hide()
             self.label_sin_archivos.setText(f"Error: {str(e)}")
             self.label_sin_archivos.show()
             self.grupo_archivos.show()
         finally:
             self._cerrar_progreso()
+            self._vigilar_carpeta(reiniciar=True)
     
-    def _limpiar_botones_archivos(self):
-        """Limpia todos los botones de archivos existentes, preservando label_sin_archivos"""
-        for i in reversed(range(self.layout_archivos.count())):
-            widget = self.layout_archivos.itemAt(i).widget()
-            if widget and widget != self.label_sin_archivos:
-                widget.deleteLater()
-        
-        self.botones_archivos = QButtonGroup()
-        self.botones_archivos.setExclusive(True)
-    
-    def _crear_botones_archivos(self, archivos):
-        """Crea botones para cada archivo en la lista"""
-        for idx, archivo in enumerate(archivos):
-            btn_archivo = QPushButton(archivo)
-            btn_archivo.setStyleSheet(FILE_BUTTON_STYLE)
-            btn_archivo.setCheckable(True)
-            btn_archivo.clicked.connect(lambda checked, i=idx, a=archivo: self._on_archivo_seleccionado(i, a))
-            
-            self.layout_archivos.insertWidget(self.layout_archivos.count() - 1, btn_archivo)
-            self.botones_archivos.addButton(btn_archivo)
+    def _compilar_carpeta(self):
+        """Compila todos los modelos de la carpeta actual mostrando el avance"""
+        total = self.lector.total_modelos
+        self._mostrar_progreso("Compilando", "Leyendo modelos en paralelo...", max(total, 1))
+        
+        def progreso(hechos, pendientes, archivo):
+            self._actualizar_progreso(total - pendientes + hechos, f"Compilado {archivo} ({hechos}/{pendientes})")
+        
+        try:
+            compilados = self.lector.compilar_carpeta(progreso=progreso)
+            self.label_ruta.setText(f"Carpeta seleccionada: {self.carpeta_actual}\n"
+                                    f"Modelos compilados: {compilados} nuevos, "
+                                    f"{len(self.lector.compilado)} de {total} en total")
+        except Exception as e:
+            from PyQt6.QtWidgets import QMessageBox
+            QMessageBox.critical(self, "Error", f"Error al compilar la carpeta: {str(e)}")
+        finally:
+            self._cerrar_progreso()
+    
+    def _limpiar_lista_archivos(self):
+        """Vacía la lista de archivos"""
+        self.modelo_archivos.set_archivos([])
+    
+    def _indexar_en_segundo_plano(self, carpeta, mostrar=True):
+        """
+        Lee los metadatos de la carpeta en un hilo; la lista se completa al
+        terminar. Si ya se está indexando la carpeta, se repite al final
+        (el índice solo vuelve a leer los archivos que cambiaron).
+        """
+        if any(i.carpeta == carpeta and i.isRunning() for i in self.indexadores):
+            self.reindexar = True
+            return
+        indexador = IndexadorCarpeta(carpeta, self.lector.pares_archivos())
+        indexador.indexada.connect(self._on_carpeta_indexada)
+        indexador.finished.connect(lambda: self._on_indexador_terminado(indexador))
+        self.indexadores.append(indexador)
+        if mostrar:
+            self.label_indexando.show()
+        indexador.start(QThread.Priority.LowPriority)
+    
+    def _on_indexador_terminado(self, indexador):
+        self.indexadores.remove(indexador)
+        if self.reindexar and indexador.carpeta == self.carpeta_actual:
+            self.reindexar = False
+            self._indexar_en_segundo_plano(self.carpeta_actual, mostrar=False)
+    
+    def _on_carpeta_indexada(self, carpeta, metadatos):
+        """Muestra los metadatos si la carpeta sigue siendo la actual"""
+        if carpeta != self.carpeta_actual:
+            return
+        self.lector.metadatos = metadatos
+        self.modelo_archivos.set_metadatos(metadatos)
+        self.label_indexando.hide()
+    
+    def _generar_miniaturas(self, carpeta):
+        """Inicia la generación de miniaturas de la carpeta y detiene la de la anterior"""
+        for generador in self.generadores:
+            generador.detener()
+        self.miniaturas_por_dibujar.clear()
+        
+        generador = GeneradorMiniaturas(carpeta, self.lector.archivos_msh, self.lector.compilado)
+        generador.miniaturas_listas.connect(self._on_miniaturas_listas)
+        generador.superficie_lista.connect(self._on_superficie_lista)
+        generador.finished.connect(lambda: self.generadores.remove(generador))
+        generador.pausar(self.interaccion)
+        self.generadores.append(generador)
+        generador.start(QThread.Priority.LowestPriority)
+    
+    def set_interaccion(self, activa):
+        """Pausa las miniaturas mientras el usuario interactúa con el visor"""
+        self.interaccion = activa
+        for generador in self.generadores:
+            generador.pausar(activa)
+        if not activa and self.miniaturas_por_dibujar:
+            self.timer_miniaturas.start()
+    
+    def _on_miniaturas_listas(self, carpeta, rutas):
+        if carpeta == self.carpeta_actual:
+            self.modelo_archivos.set_miniaturas(rutas)
+    
+    def _on_superficie_lista(self, carpeta, archivo, ruta, superficie):
+        if carpeta != self.carpeta_actual:
+            return
+        self.miniaturas_por_dibujar.append((archivo, ruta, superficie))
+        if not self.interaccion:
+            self.timer_miniaturas.start()
+    
+    def _dibujar_miniatura(self):
+        """Dibuja una miniatura pendiente por vuelta del bucle de eventos y la guarda"""
+        if self.interaccion or not self.miniaturas_por_dibujar:
+            return
+        archivo, ruta, superficie = self.miniaturas_por_dibujar.popleft()
+        if os.path.exists(ruta) or superficie is None:
+            # Mismo contenido que una miniatura ya dibujada
+            if os.path.exists(ruta):
+                self.modelo_archivos.set_miniaturas({archivo: ruta})
+            if self.miniaturas_por_dibujar:
+                self.timer_miniaturas.start()
+            return
+        
+        imagen = self.renderizador_miniaturas.render(*superficie)
+        if imagen is None:
+            # Sin contexto fuera de pantalla no hay miniaturas
+            self.miniaturas_por_dibujar.clear()
+            for generador in self.generadores:
+                generador.detener()
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        except OSError as e:
+            print(f"Advertencia: no se pudo crear el directorio de miniaturas: {e}")
+        if imagen.save(ruta, "PNG"):
+            self.modelo_archivos.set_miniaturas({archivo: ruta})
+        else:
+            print(f"Advertencia: no se pudo guardar la miniatura de {archivo}")
+        if self.miniaturas_por_dibujar:
+            self.timer_miniaturas.start()
+    
+    # ---- Vigilancia de la carpeta ----
+    
+    def _on_toggle_vigilar(self, estado):
+        activo = estado == Qt.CheckState.Checked.value
+        self.check_seguir.setEnabled(activo)
+        if activo:
+            self._vigilar_carpeta(reiniciar=True)
+        else:
+            self._dejar_de_vigilar()
+            self.label_seguimiento.hide()
+    
+    def _on_toggle_seguir(self, estado):
+        if estado == Qt.CheckState.Checked.value and self.pasos_sin_mostrar:
+            self._mostrar_ultimo_paso()
+    
+    def _rutas_vigiladas(self):
+        """La carpeta y los archivos de los modelos (o solo los del modelo cargado si son muchos)"""
+        if self.lector.total_modelos <= MAX_MODELOS_VIGILADOS:
+            pares = self.lector.pares_archivos()
+        elif self.archivo_actual is not None:
+            pares = [(self.archivo_actual, self.lector._archivo_res(self.archivo_actual))]
+        else:
+            pares = []
+        rutas = [self.carpeta_actual]
+        for msh_file, res_file in pares:
+            rutas.append(os.path.join(self.carpeta_actual, msh_file))
+            if res_file is not None:
+                rutas.append(os.path.join(self.carpeta_actual, res_file))
+        return [r for r in rutas if os.path.exists(r)]
+    
+    def _vigilar_carpeta(self, reiniciar=False):
+        """
+        Agrega al vigilante las rutas que faltan: archivos nuevos y archivos
+        reemplazados (el vigilante deja de seguir un archivo que se reemplaza)
+        """
+        if reiniciar:
+            self._dejar_de_vigilar()
+        if not self.check_vigilar.isChecked() or self.carpeta_actual is None:
+            return
+        vigiladas = set(self.vigilante.files()) | set(self.vigilante.directories())
+        faltantes = [r for r in self._rutas_vigiladas() if r not in vigiladas]
+        if faltantes:
+            self.vigilante.addPaths(faltantes)
+    
+    def _dejar_de_vigilar(self):
+        rutas = self.vigilante.files() + self.vigilante.directories()
+        if rutas:
+            self.vigilante.removePaths(rutas)
+        self.timer_vigilancia.stop()
+    
+    def _on_ruta_cambiada(self, ruta):
+        """
+        El solver escribe en muchas llamadas: los avisos se agrupan y se
+        aplican juntos. El temporizador no se reinicia con cada aviso, así un
+        solver que escribe sin pausa se sigue igual cada ESPERA_VIGILANCIA_MS
+        """
+        if es_msh(ruta):
+            self.msh_cambiados = True
+        if not self.timer_vigilancia.isActive():
+            self.timer_vigilancia.start()
+    
+    def _aplicar_cambios(self):
+        """Agrega los modelos nuevos, reindexa los cambiados y lee los pasos nuevos del modelo cargado"""
+        if self.carpeta_actual is None or not self.check_vigilar.isChecked():
+            return
+        try:
+            nuevos, eliminados = self.lector.actualizar_carpeta()
+        except OSError as e:
+            print(f"Error al actualizar la carpeta: {e}")
+            return
+        
+        if nuevos or eliminados:
+            print(f"Carpeta actualizada: {len(nuevos)} modelos nuevos, {len(eliminados)} eliminados")
+            self.modelo_archivos.actualizar_archivos(self.lector.archivos_msh)
+            if self.lector.total_modelos > 0:
+                self.label_sin_archivos.hide()
+                self.lista_archivos.show()
+            self.btn_compilar_carpeta.setEnabled(self.lector.total_modelos > 0)
+        if nuevos or self.msh_cambiados:
+            self.msh_cambiados = False
+            self._generar_miniaturas(self.carpeta_actual)
+        
+        self._indexar_en_segundo_plano(self.carpeta_actual, mostrar=False)
+        self._leer_pasos_nuevos()
+        self._vigilar_carpeta()
+    
+    def _leer_pasos_nuevos(self):
+        """Interpreta solo lo agregado al .RES del modelo cargado"""
+        if self.archivo_actual is None or self.archivo_actual not in self.lector.archivos_msh:
+            return
+        # Sin .RES (el modelo no tiene resultados o su formato los incluye) no hay nada que seguir
+        res_file = self.lector._archivo_res(self.archivo_actual)
+        if res_file is None or not os.path.exists(os.path.join(self.carpeta_actual, res_file)):
+            return
+        try:
+            if self.resultados_actuales is None:
+                # Reutiliza el lector de la carga si el .RES se leyó entonces
+                indice = self.lector.archivos_msh.index(self.archivo_actual)
+                self.resultados_actuales = self.lector.seguir_resultados(indice)
+            nuevos = self.resultados_actuales.actualizar()
+        except OSError as e:
+            print(f"Error al leer los resultados de {self.archivo_actual}: {e}")
+            return
+        
+        pasos = self.resultados_actuales.pasos['desplazamientos']
+        self.label_seguimiento.setText(f"{self.archivo_actual}: {pasos} pasos leídos")
+        self.label_seguimiento.show()
+        if nuevos:
+            self.pasos_sin_mostrar = True
+            if self.check_seguir.isChecked():
+                self._mostrar_ultimo_paso()
+    
+    def _mostrar_ultimo_paso(self):
+        """Envía los últimos resultados del modelo cargado, mapeados a su superficie"""
+        if self.resultados_actuales is None or self.mapa_superficie is None:
+            return
+        if not isinstance(self.mapa_superficie, dict):
+            # Modelo compilado: los nodos de superficie están en el orden de sus vértices
+            nodos = np.asarray(self.mapa_superficie).tolist()
+            self.mapa_superficie = dict(zip(nodos, range(len(nodos))))
+        
+        resultados = self.resultados_actuales.resultados()
+        desplazamientos = resultados.get('desplazamientos')
+        if desplazamientos is not None:
+            desplazamientos = mapear_nodos(desplazamientos, self.mapa_superficie)
+        self.pasos_sin_mostrar = False
+        self.resultados_actualizados.emit({'desplazamientos': desplazamientos, 'resultados': resultados})
+    
+    def _esperar_hilos(self):
+        """Espera a los hilos de indexado y de miniaturas antes de cerrar la aplicación"""
+        for generador in self.generadores:
+            generador.detener()
+        for hilo in list(self.indexadores) + list(self.generadores):
+            hilo.wait()
+        self.renderizador_miniaturas.cleanup()
+    
+    def _seleccionar_actual(self):
+        """Vuelve a marcar el archivo cargado tras filtrar o recargar la lista"""
+        if self.archivo_actual is None:
+            return
+        fila = self.modelo_archivos.fila_de(self.archivo_actual)
+        if fila >= 0:
+            self.lista_archivos.setCurrentIndex(self.modelo_archivos.index(fila, 0))
+    
+    def _on_indice_seleccionado(self, index):
+        """Carga el modelo de la fila pulsada"""
+        idx = self.modelo_archivos.data(index, ROL_INDICE)
+        self._on_archivo_seleccionado(idx, self.lector.archivos_msh[idx])
     
     def _on_archivo_seleccionado(self, idx, archivo):
         """Maneja la selección de un archivo"""
@@ -206,15 +905,26 @@ class ArchivePage(QWidget):
             # Obtener modelo
             self._actualizar_progreso(40, "Leyendo datos del archivo...")
             doc = self.lector.obtener_modelo(idx)
-            coords, elements = doc["msh"]
+            coords_volumen, elements, materiales = doc["msh"]
             desplazamientos = doc["res"].get("desplazamientos")
             
-            # Filtrar elementos visibles
-            self._actualizar_progreso(60, "Procesando geometría...")
-            coords, triangle_indices, line_indices, node_map = filtrar_elementos_visibles(coords, elements)
-            
-            self._actualizar_progreso(80, "Procesando desplazamientos...")
-            desplazamientos = mapear_nodos(desplazamientos, node_map)
+            superficie = doc.get("superficie")
+            if superficie is not None:
+                # Modelo compilado: superficie y desplazamientos ya mapeados
+                coords = superficie['coords']
+                triangle_indices = superficie['triangle_indices']
+                line_indices = superficie['line_indices']
+                grupos = superficie['grupos']
+                desplazamientos = superficie['desplazamientos']
+                node_map = superficie['nodos']
+            else:
+                # Filtrar elementos visibles
+                self._actualizar_progreso(60, "Procesando geometría...")
+                coords, triangle_indices, line_indices, node_map, grupos = filtrar_elementos_visibles(
+                    coords_volumen, elements, materiales, reordenar=True)
+                
+                self._actualizar_progreso(80, "Procesando desplazamientos...")
+                desplazamientos = mapear_nodos(desplazamientos, node_map)
             
             # Emitir señal con los datos procesados
             self._actualizar_progreso(95, "Finalizando...")
@@ -222,7 +932,14 @@ class ArchivePage(QWidget):
                 'coords': coords,
                 'triangle_indices': triangle_indices,
                 'line_indices': line_indices,
-                'desplazamientos': desplazamientos
+                'grupos': grupos,
+                'desplazamientos': desplazamientos,
+                'volumen': {
+                    'coords': coords_volumen,
+                    'elementos': np.asarray(elements, dtype=np.int32),
+                    'materiales': materiales,
+                    'resultados': doc["res"]
+                }
             }
             self.modelo_cargado.emit(datos_modelo)
             
@@ -230,6 +947,11 @@ class ArchivePage(QWidget):
             
             # Guardar archivo actual después de carga exitosa
             self.archivo_actual = archivo
+            self.mapa_superficie = node_map
+            self.resultados_actuales = None
+            self.pasos_sin_mostrar = False
+            self.label_seguimiento.hide()
+            self._vigilar_carpeta()
             
         except Exception as e:
             from PyQt6.QtWidgets import QMessageBox
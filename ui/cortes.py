@@ -0,0 +1,509 @@
+"""
+Página de cortes y filtros del modelo
+"""
+import colorsys
+import time
+import numpy as np
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGroupBox, QLabel,
+                             QComboBox, QSlider, QCheckBox, QPushButton,
+                             QScrollArea, QLineEdit, QMessageBox, QListWidget,
+                             QListWidgetItem)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QFont, QColor, QPixmap, QIcon
+from .styles import (get_page_style, BUTTON_STYLE, SCROLL_AREA_STYLE, RANGE_LABEL_STYLE,
+                     LIST_WIDGET_STYLE)
+from utils import campos_escalares, extraer_isosuperficies, FiltroUmbral
+
+class CortesPage(QWidget):
+    SLIDER_RANGE = (0, 1000)
+    ISO_SURFACE_NAME = "isosuperficie"
+    THRESHOLD_SURFACE_NAME = "umbral"
+    
+    def __init__(self, gl_widget):
+        super().__init__()
+        self.gl_widget = gl_widget
+        self.volume = None
+        self.fields = {}
+        self.iso_values = None
+        self.threshold_filter = None
+        self._setup_ui()
+        
+        self.gl_widget.clip_changed.connect(self._sync_clip_slider)
+    
+    def _setup_ui(self):
+        """Configura la interfaz de usuario"""
+        self.setStyleSheet(get_page_style() + BUTTON_STYLE + SCROLL_AREA_STYLE + LIST_WIDGET_STYLE)
+        
+        outer_layout = QVBoxLayout(self)
+        outer_layout.setContentsMargins(0, 0, 0, 0)
+        
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        outer_layout.addWidget(scroll)
+        
+        content = QWidget()
+        layout = QVBoxLayout(content)
+        layout.setContentsMargins(15, 15, 15, 15)
+        layout.setSpacing(12)
+        
+        layout.addWidget(self._create_title())
+        layout.addWidget(self._create_clip_group())
+        layout.addWidget(self._create_parts_group())
+        layout.addWidget(self._create_field_group())
+        layout.addWidget(self._create_iso_group())
+        layout.addWidget(self._create_threshold_group())
+        layout.addStretch()
+        
+        scroll.setWidget(content)
+    
+    def _create_title(self):
+        """Crea el título de la página"""
+        title = QLabel("Cortes y Filtros")
+        title_font = QFont()
+        title_font.setPointSize(13)
+        title_font.setBold(True)
+        title.setFont(title_font)
+        title.setStyleSheet("color: #e0e0e0; padding: 8px 0; font-size: 13px;")
+        return title
+    
+    def _create_label(self, text):
+        """Crea un label con estilo predeterminado"""
+        label = QLabel(text)
+        label.setStyleSheet("font-size: 11px; color: #b0b0b0; padding-top: 4px;")
+        return label
+    
+    def _create_clip_group(self):
+        """Crea el grupo de la caja de corte"""
+        group = QGroupBox("Caja de Corte")
+        layout = QVBoxLayout(group)
+        layout.setSpacing(8)
+        
+        self.clip_checkbox = QCheckBox("Activar caja de corte")
+        self.clip_checkbox.stateChanged.connect(self._on_toggle_clip)
+        layout.addWidget(self.clip_checkbox)
+        
+        self.gizmo_checkbox = QCheckBox("Mostrar caja")
+        self.gizmo_checkbox.setChecked(True)
+        self.gizmo_checkbox.stateChanged.connect(self._on_toggle_gizmo)
+        layout.addWidget(self.gizmo_checkbox)
+        
+        layout.addWidget(self._create_label("Cara activa:"))
+        self.face_combo = QComboBox()
+        for index, name in enumerate(self.gl_widget.clip_manager.BOX_FACE_NAMES):
+            self.face_combo.addItem(name, index)
+        self.face_combo.currentIndexChanged.connect(self._on_face_changed)
+        layout.addWidget(self.face_combo)
+        
+        self.face_slider = QSlider(Qt.Orientation.Horizontal)
+        self.face_slider.setRange(*self.SLIDER_RANGE)
+        self.face_slider.setValue(self.SLIDER_RANGE[0])
+        self.face_slider.valueChanged.connect(self._on_face_slider_changed)
+        layout.addWidget(self.face_slider)
+        
+        hint = QLabel("Shift + arrastrar sobre la vista mueve la cara activa")
+        hint.setStyleSheet(RANGE_LABEL_STYLE)
+        hint.setWordWrap(True)
+        layout.addWidget(hint)
+        
+        reset_btn = QPushButton("Restablecer Caja")
+        reset_btn.clicked.connect(self.gl_widget.reset_clip_box)
+        layout.addWidget(reset_btn)
+        
+        self._set_clip_controls_enabled(False)
+        return group
+    
+    def _create_parts_group(self):
+        """Crea el grupo de partes (materiales) del modelo"""
+        group = QGroupBox("Partes")
+        layout = QVBoxLayout(group)
+        layout.setSpacing(8)
+        
+        self.parts_color_checkbox = QCheckBox("Colorear por parte")
+        self.parts_color_checkbox.stateChanged.connect(self._on_toggle_parts_color)
+        layout.addWidget(self.parts_color_checkbox)
+        
+        self.parts_list = QListWidget()
+        self.parts_list.setMinimumHeight(140)
+        self.parts_list.itemChanged.connect(self._on_part_item_changed)
+        layout.addWidget(self.parts_list)
+        
+        buttons = QHBoxLayout()
+        show_all_btn = QPushButton("Mostrar Todas")
+        show_all_btn.clicked.connect(lambda: self._set_all_parts_visible(True))
+        buttons.addWidget(show_all_btn)
+        
+        hide_all_btn = QPushButton("Ocultar Todas")
+        hide_all_btn.clicked.connect(lambda: self._set_all_parts_visible(False))
+        buttons.addWidget(hide_all_btn)
+        layout.addLayout(buttons)
+        
+        return group
+    
+    def _create_field_group(self):
+        """Crea el grupo de selección del campo escalar"""
+        group = QGroupBox("Campo Escalar")
+        layout = QVBoxLayout(group)
+        layout.setSpacing(8)
+        
+        self.field_combo = QComboBox()
+        self.field_combo.setEnabled(False)
+        self.field_combo.currentIndexChanged.connect(self._on_field_changed)
+        layout.addWidget(self.field_combo)
+        
+        self.field_range_label = QLabel("Rango: --")
+        self.field_range_label.setStyleSheet(RANGE_LABEL_STYLE)
+        layout.addWidget(self.field_range_label)
+        
+        return group
+    
+    def _create_iso_group(self):
+        """Crea el grupo de isosuperficies"""
+        group = QGroupBox("Isosuperficies")
+        layout = QVBoxLayout(group)
+        layout.setSpacing(8)
+        
+        layout.addWidget(self._create_label("Isovalores (separados por coma):"))
+        self.iso_edit = QLineEdit()
+        self.iso_edit.setPlaceholderText("Vacío = valor medio del rango")
+        self.iso_edit.returnPressed.connect(self._on_extract_iso)
+        layout.addWidget(self.iso_edit)
+        
+        buttons = QHBoxLayout()
+        self.iso_extract_btn = QPushButton("Extraer")
+        self.iso_extract_btn.clicked.connect(self._on_extract_iso)
+        buttons.addWidget(self.iso_extract_btn)
+        
+        self.iso_clear_btn = QPushButton("Quitar")
+        self.iso_clear_btn.clicked.connect(self._on_clear_iso)
+        buttons.addWidget(self.iso_clear_btn)
+        layout.addLayout(buttons)
+        
+        self.iso_info_label = QLabel("Sin isosuperficie")
+        self.iso_info_label.setStyleSheet(RANGE_LABEL_STYLE)
+        self.iso_info_label.setWordWrap(True)
+        layout.addWidget(self.iso_info_label)
+        
+        self._set_iso_controls_enabled(False)
+        return group
+    
+    def _create_threshold_group(self):
+        """Crea el grupo del filtro por umbral"""
+        group = QGroupBox("Filtro por Umbral")
+        layout = QVBoxLayout(group)
+        layout.setSpacing(8)
+        
+        self.threshold_checkbox = QCheckBox("Mostrar solo elementos en el rango")
+        self.threshold_checkbox.stateChanged.connect(self._on_toggle_threshold)
+        layout.addWidget(self.threshold_checkbox)
+        
+        layout.addWidget(self._create_label("Mínimo:"))
+        self.threshold_min_slider = QSlider(Qt.Orientation.Horizontal)
+        self.threshold_min_slider.setRange(*self.SLIDER_RANGE)
+        self.threshold_min_slider.setValue(self.SLIDER_RANGE[0])
+        self.threshold_min_slider.valueChanged.connect(self._on_threshold_changed)
+        layout.addWidget(self.threshold_min_slider)
+        
+        layout.addWidget(self._create_label("Máximo:"))
+        self.threshold_max_slider = QSlider(Qt.Orientation.Horizontal)
+        self.threshold_max_slider.setRange(*self.SLIDER_RANGE)
+        self.threshold_max_slider.setValue(self.SLIDER_RANGE[1])
+        self.threshold_max_slider.valueChanged.connect(self._on_threshold_changed)
+        layout.addWidget(self.threshold_max_slider)
+        
+        self.threshold_info_label = QLabel("Filtro inactivo")
+        self.threshold_info_label.setStyleSheet(RANGE_LABEL_STYLE)
+        self.threshold_info_label.setWordWrap(True)
+        layout.addWidget(self.threshold_info_label)
+        
+        self.threshold_checkbox.setEnabled(False)
+        self._set_threshold_sliders_enabled(False)
+        return group
+    
+    def _set_threshold_sliders_enabled(self, enabled):
+        """Habilita o deshabilita los sliders del filtro por umbral"""
+        self.threshold_min_slider.setEnabled(enabled)
+        self.threshold_max_slider.setEnabled(enabled)
+    
+    def _set_iso_controls_enabled(self, enabled):
+        """Habilita o deshabilita los controles de isosuperficies"""
+        self.iso_edit.setEnabled(enabled)
+        self.iso_extract_btn.setEnabled(enabled)
+        self.iso_clear_btn.setEnabled(enabled)
+    
+    def _set_clip_controls_enabled(self, enabled):
+        """Habilita o deshabilita los controles de la caja"""
+        self.gizmo_checkbox.setEnabled(enabled)
+        self.face_combo.setEnabled(enabled)
+        self.face_slider.setEnabled(enabled)
+    
+    # Slots para eventos
+    def _on_toggle_clip(self, state):
+        """Activa o desactiva la caja de corte"""
+        is_checked = state == Qt.CheckState.Checked.value
+        self._set_clip_controls_enabled(is_checked)
+        self.gl_widget.set_clip_enabled(is_checked)
+    
+    def _on_toggle_gizmo(self, state):
+        """Muestra u oculta la caja de corte"""
+        self.gl_widget.set_clip_gizmo_visible(state == Qt.CheckState.Checked.value)
+    
+    def _on_face_changed(self, index):
+        """Cambia la cara activa de la caja"""
+        self.gl_widget.set_active_clip_plane(self.face_combo.itemData(index))
+        self._sync_clip_slider()
+    
+    def _on_face_slider_changed(self, value):
+        """Mueve la cara activa de la caja"""
+        face = self.face_combo.currentData()
+        fraction = (value - self.SLIDER_RANGE[0]) / (self.SLIDER_RANGE[1] - self.SLIDER_RANGE[0])
+        self.gl_widget.set_clip_box_face(face, fraction)
+    
+    def _sync_clip_slider(self):
+        """Sincroniza el slider con la posición real de la cara activa"""
+        face = self.face_combo.currentData()
+        fraction = self.gl_widget.get_clip_box_face(face)
+        value = round(self.SLIDER_RANGE[0] + fraction * (self.SLIDER_RANGE[1] - self.SLIDER_RANGE[0]))
+        
+        self.face_slider.blockSignals(True)
+        self.face_slider.setValue(value)
+        self.face_slider.blockSignals(False)
+    
+    
+    @staticmethod
+    def _part_color(index):
+        """Color distintivo para la parte i (tono por razón áurea)"""
+        hue = (index * 0.618033988749895) % 1.0
+        r, g, b = colorsys.hsv_to_rgb(hue, 0.55, 0.9)
+        return (r, g, b, 1.0)
+    
+    def _on_toggle_parts_color(self, state):
+        """Activa o desactiva el color por parte"""
+        is_checked = state == Qt.CheckState.Checked.value
+        colors = {material: self._part_color(i) for i, material in enumerate(self.gl_widget.get_parts())}
+        self.gl_widget.set_parts_colored(is_checked, colors)
+    
+    def _on_part_item_changed(self, item):
+        """Muestra u oculta la parte marcada en la lista"""
+        visible = item.checkState() == Qt.CheckState.Checked
+        self.gl_widget.set_part_visible(item.data(Qt.ItemDataRole.UserRole), visible)
+    
+    def _set_all_parts_visible(self, visible):
+        """Muestra u oculta todas las partes y sincroniza la lista"""
+        self.gl_widget.set_all_parts_visible(visible)
+        state = Qt.CheckState.Checked if visible else Qt.CheckState.Unchecked
+        
+        self.parts_list.blockSignals(True)
+        for row in range(self.parts_list.count()):
+            self.parts_list.item(row).setCheckState(state)
+        self.parts_list.blockSignals(False)
+    
+    def refresh_parts(self):
+        """Reconstruye la lista de partes del modelo cargado en el widget OpenGL"""
+        parts = self.gl_widget.get_parts()
+        
+        self.parts_list.blockSignals(True)
+        self.parts_list.clear()
+        for i, material in enumerate(parts):
+            item = QListWidgetItem(f"Material {material}")
+            item.setData(Qt.ItemDataRole.UserRole, material)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            visible = self.gl_widget.is_part_visible(material)
+            item.setCheckState(Qt.CheckState.Checked if visible else Qt.CheckState.Unchecked)
+            
+            swatch = QPixmap(12, 12)
+            swatch.fill(QColor.fromRgbF(*self._part_color(i)))
+            item.setIcon(QIcon(swatch))
+            self.parts_list.addItem(item)
+        self.parts_list.blockSignals(False)
+        
+        # Los colores dependen del orden de las partes del modelo nuevo
+        if self.parts_color_checkbox.isChecked():
+            self._on_toggle_parts_color(Qt.CheckState.Checked.value)
+    
+    def _on_field_changed(self, index):
+        """Actualiza la información del campo seleccionado"""
+        values = self._current_field()
+        if values is None:
+            self.field_range_label.setText("Rango: --")
+            return
+        self.field_range_label.setText(f"Rango: {values.min():.6g} a {values.max():.6g}")
+        
+        # El filtro ordena los elementos según el nuevo campo
+        if self.threshold_filter is not None:
+            self.threshold_filter.set_valores(values)
+            self._on_threshold_changed()
+    
+    def _current_field(self):
+        """Retorna los valores nodales del campo seleccionado"""
+        return self.fields.get(self.field_combo.currentText())
+    
+    def _parse_iso_values(self, values):
+        """Interpreta los isovalores escritos por el usuario"""
+        text = self.iso_edit.text().strip()
+        if not text:
+            return [0.5 * (float(values.min()) + float(values.max()))]
+        return [float(part) for part in text.replace(';', ',').split(',') if part.strip()]
+    
+    def _on_extract_iso(self):
+        """Extrae las isosuperficies del campo seleccionado"""
+        values = self._current_field()
+        if self.volume is None or values is None:
+            return
+        
+        try:
+            iso_values = self._parse_iso_values(values)
+        except ValueError:
+            QMessageBox.warning(self, "Isovalores", "Los isovalores deben ser números separados por coma")
+            return
+        
+        self.iso_values = iso_values
+        self._extract_iso(values)
+    
+    def _extract_iso(self, values):
+        """Genera las isosuperficies y las envía al widget OpenGL"""
+        try:
+            start = time.perf_counter()
+            coords_iso, triangle_indices, iso_vertex_values = extraer_isosuperficies(
+                self.volume['coords'], self.volume['elementos'], values, self.iso_values)
+            elapsed = time.perf_counter() - start
+        except ValueError as e:
+            self.iso_info_label.setText(str(e))
+            return
+        
+        n_triangles = len(triangle_indices) // 3
+        if n_triangles == 0:
+            self.gl_widget.remove_aux_surface(self.ISO_SURFACE_NAME)
+            self.iso_info_label.setText("Ningún elemento corta los isovalores indicados")
+            return
+        
+        value_range = (float(values.min()), float(values.max()))
+        self.gl_widget.set_aux_surface(self.ISO_SURFACE_NAME, coords_iso, triangle_indices,
+                                       iso_vertex_values, value_range)
+        self.iso_info_label.setText(f"{n_triangles} triángulos en {elapsed * 1000:.0f} ms")
+    
+    def _on_clear_iso(self):
+        """Elimina las isosuperficies"""
+        self.iso_values = None
+        self.gl_widget.remove_aux_surface(self.ISO_SURFACE_NAME)
+        self.iso_info_label.setText("Sin isosuperficie")
+    
+    def _threshold_value(self, slider):
+        """Convierte la posición de un slider al valor del campo dentro del rango del filtro"""
+        min_val, max_val = self.threshold_filter.get_rango()
+        fraction = (slider.value() - self.SLIDER_RANGE[0]) / (self.SLIDER_RANGE[1] - self.SLIDER_RANGE[0])
+        return min_val + fraction * (max_val - min_val)
+    
+    def _on_toggle_threshold(self, state):
+        """Activa o desactiva el filtro por umbral"""
+        is_checked = state == Qt.CheckState.Checked.value
+        self._set_threshold_sliders_enabled(is_checked)
+        
+        if not is_checked:
+            self.threshold_filter = None
+            self.gl_widget.remove_aux_surface(self.THRESHOLD_SURFACE_NAME)
+            self.gl_widget.set_model_visible(True)
+            self.threshold_info_label.setText("Filtro inactivo")
+            return
+        
+        values = self._current_field()
+        if self.volume is None or values is None:
+            return
+        
+        # La topología de caras se calcula una sola vez por malla
+        start = time.perf_counter()
+        self.threshold_filter = FiltroUmbral(self.volume['coords'], self.volume['elementos'])
+        self.threshold_filter.set_valores(values)
+        elapsed = time.perf_counter() - start
+        print(f"Filtro por umbral preparado en {elapsed * 1000:.0f} ms")
+        
+        self.gl_widget.set_model_visible(False)
+        self._on_threshold_changed()
+    
+    def _on_threshold_changed(self, *args):
+        """Actualiza incrementalmente la selección y la superficie filtrada"""
+        values = self._current_field()
+        if self.threshold_filter is None or values is None:
+            return
+        
+        lo = self._threshold_value(self.threshold_min_slider)
+        hi = self._threshold_value(self.threshold_max_slider)
+        
+        start = time.perf_counter()
+        n_selected = self.threshold_filter.actualizar(lo, hi)
+        surface = self.threshold_filter.superficie(values)
+        elapsed = time.perf_counter() - start
+        
+        if surface is None:
+            self.gl_widget.remove_aux_surface(self.THRESHOLD_SURFACE_NAME)
+        else:
+            coords, triangle_indices, line_indices, surface_values = surface
+            value_range = (float(values.min()), float(values.max()))
+            self.gl_widget.set_aux_surface(self.THRESHOLD_SURFACE_NAME, coords, triangle_indices,
+                                           surface_values, value_range, line_indices)
+        
+        self.threshold_info_label.setText(
+            f"[{lo:.6g}, {hi:.6g}]: {n_selected} de {self.threshold_filter.n_elementos} "
+            f"elementos ({elapsed * 1000:.0f} ms)")
+    
+    def _refresh_fields(self):
+        """Recalcula los campos escalares del volumen y la lista de campos. Retorna (has_fields, is_volume)"""
+        self.fields = campos_escalares(self.volume['resultados'], len(self.volume['coords']))
+        
+        current = self.field_combo.currentText()
+        self.field_combo.blockSignals(True)
+        self.field_combo.clear()
+        self.field_combo.addItems(list(self.fields.keys()))
+        if current in self.fields:
+            self.field_combo.setCurrentText(current)
+        self.field_combo.blockSignals(False)
+        
+        has_fields = bool(self.fields)
+        is_volume = np.shape(self.volume['elementos'])[1] == 4
+        self.field_combo.setEnabled(has_fields)
+        self._set_iso_controls_enabled(has_fields and is_volume)
+        self.threshold_checkbox.setEnabled(has_fields)
+        return has_fields, is_volume
+    
+    def set_results(self, resultados):
+        """
+        Actualiza solo los resultados de la malla actual (pasos nuevos en modo
+        vigilancia): el filtro por umbral conserva su topología y solo recibe
+        los valores nuevos
+        """
+        if self.volume is None:
+            return
+        self.volume = dict(self.volume, resultados=resultados)
+        has_fields, is_volume = self._refresh_fields()
+        
+        self._on_field_changed(self.field_combo.currentIndex())
+        if self.threshold_checkbox.isChecked():
+            if not has_fields:
+                self.threshold_checkbox.setChecked(False)
+            elif self.threshold_filter is None:
+                self._on_toggle_threshold(Qt.CheckState.Checked.value)
+        
+        values = self._current_field()
+        if self.iso_values is not None and values is not None and is_volume:
+            self._extract_iso(values)
+    
+    def set_volume(self, volume):
+        """Establece la malla de volumen y sus resultados para los filtros"""
+        self.volume = volume
+        has_fields, is_volume = self._refresh_fields()
+        
+        # Un modelo nuevo invalida la topología del filtro por umbral
+        self.threshold_filter = None
+        self._on_field_changed(self.field_combo.currentIndex())
+        if self.threshold_checkbox.isChecked():
+            if has_fields:
+                self._on_toggle_threshold(Qt.CheckState.Checked.value)
+            else:
+                self.threshold_checkbox.setChecked(False)
+        
+        # Mantener las isosuperficies activas al cambiar de modelo
+        values = self._current_field()
+        if self.iso_values is not None and values is not None and is_volume:
+            self._extract_iso(values)
+        else:
+            self.iso_info_label.setText("Sin isosuperficie")
\ No newline at end of file
@@ -81,6 +81,9 @@ class DisplacementsPage(QWidget):
         self.factor_slider.setValue(self.SLIDER_DEFAULT)
         self.factor_slider.setEnabled(False)
         self.factor_slider.valueChanged.connect(self._on_factor_changed)
+        # Mientras se arrastra, las coordenadas cambian en cada cuadro
+        self.factor_slider.sliderPressed.connect(lambda: self.gl_widget.set_streaming_uploads(True))
+        self.factor_slider.sliderReleased.connect(lambda: self.gl_widget.set_streaming_uploads(False))
         layout.addWidget(self.factor_slider)
 
         self.factor_label = QLabel(f"Factor: {self.SLIDER_DEFAULT}")
@@ -11,6 +11,7 @@ from .desplazamientos import DisplacementsPage
 from .paleta import PaletaPage
 from .archivo import ArchivePage
 from .imagen import ImagePage
+from .cortes import CortesPage
 
 class SidePanel(QWidget):
     def __init__(self, gl_widget):
@@ -42,14 +43,17 @@ class SidePanel(QWidget):
         self.displacements_page = DisplacementsPage(self.gl_widget)
         self.palette_page = PaletaPage(self.gl_widget)
         self.image_page = ImagePage(self.gl_widget)
+        self.cortes_page = CortesPage(self.gl_widget)
         
         self.content_stack.addWidget(self.archive_page)
         self.content_stack.addWidget(self.visualization_page)
         self.content_stack.addWidget(self.displacements_page)
         self.content_stack.addWidget(self.palette_page)
         self.content_stack.addWidget(self.image_page)
+        self.content_stack.addWidget(self.cortes_page)
         
         self.archive_page.carpeta_seleccionada.connect(self.image_page.set_carpeta_modelos)
+        self.gl_widget.interaction_changed.connect(self.archive_page.set_interaccion)
         
         self._switch_page(0)
     
@@ -97,6 +101,14 @@ class SidePanel(QWidget):
         )
         icon_layout.addWidget(self.pal_btn)
         
+        # Botón de Cortes
+        self.cut_btn = self._create_icon_button(
+            "icons/corte.svg",
+            "Cortes y Filtros",
+            lambda: self._switch_page(5)
+        )
+        icon_layout.addWidget(self.cut_btn)
+        
         # Botón de Imagen
         self.img_btn = self._create_icon_button(
             "icons/imagen.svg",
@@ -128,6 +140,7 @@ class SidePanel(QWidget):
         self.disp_btn.setChecked(False)
         self.pal_btn.setChecked(False)
         self.img_btn.setChecked(False)
+        self.cut_btn.setChecked(False)
         
         # Marcar el botón correspondiente
         if page_index == 0:
@@ -140,6 +153,8 @@ class SidePanel(QWidget):
             self.pal_btn.setChecked(True)
         elif page_index == 4:
             self.img_btn.setChecked(True)
+        elif page_index == 5:
+            self.cut_btn.setChecked(True)
         
         # Cambiar de página
         self.content_stack.setCurrentIndex(page_index)
\ No newline at end of file
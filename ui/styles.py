@@ -236,6 +236,22 @@ RANGE_LABEL_STYLE = """
     margin-top: 8px;
 """
 
+# Estilo de listas (partes del modelo)
+LIST_WIDGET_STYLE = """
+    QListWidget {
+        background-color: #2a2a2a;
+        border: 1px solid #404040;
+        border-radius: 4px;
+        font-size: 11px;
+    }
+    QListWidget::item {
+        padding: 2px 4px;
+    }
+    QListWidget::item:selected {
+        background-color: #0d7dd6;
+    }
+"""
+
 # Estilo del StackedWidget
 STACKED_WIDGET_STYLE = """
     QStackedWidget {
@@ -382,6 +398,34 @@ FILE_SCROLL_AREA_STYLE = """
     }
 """
 
+FILE_LIST_STYLE = """
+    QTreeView {
+        background-color: #2a2a2a;
+        color: #e0e0e0;
+        border: 1px solid #404040;
+        border-radius: 4px;
+        font-size: 11px;
+    }
+    QTreeView::item {
+        padding: 3px 4px;
+    }
+    QTreeView::item:hover {
+        background-color: #353535;
+    }
+    QTreeView::item:selected {
+        background-color: #0d7dd6;
+        color: #ffffff;
+    }
+    QHeaderView::section {
+        background-color: #2d2d2d;
+        color: #c0c0c0;
+        border: none;
+        border-right: 1px solid #404040;
+        padding: 4px 6px;
+        font-size: 11px;
+    }
+"""
+
 PROGRESS_DIALOG_STYLE = """
     QProgressDialog {
         font-size: 13px;
@@ -3,7 +3,7 @@ Página de configuración de visualización
 """
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QGroupBox, QLabel,
                              QComboBox, QSlider, QPushButton, QHBoxLayout,
-                             QDialog)
+                             QDialog, QCheckBox)
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 from .styles import get_page_style, BUTTON_STYLE
@@ -50,6 +50,9 @@ class VisualizationPage(QWidget):
         # Color de fondo
         layout.addWidget(self._create_appearance_group())
 
+        # Rendimiento durante la interacción
+        layout.addWidget(self._create_performance_group())
+
         # Control de cámara
         layout.addWidget(self._create_camera_group())
 
@@ -68,10 +71,27 @@ class VisualizationPage(QWidget):
         self.mode_combo.addItem("Sólido", "solid")
         self.mode_combo.addItem("Alámbrico", "wireframe")
         self.mode_combo.addItem("Combinado", "combined")
+        self.mode_combo.addItem("Aristas visibles", "hidden_line")
         self.mode_combo.setCurrentIndex(2)
         self.mode_combo.currentIndexChanged.connect(self._on_mode_changed)
         mode_layout.addWidget(self.mode_combo)
         
+        # Aristas vivas: descarta las aristas de teselado de zonas planas
+        self.feature_checkbox = QCheckBox("Solo aristas vivas")
+        self.feature_checkbox.stateChanged.connect(self._on_feature_edges_changed)
+        mode_layout.addWidget(self.feature_checkbox)
+        
+        self.feature_label = QLabel("Ángulo mínimo: 30°")
+        self.feature_label.setStyleSheet("font-size: 11px; color: #e0e0e0; font-weight: 600;")
+        mode_layout.addWidget(self.feature_label)
+        
+        self.feature_slider = QSlider(Qt.Orientation.Horizontal)
+        self.feature_slider.setRange(1, 90)
+        self.feature_slider.setValue(30)
+        self.feature_slider.setEnabled(False)
+        self.feature_slider.valueChanged.connect(self._on_feature_edges_changed)
+        mode_layout.addWidget(self.feature_slider)
+        
         return mode_group
     
     def _create_line_width_group(self):
@@ -150,6 +170,56 @@ class VisualizationPage(QWidget):
 
         return appearance_group
     
+    def _create_performance_group(self):
+        """Crea el grupo de rendimiento (nivel de detalle al interactuar)"""
+        performance_group = QGroupBox("Rendimiento")
+        performance_layout = QVBoxLayout(performance_group)
+        performance_layout.setSpacing(8)
+        
+        self.lod_checkbox = QCheckBox("Simplificar al mover la cámara")
+        self.lod_checkbox.setChecked(self.gl_widget.lod_enabled)
+        self.lod_checkbox.stateChanged.connect(self._on_lod_toggled)
+        performance_layout.addWidget(self.lod_checkbox)
+        
+        self.resolution_checkbox = QCheckBox("Reducir resolución al mover la cámara")
+        self.resolution_checkbox.setChecked(self.gl_widget.resolution_manager.enabled)
+        self.resolution_checkbox.stateChanged.connect(self._on_resolution_toggled)
+        performance_layout.addWidget(self.resolution_checkbox)
+        
+        budget = int(self.gl_widget.frame_budget_ms)
+        self.budget_label = QLabel(f"Tiempo por cuadro: {budget} ms")
+        self.budget_label.setStyleSheet("font-size: 11px; color: #e0e0e0; font-weight: 600;")
+        performance_layout.addWidget(self.budget_label)
+        
+        self.budget_slider = QSlider(Qt.Orientation.Horizontal)
+        self.budget_slider.setRange(8, 100)
+        self.budget_slider.setValue(budget)
+        self.budget_slider.valueChanged.connect(self._on_budget_changed)
+        performance_layout.addWidget(self.budget_slider)
+        
+        line_method_label = QLabel("Dibujo de aristas:")
+        performance_layout.addWidget(line_method_label)
+        
+        self.line_method_combo = QComboBox()
+        self.line_method_combo.addItem("Quads instanciados", "instanced")
+        self.line_method_combo.addItem("Geometry shader", "geometry")
+        self.line_method_combo.setCurrentIndex(self.line_method_combo.findData(self.gl_widget.get_line_method()))
+        self.line_method_combo.currentIndexChanged.connect(self._on_line_method_changed)
+        performance_layout.addWidget(self.line_method_combo)
+        
+        self.compact_checkbox = QCheckBox("Buffers compactos (16 bits)")
+        self.compact_checkbox.setToolTip("Posiciones, índices y valores de 16 bits: menos memoria de GPU")
+        self.compact_checkbox.setChecked(self.gl_widget.is_compact_buffers())
+        self.compact_checkbox.stateChanged.connect(self._on_compact_toggled)
+        performance_layout.addWidget(self.compact_checkbox)
+        
+        self.stats_checkbox = QCheckBox("Mostrar tiempos por pasada")
+        self.stats_checkbox.setChecked(self.gl_widget.stats_overlay.isVisible())
+        self.stats_checkbox.stateChanged.connect(self._on_stats_toggled)
+        performance_layout.addWidget(self.stats_checkbox)
+        
+        return performance_group
+    
     def _create_camera_group(self):
         """Crea el grupo de control de cámara"""
         camera_group = QGroupBox("Control de Cámara")
@@ -168,12 +238,45 @@ class VisualizationPage(QWidget):
         mode = self.mode_combo.itemData(index)
         self.gl_widget.set_mode(mode)
     
+    def _on_feature_edges_changed(self, *_):
+        """Aplica el filtro de aristas vivas con el ángulo del deslizador"""
+        enabled = self.feature_checkbox.isChecked()
+        angle = self.feature_slider.value()
+        self.feature_slider.setEnabled(enabled)
+        self.feature_label.setText(f"Ángulo mínimo: {angle}°")
+        self.gl_widget.set_feature_angle(angle if enabled else None)
+    
     def _on_line_width_changed(self, value):
         """Cambia el grosor de las líneas"""
         line_width = value / 10.0
         self.gl_widget.set_line_width(line_width)
         self.width_label.setText(f"Grosor: {line_width:.1f} px")
     
+    def _on_lod_toggled(self, state):
+        """Activa o desactiva la simplificación durante la interacción"""
+        self.gl_widget.set_lod_enabled(state == Qt.CheckState.Checked.value)
+    
+    def _on_resolution_toggled(self, state):
+        """Activa o desactiva la resolución dinámica durante la interacción"""
+        self.gl_widget.set_dynamic_resolution_enabled(state == Qt.CheckState.Checked.value)
+    
+    def _on_budget_changed(self, value):
+        """Cambia el presupuesto de tiempo por cuadro"""
+        self.gl_widget.set_frame_budget(value)
+        self.budget_label.setText(f"Tiempo por cuadro: {value} ms")
+    
+    def _on_line_method_changed(self, index):
+        """Cambia la ruta de dibujo de las aristas"""
+        self.gl_widget.set_line_method(self.line_method_combo.itemData(index))
+    
+    def _on_compact_toggled(self, state):
+        """Activa o desactiva el formato compacto de los buffers del modelo"""
+        self.gl_widget.set_compact_buffers(state == Qt.CheckState.Checked.value)
+    
+    def _on_stats_toggled(self, state):
+        """Muestra u oculta el panel de estadísticas de cuadro"""
+        self.gl_widget.set_stats_overlay_visible(state == Qt.CheckState.Checked.value)
+    
     def _open_solid_color_dialog(self):
         """Abre el diálogo de selección de color de sólido"""
         dialog = ColorPickerDialog(self.solid_color, self)
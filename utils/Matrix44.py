@@ -40,4 +40,10 @@ def create_perspective_projection_from_bounds(left,right,bottom,top,near,far,dty
         ( 0.,  F, 0., 0.),
         (  A,  B,  C,-1.),
         ( 0., 0.,  D, 0.),
-    ), dtype=dtype)
\ No newline at end of file
+    ), dtype=dtype)
+
+def translation(vec, dtype=None):
+
+    matrix = np.identity(4, dtype=dtype)
+    matrix[3, :3] = vec
+    return matrix
@@ -3,5 +3,10 @@ Módulo de utilidades
 """
 from .malla import filtrar_elementos_visibles, mapear_nodos
 from .msh import Lector
+from .campos import valores_nodales, campos_escalares
+from .isosuperficie import extraer_isosuperficies
+from .umbral import FiltroUmbral
 
-__all__ = ['filtrar_elementos_visibles', 'mapear_nodos', 'Lector']
\ No newline at end of file
+__all__ = ['filtrar_elementos_visibles', 'mapear_nodos', 'Lector',
+           'valores_nodales', 'campos_escalares', 'extraer_isosuperficies',
+           'FiltroUmbral']
\ No newline at end of file
@@ -0,0 +1,147 @@
+import os
+import json
+import numpy as np
+from .malla import filtrar_elementos_visibles, mapear_nodos
+
+# Almacén compilado de una carpeta: un directorio por modelo con una columna
+# por archivo .npy (abribles con mmap) y un manifiesto con la firma de los
+# archivos de origen, para descartar las entradas de archivos modificados
+DIRECTORIO = '.compilado'
+MANIFIESTO = 'manifiesto.json'
+VERSION = 1
+CAMPOS = ('desplazamientos', 'esfuerzos_nodos', 'esfuerzos_gauss')
+
+def firma_archivo(ruta):
+    """[tamaño, mtime en ns] de un archivo, o None si no existe"""
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None
+    return [info.st_size, info.st_mtime_ns]
+
+def leer_manifiesto(carpeta):
+    """Entradas del manifiesto de la carpeta ({archivo .msh: entrada}); vacío si no hay o es de otra versión"""
+    ruta = os.path.join(carpeta, DIRECTORIO, MANIFIESTO)
+    try:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if manifiesto.get('version') != VERSION:
+        return {}
+    return manifiesto.get('modelos', {})
+
+def escribir_manifiesto(carpeta, modelos):
+    """Escribe el manifiesto de forma atómica (archivo temporal y reemplazo)"""
+    ruta = os.path.join(carpeta, DIRECTORIO, MANIFIESTO)
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'version': VERSION, 'modelos': modelos}, f, indent=1)
+    os.replace(temporal, ruta)
+
+def entrada_vigente(carpeta, entrada, msh_file, res_file):
+    """Indica si la entrada corresponde a los archivos .msh y .RES actuales (res_file None: sin .RES)"""
+    return (entrada is not None
+            and entrada.get('msh') == firma_archivo(os.path.join(carpeta, msh_file))
+            and entrada.get('res') == (firma_archivo(os.path.join(carpeta, res_file)) if res_file else None))
+
+def _guardar_columna(ruta, valores):
+    """
+    Escribe un .npy en un temporal y lo reemplaza: un modelo abierto con mmap
+    conserva el archivo anterior en lugar de verlo truncado
+    """
+    temporal = ruta + '.tmp'
+    with open(temporal, 'wb') as f:
+        np.save(f, np.ascontiguousarray(valores))
+    os.replace(temporal, ruta)
+
+def guardar_modelo(carpeta, nombre, msh, res):
+    """
+    Escribe las columnas de un modelo ya leído: malla de volumen, campos, y
+    su superficie (la de filtrar_elementos_visibles) con los desplazamientos
+    mapeados a ella. Retorna la entrada del manifiesto sin las firmas de
+    los archivos de origen, que se toman antes de leerlos.
+    """
+    coordenadas, elementos, materiales = msh
+    destino = os.path.join(carpeta, DIRECTORIO, nombre)
+    os.makedirs(destino, exist_ok=True)
+    
+    columnas = {
+        'coords': np.asarray(coordenadas, dtype=np.float64),
+        'elementos': np.asarray(elementos.tolist() if elementos.dtype == object else elementos, dtype=np.int32),
+        'materiales': np.asarray(materiales, dtype=np.int32)
+    }
+    for campo in CAMPOS:
+        if res.get(campo) is not None:
+            columnas[f'{campo}_ids'] = np.asarray(res[campo][0], dtype=np.int32)
+            columnas[f'{campo}_valores'] = np.asarray(res[campo][1], dtype=np.float64)
+    # Los campos con nombre se guardan por posición; los nombres van en la entrada
+    campos = list(res.get('campos', {}))
+    for i, nombre_campo in enumerate(campos):
+        columnas[f'campo{i}_ids'] = np.asarray(res['campos'][nombre_campo][0], dtype=np.int32)
+        columnas[f'campo{i}_valores'] = np.asarray(res['campos'][nombre_campo][1], dtype=np.float64)
+    
+    # La superficie compilada es la que se dibuja: se guarda ya ordenada
+    coords, triangle_indices, line_indices, node_map, grupos = filtrar_elementos_visibles(
+        columnas['coords'], columnas['elementos'], columnas['materiales'], reordenar=True)
+    columnas['sup_coords'] = coords
+    columnas['sup_triangulos'] = triangle_indices
+    columnas['sup_lineas'] = line_indices
+    # node_map se crea en el orden de los nodos de superficie
+    columnas['sup_nodos'] = np.fromiter(node_map.keys(), dtype=np.int64, count=len(node_map))
+    if res.get('desplazamientos') is not None:
+        columnas['sup_desplazamientos'] = mapear_nodos(res['desplazamientos'], node_map)
+    if grupos is not None:
+        columnas['grupos_materiales'] = np.asarray(grupos['materiales'])
+        columnas['grupos_triangulos'] = np.asarray(grupos['triangulos'], dtype=np.int64)
+        columnas['grupos_lineas'] = np.asarray(grupos['lineas'], dtype=np.int64)
+    
+    for columna, valores in columnas.items():
+        _guardar_columna(os.path.join(destino, columna + '.npy'), valores)
+    
+    return {
+        'directorio': nombre,
+        'columnas': sorted(columnas),
+        'nodos': len(columnas['coords']),
+        'elementos': len(columnas['elementos']),
+        'campos': campos
+    }
+
+def cargar_modelo(carpeta, entrada):
+    """
+    Abre las columnas de un modelo compilado con mmap_mode='r' (solo lectura:
+    los datos se leen del disco al usarse). Retorna el documento de
+    Lector.obtener_modelo con la superficie precalculada en 'superficie'.
+    """
+    destino = os.path.join(carpeta, DIRECTORIO, entrada['directorio'])
+    columnas = {columna: np.load(os.path.join(destino, columna + '.npy'), mmap_mode='r')
+                for columna in entrada['columnas']}
+    
+    res = {campo: None for campo in CAMPOS}
+    for campo in CAMPOS:
+        if f'{campo}_ids' in columnas:
+            res[campo] = (columnas[f'{campo}_ids'], columnas[f'{campo}_valores'])
+    if entrada.get('campos'):
+        res['campos'] = {nombre: (columnas[f'campo{i}_ids'], columnas[f'campo{i}_valores'])
+                         for i, nombre in enumerate(entrada['campos'])}
+    
+    grupos = None
+    if 'grupos_materiales' in columnas:
+        grupos = {
+            'materiales': columnas['grupos_materiales'],
+            'triangulos': tuple(columnas['grupos_triangulos']),
+            'lineas': tuple(columnas['grupos_lineas'])
+        }
+    
+    return {
+        "msh": (columnas['coords'], columnas['elementos'], columnas['materiales']),
+        "res": res,
+        "superficie": {
+            'coords': columnas['sup_coords'],
+            'triangle_indices': columnas['sup_triangulos'],
+            'line_indices': columnas['sup_lineas'],
+            'nodos': columnas['sup_nodos'],
+            'grupos': grupos,
+            'desplazamientos': columnas.get('sup_desplazamientos')
+        }
+    }
@@ -0,0 +1,67 @@
+import numpy as np
+
+def valores_nodales(nodos, n_nodos):
+    """
+    Expande un resultado (ids, valores) a un arreglo por nodo de la malla completa.
+    Los nodos sin resultado quedan en cero.
+    """
+    node_ids, valores = nodos
+    valores = np.asarray(valores, dtype=np.float64)
+    if valores.ndim == 1:
+        valores = valores[:, None]
+    
+    indices = np.asarray(node_ids, dtype=np.int64) - 1
+    validos = (indices >= 0) & (indices < n_nodos)
+    
+    resultado = np.zeros((n_nodos, valores.shape[1]), dtype=np.float64)
+    resultado[indices[validos]] = valores[validos]
+    return resultado
+
+def _von_mises(esfuerzos):
+    """
+    Calcula el esfuerzo de von Mises para tensores 2D (Sxx, Syy, Sxy)
+    o 3D (Sxx, Syy, Szz, Sxy, Syz, Sxz).
+    """
+    if esfuerzos.shape[1] == 3:
+        sx, sy, sxy = esfuerzos.T
+        return np.sqrt(sx**2 - sx * sy + sy**2 + 3.0 * sxy**2)
+    if esfuerzos.shape[1] == 6:
+        sx, sy, sz, sxy, syz, sxz = esfuerzos.T
+        return np.sqrt(0.5 * ((sx - sy)**2 + (sy - sz)**2 + (sz - sx)**2)
+                       + 3.0 * (sxy**2 + syz**2 + sxz**2))
+    return None
+
+def campos_escalares(resultados, n_nodos):
+    """
+    Construye los campos escalares nodales disponibles en un resultado.
+    Retorna un diccionario nombre -> arreglo de n_nodos valores.
+    """
+    campos = {}
+    
+    desplazamientos = resultados.get("desplazamientos")
+    if desplazamientos is not None:
+        disp = valores_nodales(desplazamientos, n_nodos)
+        for i, eje in enumerate("XYZ"):
+            campos[f"Desplazamiento {eje}"] = disp[:, i]
+        campos["Desplazamiento |u|"] = np.linalg.norm(disp, axis=1)
+    
+    esfuerzos = resultados.get("esfuerzos_nodos")
+    if esfuerzos is not None:
+        tensor = valores_nodales(esfuerzos, n_nodos)
+        for i in range(tensor.shape[1]):
+            campos[f"Esfuerzo {i + 1}"] = tensor[:, i]
+        von_mises = _von_mises(tensor)
+        if von_mises is not None:
+            campos["Esfuerzo von Mises"] = von_mises
+    
+    # Otros campos nodales con su nombre (datos de punto de un .vtu)
+    for nombre, campo in resultados.get("campos", {}).items():
+        valores = valores_nodales(campo, n_nodos)
+        if valores.shape[1] == 1:
+            campos[nombre] = valores[:, 0]
+            continue
+        for i in range(valores.shape[1]):
+            campos[f"{nombre} {i + 1}"] = valores[:, i]
+        campos[f"{nombre} |v|"] = np.linalg.norm(valores, axis=1)
+    
+    return campos
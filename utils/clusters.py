@@ -0,0 +1,141 @@
+import numpy as np
+
+def _expandir_bits(valores):
+    """
+    Separa los 10 bits bajos de cada valor dejando dos ceros entre ellos.
+    """
+    v = valores.astype(np.uint32) & 0x3FF
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8)) & 0x0300F00F
+    v = (v | (v << 4)) & 0x030C30C3
+    v = (v | (v << 2)) & 0x09249249
+    return v
+
+def codigos_morton(puntos):
+    """
+    Código de Morton de 30 bits (10 por eje) de cada punto dentro de su caja.
+    """
+    puntos = np.asarray(puntos, dtype=np.float64)
+    minimo = puntos.min(axis=0)
+    extension = np.maximum(puntos.max(axis=0) - minimo, 1e-30)
+    celdas = np.clip((puntos - minimo) / extension * 1023.0, 0, 1023).astype(np.uint32)
+    return (_expandir_bits(celdas[:, 0]) << 2) | (_expandir_bits(celdas[:, 1]) << 1) | _expandir_bits(celdas[:, 2])
+
+def geometria_clusters(coords, triangle_indices, inicios):
+    """
+    Caja, esfera envolvente y cono de normales de cada cluster (triángulos
+    [inicios[k], inicios[k + 1])). El corte del cono es el seno de su
+    semiapertura; vale inf si las normales abarcan más de un hemisferio.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    triangulos = np.asarray(triangle_indices, dtype=np.int64).reshape(-1, 3)
+    v0, v1, v2 = coords[triangulos[:, 0]], coords[triangulos[:, 1]], coords[triangulos[:, 2]]
+    
+    minimo = np.minimum.reduceat(np.minimum(np.minimum(v0, v1), v2), inicios, axis=0)
+    maximo = np.maximum.reduceat(np.maximum(np.maximum(v0, v1), v2), inicios, axis=0)
+    
+    # Eje: suma de normales ponderadas por área; apertura: la normal más alejada del eje
+    normales = np.cross(v1 - v0, v2 - v0)
+    eje = np.add.reduceat(normales, inicios, axis=0)
+    norma_eje = np.linalg.norm(eje, axis=1)
+    eje /= np.where(norma_eje > 0, norma_eje, 1.0)[:, None]
+    
+    norma = np.linalg.norm(normales, axis=1)
+    unitarias = normales / np.where(norma > 0, norma, 1.0)[:, None]
+    conteos = np.diff(np.append(inicios, len(triangulos)))
+    cosenos = np.einsum('ij,ij->i', unitarias, np.repeat(eje, conteos, axis=0))
+    cosenos[norma == 0] = 1.0
+    coseno_min = np.minimum.reduceat(cosenos, inicios)
+    
+    corte = np.full(len(inicios), np.inf)
+    acotado = (coseno_min > 0) & (norma_eje > 0)
+    corte[acotado] = np.sqrt(1.0 - coseno_min[acotado] ** 2)
+    
+    return {
+        'min': minimo,
+        'max': maximo,
+        'centro': 0.5 * (minimo + maximo),
+        'radio': 0.5 * np.linalg.norm(maximo - minimo, axis=1),
+        'eje': eje,
+        'corte': corte
+    }
+
+def construir_clusters(coords, triangle_indices, grupos=None, tam_cluster=65536):
+    """
+    Divide una superficie en clusters espacialmente coherentes.
+    
+    Dentro de cada grupo de material los triángulos se ordenan por la celda
+    de Morton de su centroide y se cortan en bloques de hasta `tam_cluster`
+    triángulos, de modo que los rangos de los grupos no cambian.
+    
+    Retorna (triangle_indices reordenados, clusters) con clusters =
+    {'inicio', 'conteo' (en triángulos), 'grupo' (índice del grupo) y la
+    geometría de geometria_clusters()}.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    triangulos = np.asarray(triangle_indices).reshape(-1, 3)
+    n = len(triangulos)
+    
+    if grupos is None:
+        grupo_inicios = np.zeros(1, dtype=np.int64)
+        grupo_conteos = np.array([n], dtype=np.int64)
+    else:
+        grupo_inicios = np.asarray(grupos['triangulos'][0], dtype=np.int64) // 3
+        grupo_conteos = np.asarray(grupos['triangulos'][1], dtype=np.int64) // 3
+    
+    # Orden de Morton dentro de cada grupo (clave primaria: el grupo). Se usan
+    # celdas de 64³ y el orden es estable, así que dentro de cada celda se
+    # conserva el orden previo de los triángulos (p. ej. el de la caché de vértices)
+    centroides = coords[triangulos].mean(axis=1)
+    morton = codigos_morton(centroides).astype(np.int64) >> 12
+    grupo_tri = np.repeat(np.arange(len(grupo_conteos), dtype=np.int64), grupo_conteos)
+    orden = np.lexsort((morton, grupo_tri))
+    triangulos = triangulos[orden]
+    
+    # Bloques de hasta tam_cluster triángulos que no cruzan grupos
+    bloques = -(-grupo_conteos // tam_cluster)
+    grupo = np.repeat(np.arange(len(grupo_conteos), dtype=np.int64), bloques)
+    indice_en_grupo = np.arange(len(grupo)) - np.repeat(np.cumsum(bloques) - bloques, bloques)
+    inicio = grupo_inicios[grupo] + indice_en_grupo * tam_cluster
+    conteo = np.minimum(tam_cluster, grupo_inicios[grupo] + grupo_conteos[grupo] - inicio)
+    
+    clusters = {'inicio': inicio, 'conteo': conteo, 'grupo': grupo}
+    clusters.update(geometria_clusters(coords, triangulos, inicio))
+    return triangulos.reshape(-1), clusters
+
+def planos_frustum(mvp):
+    """
+    Los 6 planos (a, b, c, d) del volumen de vista de una matriz mvp en
+    convención de vector fila (clip = [x, y, z, 1] @ mvp); dentro: a·p + d >= 0.
+    """
+    m = np.asarray(mvp, dtype=np.float64)
+    x, y, z, w = m[:, 0], m[:, 1], m[:, 2], m[:, 3]
+    return np.stack([w + x, w - x, w + y, w - y, w + z, w - z])
+
+def posicion_camara(mvp):
+    """
+    Posición del ojo en coordenadas del modelo: el punto con clip x = y = w = 0.
+    """
+    m = np.asarray(mvp, dtype=np.float64)
+    columnas = m[:, [0, 1, 3]]
+    return np.linalg.solve(columnas[:3].T, -columnas[3])
+
+def clusters_visibles(clusters, planos, ojo=None):
+    """
+    Máscara de clusters con alguna parte dentro de todos los planos y, si se
+    indica el ojo, que no estén completamente de espaldas a él (cono de normales).
+    """
+    visibles = np.ones(len(clusters['inicio']), dtype=bool)
+    for plano in planos:
+        # Vértice de la caja más adentro respecto al plano
+        normal = plano[:3]
+        vertice = np.where(normal >= 0, clusters['max'], clusters['min'])
+        visibles &= vertice @ normal + plano[3] >= 0
+    
+    if ojo is not None:
+        direccion = clusters['centro'] - ojo
+        distancia = np.linalg.norm(direccion, axis=1)
+        de_espaldas = (np.einsum('ij,ij->i', direccion, clusters['eje'])
+                       >= clusters['corte'] * distancia + clusters['radio'])
+        visibles &= ~de_espaldas
+    return visibles
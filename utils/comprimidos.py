@@ -0,0 +1,70 @@
+import io
+import os
+import gzip
+
+# Archivos de entrada comprimidos: se descomprimen en flujo al leerlos, sin
+# archivos temporales. Se reconocen por la extensión final
+COMPRESIONES = ('.zst', '.gz')
+
+# Extensiones de los archivos de malla: el formato se reconoce por el contenido
+EXTENSIONES_MALLA = ('.msh', '.vtu')
+
+# Tamaño de lectura del flujo comprimido
+TAM_LECTURA = 1 << 20
+
+def compresion(nombre):
+    """Extensión de compresión del archivo ('.zst', '.gz') o '' si es texto plano"""
+    nombre = nombre.lower()
+    for extension in COMPRESIONES:
+        if nombre.endswith(extension):
+            return extension
+    return ''
+
+def sin_compresion(nombre):
+    """Nombre sin la extensión de compresión: 'caso.msh.zst' -> 'caso.msh'"""
+    extension = compresion(nombre)
+    return nombre[:-len(extension)] if extension else nombre
+
+def base_modelo(nombre):
+    """Nombre del modelo sin extensiones: 'caso.msh.zst' -> 'caso'"""
+    return sin_compresion(nombre).rsplit('.', 1)[0]
+
+def es_msh(nombre):
+    """Archivo de malla de un modelo (.msh o .vtu, planos o comprimidos)"""
+    return sin_compresion(nombre).lower().endswith(EXTENSIONES_MALLA)
+
+def es_res(nombre):
+    return sin_compresion(nombre).endswith('.RES')
+
+def archivo_res(carpeta, msh_file):
+    """
+    Archivo .RES de un modelo: el de texto plano si existe, si no uno
+    comprimido; si no hay ninguno, el nombre plano (el lector avisa que falta)
+    """
+    base = base_modelo(msh_file)
+    for extension in ('',) + COMPRESIONES:
+        if os.path.exists(os.path.join(carpeta, base + '.RES' + extension)):
+            return base + '.RES' + extension
+    return base + '.RES'
+
+def abrir_binario(ruta):
+    """
+    Flujo binario del contenido descomprimido (o del archivo si es plano).
+    zstandard solo se importa si hay archivos .zst.
+    """
+    extension = compresion(ruta)
+    if extension == '.gz':
+        return gzip.open(ruta, 'rb')
+    if extension == '.zst':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(f"Se necesita el paquete zstandard para leer {os.path.basename(ruta)}")
+        archivo = open(ruta, 'rb')
+        flujo = zstandard.ZstdDecompressor().stream_reader(archivo, read_size=TAM_LECTURA, closefd=True)
+        return io.BufferedReader(flujo, buffer_size=TAM_LECTURA)
+    return open(ruta, 'rb')
+
+def abrir_texto(ruta, encoding):
+    """Flujo de texto del contenido descomprimido, para iterar o leer por líneas"""
+    return io.TextIOWrapper(abrir_binario(ruta), encoding=encoding)
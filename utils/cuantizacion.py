@@ -0,0 +1,86 @@
+import numpy as np
+
+MAX_UNORM16 = 65535
+
+def cuantizar_posiciones(coords):
+    """
+    Cuantiza posiciones a 16 bits por eje relativos a su caja envolvente.
+    
+    Retorna (q, escala, origen): q es (n, 4) uint16 con la cuarta componente
+    en cero (alineación de 8 bytes, formato RGBA16 de los texture buffer) y
+    la posición se recupera como q[:, :3] / 65535 * (escala * 65535) + origen,
+    es decir, con el atributo normalizado: pos = q_norm * escala + origen.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    origen = coords.min(axis=0)
+    extension = coords.max(axis=0) - origen
+    escala = np.where(extension > 0, extension, 1.0)
+    
+    q = np.zeros((len(coords), 4), dtype=np.uint16)
+    q[:, :3] = np.rint((coords - origen) / escala * MAX_UNORM16)
+    return q, escala.astype(np.float32), origen.astype(np.float32)
+
+def cuantizar_valores(valores):
+    """
+    Cuantiza un campo escalar a unorm16 entre su mínimo y su máximo.
+    Retorna (q, escala, origen) con valor = q_norm * escala + origen.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    finitos = valores[np.isfinite(valores)]
+    origen = float(finitos.min()) if len(finitos) else 0.0
+    extension = float(finitos.max()) - origen if len(finitos) else 0.0
+    escala = extension if extension > 0 else 1.0
+    
+    normalizados = np.nan_to_num((valores - origen) / escala, nan=0.0)
+    q = np.rint(np.clip(normalizados, 0.0, 1.0) * MAX_UNORM16).astype(np.uint16)
+    return q, escala, origen
+
+def indices_por_trozos(triangle_indices, n_vertices, tam_trozo=MAX_UNORM16 // 3):
+    """
+    Índices de 16 bits por trozos de tam_trozo triángulos consecutivos.
+    
+    Cada trozo tiene su propia lista de vértices (a lo sumo 3 * tam_trozo,
+    que caben en 16 bits) y sus índices son locales a ella; los vértices en
+    el borde entre trozos se duplican. Retorna (indices, remapeo, inicios,
+    bases): índices uint16, vértice original de cada vértice subido, primer
+    triángulo de cada trozo y posición de su lista de vértices (vértice base).
+    """
+    triangulos = np.asarray(triangle_indices, dtype=np.int64).reshape(-1, 3)
+    n = len(triangulos)
+    inicios = np.arange(0, n, tam_trozo, dtype=np.int64)
+    trozo = (np.arange(n, dtype=np.int64) // tam_trozo)[:, None]
+    
+    # Un vértice por par (trozo, vértice original), en orden de trozo y de vértice
+    claves, inversa = np.unique(trozo * n_vertices + triangulos, return_inverse=True)
+    remapeo = claves % n_vertices
+    bases = np.searchsorted(claves, np.arange(len(inicios)) * n_vertices)
+    indices = inversa.reshape(-1, 3) - bases[trozo]
+    return indices.astype(np.uint16).reshape(-1), remapeo, inicios, bases
+
+def primera_copia(remapeo, n_vertices):
+    """Para cada vértice original, la posición de una de sus copias subidas"""
+    copia = np.zeros(n_vertices, dtype=np.int64)
+    copia[remapeo[::-1]] = np.arange(len(remapeo))[::-1]
+    return copia
+
+def partir_rangos(inicios_rango, conteos_rango, inicios_trozo, bases):
+    """
+    Parte rangos de índices (en número de índices) en los límites de los
+    trozos de 16 bits. Retorna (rango de origen, inicios, conteos, bases) de
+    cada pieza, en número de índices.
+    """
+    inicios_rango = np.asarray(inicios_rango, dtype=np.int64)
+    finales_rango = inicios_rango + np.asarray(conteos_rango, dtype=np.int64)
+    limites = np.asarray(inicios_trozo, dtype=np.int64) * 3
+    
+    # Trozos que tocan el primer y el último índice de cada rango
+    primero = np.searchsorted(limites, inicios_rango, side='right') - 1
+    ultimo = np.searchsorted(limites, np.maximum(finales_rango - 1, inicios_rango), side='right') - 1
+    piezas = np.where(finales_rango > inicios_rango, ultimo - primero + 1, 0)
+    
+    origen = np.repeat(np.arange(len(inicios_rango)), piezas)
+    trozo = np.repeat(primero, piezas) + (np.arange(piezas.sum()) - np.repeat(np.cumsum(piezas) - piezas, piezas))
+    fin_trozo = np.append(limites, np.iinfo(np.int64).max)[trozo + 1]
+    inicios = np.maximum(inicios_rango[origen], limites[trozo])
+    finales = np.minimum(finales_rango[origen], fin_trozo)
+    return origen, inicios, finales - inicios, bases[trozo]
@@ -0,0 +1,410 @@
+import io
+import os
+import mmap
+import warnings
+import numpy as np
+from .indice import _abrir, TAM_TROZO
+from .comprimidos import abrir_binario
+
+# Lector de mallas Gmsh 4.1 (texto y binario). Las secciones se recorren con
+# un cursor que en binario lee con np.frombuffer directamente sobre el archivo
+# mapeado y en texto sobre los números de la sección ya interpretados, de modo
+# que la misma lógica sirve para los dos formatos
+
+FIRMA = b'$MeshFormat'
+
+# Nodos y dimensión de cada tipo de elemento de Gmsh
+NODOS_POR_TIPO = {1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6, 10: 9,
+                  11: 10, 12: 27, 13: 18, 14: 14, 15: 1, 16: 8, 17: 20, 18: 15,
+                  19: 13, 20: 9, 21: 10, 22: 12, 23: 15, 24: 15, 25: 21, 26: 4,
+                  27: 5, 28: 6, 29: 20, 30: 35, 31: 56, 92: 64, 93: 125}
+DIMENSION_POR_TIPO = {1: 1, 2: 2, 3: 2, 4: 3, 5: 3, 6: 3, 7: 3, 8: 1, 9: 2, 10: 2,
+                      11: 3, 12: 3, 13: 3, 14: 3, 15: 0, 16: 2, 17: 3, 18: 3,
+                      19: 3, 20: 2, 21: 2, 22: 2, 23: 2, 24: 2, 25: 2, 26: 1,
+                      27: 1, 28: 1, 29: 3, 30: 3, 31: 3, 92: 3, 93: 3}
+
+# Tipos que se convierten a los que dibuja el visor (triángulos y tetraedros):
+# los de orden superior conservan sus vértices y los cuadriláteros se parten
+# en dos triángulos
+TRIANGULOS = {2: [[0, 1, 2]], 9: [[0, 1, 2]],
+              3: [[0, 1, 2], [0, 2, 3]], 10: [[0, 1, 2], [0, 2, 3]], 16: [[0, 1, 2], [0, 2, 3]]}
+TETRAEDROS = {4: [[0, 1, 2, 3]], 11: [[0, 1, 2, 3]]}
+
+def es_gmsh(cabecera):
+    """Indica si los primeros bytes de un archivo son de una malla Gmsh"""
+    return cabecera.lstrip().startswith(FIRMA)
+
+class _Cursor:
+    """Lectura secuencial de enteros, tamaños (size_t) y reales de una sección"""
+    
+    def __init__(self, datos, inicio, binario, tam_size_t=8, orden='<'):
+        self.binario = binario
+        if binario:
+            self.datos = datos
+            self.tipos = {'i': np.dtype(orden + 'i4'), 't': np.dtype(f'{orden}u{tam_size_t}'),
+                          'r': np.dtype(orden + 'f8')}
+            self.posicion = inicio
+        else:
+            fin = datos.find(b'$', inicio)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                self.valores = np.fromstring(datos[inicio:len(datos) if fin < 0 else fin], sep=' ')
+            self.posicion = 0
+    
+    def _leer(self, tipo, n):
+        if self.binario:
+            dtype = self.tipos[tipo]
+            valores = np.frombuffer(self.datos, dtype=dtype, count=n, offset=self.posicion)
+            self.posicion += n * dtype.itemsize
+            return valores
+        if self.posicion + n > len(self.valores):
+            raise ValueError("sección incompleta")
+        valores = self.valores[self.posicion:self.posicion + n]
+        self.posicion += n
+        return valores if tipo == 'r' else valores.astype(np.int64)
+    
+    def enteros(self, n):
+        return self._leer('i', n)
+    
+    def tamanos(self, n):
+        return self._leer('t', n)
+    
+    def reales(self, n):
+        return self._leer('r', n)
+    
+    def entero(self):
+        return int(self.enteros(1)[0])
+    
+    def tamano(self):
+        return int(self.tamanos(1)[0])
+
+def _secciones(datos):
+    """Posición del contenido de cada sección ($Nombre -> inicio de la línea siguiente)"""
+    secciones = {}
+    posicion = datos.find(b'$')
+    while posicion >= 0:
+        fin_linea = datos.find(b'\n', posicion)
+        if fin_linea < 0:
+            break
+        nombre = bytes(datos[posicion + 1:fin_linea]).strip().decode('ascii', 'replace')
+        secciones.setdefault(nombre, fin_linea + 1)
+        posicion = datos.find(b'\n$End' + nombre.encode(), fin_linea)
+        if posicion < 0:
+            break
+        posicion = datos.find(b'\n$', datos.find(b'\n', posicion + 1))
+        posicion = posicion + 1 if posicion >= 0 else -1
+    return secciones
+
+def _fisicos(cursor):
+    """Grupo físico de cada entidad ({(dimensión, etiqueta): grupo}) de la sección $Entities"""
+    fisicos = {}
+    cantidades = cursor.tamanos(4)
+    for dimension, cantidad in enumerate(cantidades):
+        for _ in range(int(cantidad)):
+            etiqueta = cursor.entero()
+            cursor.reales(3 if dimension == 0 else 6)
+            grupos = cursor.enteros(cursor.tamano())
+            if len(grupos):
+                fisicos[(dimension, etiqueta)] = abs(int(grupos[0]))
+            if dimension > 0:
+                cursor.enteros(cursor.tamano())
+    return fisicos
+
+def _nodos(cursor):
+    """(etiquetas, coordenadas (n, 3)) de la sección $Nodes"""
+    bloques, total, _, _ = (int(v) for v in cursor.tamanos(4))
+    etiquetas = np.empty(total, dtype=np.int64)
+    coordenadas = np.empty((total, 3), dtype=np.float64)
+    fila = 0
+    for _ in range(bloques):
+        dimension, _ = cursor.enteros(2)
+        parametrico = cursor.entero()
+        n = cursor.tamano()
+        etiquetas[fila:fila + n] = cursor.tamanos(n)
+        columnas = 3 + (int(dimension) if parametrico else 0)
+        coordenadas[fila:fila + n] = cursor.reales(n * columnas).reshape(n, columnas)[:, :3]
+        fila += n
+    return etiquetas[:fila], coordenadas[:fila]
+
+def _elementos(cursor):
+    """Bloques (dimensión, entidad, tipo, nodos (n, k)) de la sección $Elements"""
+    bloques = cursor.tamano()
+    cursor.tamanos(3)
+    resultado = []
+    for _ in range(bloques):
+        dimension, entidad, tipo = (int(v) for v in cursor.enteros(3))
+        n = cursor.tamano()
+        k = NODOS_POR_TIPO.get(tipo)
+        if k is None:
+            raise ValueError(f"tipo de elemento {tipo} desconocido")
+        datos = cursor.tamanos(n * (1 + k)).reshape(n, 1 + k)
+        resultado.append((dimension, entidad, tipo, datos[:, 1:]))
+    return resultado
+
+def _mapa_nodos(etiquetas):
+    """Función que convierte etiquetas de nodos en filas del arreglo de coordenadas"""
+    maximo = int(etiquetas.max()) if len(etiquetas) else 0
+    if maximo < 2 * len(etiquetas) + 1024:
+        # Etiquetas casi contiguas: tabla directa
+        tabla = np.full(maximo + 1, -1, dtype=np.int32)
+        tabla[etiquetas] = np.arange(len(etiquetas), dtype=np.int32)
+        
+        def mapa(nodos):
+            if nodos.size and int(nodos.max()) > maximo:
+                raise ValueError("elementos con nodos que no están en $Nodes")
+            return tabla[nodos]
+    else:
+        orden = np.argsort(etiquetas, kind='stable')
+        
+        def mapa(nodos):
+            posicion = np.clip(np.searchsorted(etiquetas, nodos, sorter=orden), 0, len(etiquetas) - 1)
+            filas = orden[posicion].astype(np.int32)
+            filas[etiquetas[orden[posicion]] != nodos] = -1
+            return filas
+    return mapa
+
+def _malla(bloques, etiquetas, fisicos, nombre):
+    """
+    Elementos y materiales de los bloques que se dibujan: los de mayor
+    dimensión entre triángulos y tetraedros, escritos directamente en los
+    arreglos de salida
+    """
+    volumen = any(tipo in TETRAEDROS for _, _, tipo, _ in bloques)
+    conversion, dimension_dibujo = (TETRAEDROS, 3) if volumen else (TRIANGULOS, 2)
+    ignorados = sum(len(nodos) for _, _, tipo, nodos in bloques
+                    if tipo not in conversion and DIMENSION_POR_TIPO[tipo] >= dimension_dibujo)
+    if ignorados:
+        print(f"Advertencia: {nombre} tiene {ignorados} elementos de tipos no soportados que se omiten")
+    
+    bloques = [b for b in bloques if b[2] in conversion]
+    total = sum(len(nodos) * len(conversion[tipo]) for _, _, tipo, nodos in bloques)
+    if total == 0:
+        return np.array([]), np.array([], dtype=np.int32)
+    
+    mapa = _mapa_nodos(etiquetas)
+    elementos = np.empty((total, dimension_dibujo + 1), dtype=np.int32)
+    materiales = np.empty(total, dtype=np.int32)
+    fila = 0
+    for dimension, entidad, tipo, nodos in bloques:
+        material = fisicos.get((dimension, entidad), entidad)
+        for vertices in conversion[tipo]:
+            filas = slice(fila, fila + len(nodos))
+            elementos[filas] = mapa(nodos if nodos.shape[1] == len(vertices) else nodos[:, vertices])
+            materiales[filas] = material
+            fila += len(nodos)
+    if (elementos < 0).any():
+        raise ValueError("elementos con nodos que no están en $Nodes")
+    return elementos, materiales
+
+def leer_gmsh(ruta):
+    """
+    Lee una malla Gmsh 4.1 de texto o binaria (plana o comprimida).
+    
+    Retorna (coordenadas (n, 3) float64, elementos (m, k) int32 con índices
+    desde 0, materiales (m,) int32) como Lector._leer_msh. Se toman los
+    elementos de la mayor dimensión que el visor puede dibujar; el material
+    es el grupo físico de la entidad de cada elemento (o la entidad si no
+    tiene grupo).
+    """
+    vacio = (np.array([]), np.array([]), np.array([], dtype=np.int32))
+    nombre = os.path.basename(ruta)
+    datos = _abrir(ruta)
+    try:
+        secciones = _secciones(datos)
+        if 'MeshFormat' not in secciones or 'Nodes' not in secciones or 'Elements' not in secciones:
+            print(f"Error al leer {nombre}: faltan secciones de la malla Gmsh")
+            return vacio
+        
+        inicio = secciones['MeshFormat']
+        formato = bytes(datos[inicio:datos.find(b'\n', inicio)]).split()
+        version, binario, tam_size_t = formato[0].decode(), formato[1] == b'1', int(formato[2])
+        if version != '4.1':
+            print(f"Error al leer {nombre}: versión de Gmsh {version} no soportada (se necesita 4.1)")
+            return vacio
+        
+        orden = '<'
+        if binario:
+            # El entero 1 escrito después del formato indica el orden de bytes
+            uno = datos.find(b'\n', inicio) + 1
+            orden = '<' if np.frombuffer(datos, dtype='<i4', count=1, offset=uno)[0] == 1 else '>'
+        
+        def cursor(seccion):
+            return _Cursor(datos, secciones[seccion], binario, tam_size_t, orden)
+        
+        fisicos = _fisicos(cursor('Entities')) if 'Entities' in secciones else {}
+        etiquetas, coordenadas = _nodos(cursor('Nodes'))
+        # En binario los bloques son vistas del archivo mapeado: se convierten
+        # antes de cerrarlo
+        elementos, materiales = _malla(_elementos(cursor('Elements')), etiquetas, fisicos, nombre)
+    except (ValueError, IndexError) as e:
+        print(f"Error al leer {nombre}: {e}")
+        return vacio
+    finally:
+        if isinstance(datos, mmap.mmap):
+            try:
+                datos.close()
+            except BufferError:
+                # Quedan vistas por un error: el mapeo se libera con ellas
+                pass
+    return coordenadas, elementos, materiales
+
+class _Flujo:
+    """
+    Lectura secuencial por trozos de un archivo plano o comprimido: permite
+    recorrer las secciones saltando su contenido sin tenerlo en memoria
+    """
+    
+    def __init__(self, archivo, tam=TAM_TROZO):
+        self.archivo = archivo
+        self.tam = tam
+        self.datos = b''
+        self.posicion = 0
+    
+    def _cargar(self):
+        bloque = self.archivo.read(self.tam)
+        self.datos = self.datos[self.posicion:] + bloque
+        self.posicion = 0
+        return bool(bloque)
+    
+    def leer(self, n):
+        while len(self.datos) - self.posicion < n:
+            if not self._cargar():
+                raise ValueError("archivo incompleto")
+        valores = self.datos[self.posicion:self.posicion + n]
+        self.posicion += n
+        return valores
+    
+    def linea(self):
+        """Línea siguiente sin el salto, o None al final del archivo"""
+        while True:
+            fin = self.datos.find(b'\n', self.posicion)
+            if fin >= 0:
+                linea = self.datos[self.posicion:fin]
+                self.posicion = fin + 1
+                return linea
+            if not self._cargar():
+                linea = self.datos[self.posicion:]
+                self.posicion = len(self.datos)
+                return linea or None
+    
+    def saltar(self, n):
+        """Avanza n bytes; en un archivo plano sin leerlos"""
+        disponible = len(self.datos) - self.posicion
+        if n <= disponible:
+            self.posicion += n
+            return
+        n -= disponible
+        self.datos = b''
+        self.posicion = 0
+        try:
+            self.archivo.seek(n, os.SEEK_CUR)
+        except (OSError, ValueError, io.UnsupportedOperation):
+            while n > 0:
+                bloque = self.archivo.read(min(n, self.tam))
+                if not bloque:
+                    raise ValueError("archivo incompleto")
+                n -= len(bloque)
+    
+    def saltar_lineas(self, n):
+        while n > 0:
+            if self.posicion >= len(self.datos) and not self._cargar():
+                raise ValueError("archivo incompleto")
+            saltos = np.flatnonzero(np.frombuffer(self.datos, dtype=np.uint8, offset=self.posicion) == 10)
+            if len(saltos) >= n:
+                self.posicion += int(saltos[n - 1]) + 1
+                return
+            n -= len(saltos)
+            self.posicion = len(self.datos)
+    
+    def saltar_hasta(self, marca):
+        """Avanza hasta después de la línea que empieza con marca"""
+        patron = b'\n' + marca
+        while True:
+            encontrada = self.datos.find(patron, self.posicion)
+            if encontrada >= 0:
+                self.posicion = encontrada + 1
+                self.linea()
+                return
+            # Se conserva el final por si la marca quedó partida entre trozos
+            self.posicion = max(self.posicion, len(self.datos) - len(patron))
+            if not self._cargar():
+                raise ValueError(f"falta {marca.decode()}")
+
+def escanear_gmsh(ruta):
+    """
+    Metadatos de una malla Gmsh 4.1 para el índice de la carpeta (nodos,
+    elementos, tipo y dimensión, como indice.escanear_modelo) leyendo solo los
+    encabezados de $Nodes y de cada bloque de $Elements. El contenido de los
+    bloques se salta: en binario por su tamaño y en texto contando saltos de
+    línea, recorriendo los archivos comprimidos en flujo.
+    """
+    with abrir_binario(ruta) as archivo:
+        flujo = _Flujo(archivo)
+        linea = flujo.linea()
+        while linea is not None and linea.strip() != FIRMA:
+            linea = flujo.linea()
+        if linea is None:
+            raise ValueError("falta $MeshFormat")
+        formato = (flujo.linea() or b'').split()
+        if len(formato) < 3 or formato[0] != b'4.1':
+            raise ValueError("versión de Gmsh no soportada (se necesita 4.1)")
+        binario, tam_size_t = formato[1] == b'1', int(formato[2])
+        orden = '<'
+        if binario:
+            orden = '<' if np.frombuffer(flujo.leer(4), dtype='<i4')[0] == 1 else '>'
+        entero, tamano = np.dtype(orden + 'i4'), np.dtype(f'{orden}u{tam_size_t}')
+        
+        def enteros(n):
+            return [int(v) for v in np.frombuffer(flujo.leer(n * entero.itemsize), dtype=entero)]
+        
+        def tamanos(n):
+            return [int(v) for v in np.frombuffer(flujo.leer(n * tamano.itemsize), dtype=tamano)]
+        
+        nodos = 0
+        bloques = []
+        while True:
+            linea = flujo.linea()
+            if linea is None:
+                break
+            nombre = linea.strip()
+            if not nombre.startswith(b'$') or nombre.startswith(b'$End'):
+                continue
+            if nombre == b'$Nodes':
+                if not binario:
+                    nodos = int(flujo.linea().split()[1])
+                    flujo.saltar_hasta(b'$EndNodes')
+                    continue
+                n_bloques, nodos, _, _ = tamanos(4)
+                for _ in range(n_bloques):
+                    dimension, _, parametrico = enteros(3)
+                    n = tamanos(1)[0]
+                    flujo.saltar(n * tamano.itemsize + n * (3 + (dimension if parametrico else 0)) * 8)
+            elif nombre == b'$Elements':
+                if binario:
+                    n_bloques = tamanos(4)[0]
+                else:
+                    n_bloques = int(flujo.linea().split()[0])
+                for _ in range(n_bloques):
+                    if binario:
+                        _, _, tipo = enteros(3)
+                        n = tamanos(1)[0]
+                        k = NODOS_POR_TIPO.get(tipo)
+                        if k is None:
+                            raise ValueError(f"tipo de elemento {tipo} desconocido")
+                        flujo.saltar(n * (1 + k) * tamano.itemsize)
+                    else:
+                        _, _, tipo, n = (int(v) for v in flujo.linea().split())
+                        flujo.saltar_lineas(n)
+                    bloques.append((tipo, n))
+                # Los elementos son lo último que se necesita
+                break
+            else:
+                flujo.saltar_hasta(b'$End' + nombre[1:])
+    
+    volumen = any(tipo in TETRAEDROS for tipo, _ in bloques)
+    conversion = TETRAEDROS if volumen else TRIANGULOS
+    elementos = sum(n * len(conversion[tipo]) for tipo, n in bloques if tipo in conversion)
+    dimension = max((DIMENSION_POR_TIPO.get(tipo, 0) for tipo, _ in bloques), default=0)
+    return {'nodos': nodos, 'elementos': elementos,
+            'tipo': 'Tetrahedra' if volumen else ('Triangle' if elementos else ''),
+            'dimension': dimension}
@@ -0,0 +1,442 @@
+import os
+import re
+import json
+import mmap
+import warnings
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from .almacen import DIRECTORIO, firma_archivo
+from .comprimidos import compresion, abrir_binario
+
+# Índice de metadatos de una carpeta, guardado junto al almacén compilado y
+# válido por archivo mientras no cambien su tamaño ni su fecha de modificación
+INDICE = 'indice.json'
+VERSION = 2
+
+# Por debajo de esta cantidad de archivos pendientes no compensa crear procesos
+MIN_ARCHIVOS_PROCESOS = 16
+
+# Tamaño de los trozos en que se recorre un archivo comprimido y máximo del
+# encabezado que se conserva antes de las coordenadas
+TAM_TROZO = 4 << 20
+TAM_ENCABEZADO = 1 << 16
+
+# Bytes del principio de un archivo con que un formato registrado lo reconoce
+TAM_FIRMA = 256
+
+_RE_DIMENSION = re.compile(rb'(?i)\bdimension\s+(\d+)')
+_RE_ELEMTYPE = re.compile(rb'(?i)\belemtype\s+(\w+)')
+
+TIPOS_POR_NODOS = {3: 'Triangle', 4: 'Tetrahedra'}
+
+def _abrir(ruta):
+    """
+    Contenido del archivo mapeado en memoria (bytes vacíos si no existe o
+    está vacío). Un archivo comprimido se descomprime completo en memoria.
+    """
+    try:
+        if compresion(ruta):
+            try:
+                with abrir_binario(ruta) as f:
+                    return f.read()
+            except Exception as e:
+                print(f"Advertencia: no se pudo descomprimir {os.path.basename(ruta)}: {e}")
+                return b''
+        with open(ruta, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except OSError:
+        return b''
+
+def _variantes(marca):
+    """Palabra clave en minúsculas, como título y en mayúsculas"""
+    return list(dict.fromkeys((marca, marca.title(), marca.upper())))
+
+def _buscar(datos, variantes, desde=0):
+    """
+    Primera aparición de alguna de las variantes (búsqueda de bytes, mucho más
+    rápida que una expresión regular). Se busca en ventanas crecientes para que
+    una variante ausente no obligue a recorrer todo el archivo.
+    """
+    ventana = 1 << 16
+    largo = max(len(v) for v in variantes)
+    while desde < len(datos):
+        hasta = min(len(datos), desde + ventana + largo)
+        posiciones = [p for p in (datos.find(v, desde, hasta) for v in variantes) if p >= 0]
+        if posiciones:
+            return min(posiciones)
+        desde += ventana
+        ventana *= 2
+    return -1
+
+def _bloque(datos, marca, desde=0):
+    """(inicio, fin) en bytes de las líneas entre 'marca' y 'end marca', o None si no está"""
+    inicio = _buscar(datos, _variantes(marca), desde)
+    if inicio < 0:
+        return None
+    
+    # El cierre se busca primero con la misma escritura que la apertura
+    escrita = bytes(datos[inicio:inicio + len(marca)])
+    cierre = b'END ' if escrita.isupper() else (b'End ' if escrita[:1].isupper() else b'end ')
+    inicio = datos.find(b'\n', inicio) + 1 or len(datos)
+    fin = datos.find(cierre + escrita, inicio)
+    if fin < 0:
+        fin = _buscar(datos, _variantes(b'end ' + marca), inicio)
+    if fin < 0:
+        fin = len(datos)
+    return inicio, datos.rfind(b'\n', inicio, fin) + 1 or inicio
+
+def _contar_lineas(datos, rango):
+    """Líneas de un bloque contando saltos de línea, sin interpretarlas"""
+    if rango is None:
+        return 0
+    inicio, fin = rango
+    return datos[inicio:fin].count(b'\n')
+
+def _primera_linea(datos, rango):
+    """Columnas de la primera línea de datos de un bloque"""
+    if rango is None:
+        return []
+    inicio, fin = rango
+    return datos[inicio:min(fin, inicio + 4096)].split(b'\n', 1)[0].split()
+
+def _lineas_con(datos, marca):
+    """(texto, fin) de cada línea que contiene la palabra clave"""
+    variantes = _variantes(marca)
+    desde = _buscar(datos, variantes)
+    while desde >= 0:
+        inicio = datos.rfind(b'\n', 0, desde) + 1
+        fin = datos.find(b'\n', desde)
+        fin = len(datos) if fin < 0 else fin
+        yield datos[inicio:fin], fin
+        desde = _buscar(datos, variantes, fin)
+
+def _tipo_resultado(linea):
+    """Clasifica una línea de resultado como lo hace Lector._leer_res"""
+    linea = linea.lower()
+    if b'desplazamientos' in linea:
+        return 'desplazamientos'
+    if b'esfuerzo' in linea and b'gauss' not in linea:
+        return 'esfuerzos_nodos'
+    if b'gauss' in linea:
+        return 'esfuerzos_gauss'
+    return None
+
+def _u_maximo(datos, rango):
+    """Máximo de |u| de un bloque de valores de desplazamientos (id ux uy [uz])"""
+    inicio, fin = rango
+    columnas = len(_primera_linea(datos, rango))
+    lineas = _contar_lineas(datos, rango)
+    if columnas not in (3, 4) or lineas == 0:
+        return None
+    with warnings.catch_warnings():
+        # fromstring avisa si encuentra texto no numérico; se detecta por el tamaño
+        warnings.simplefilter('ignore', DeprecationWarning)
+        valores = np.fromstring(datos[inicio:fin], sep=' ')
+    if valores.size != lineas * columnas:
+        return None
+    valores = valores.reshape(-1, columnas)
+    return float(np.sqrt((valores[:, 1:] ** 2).sum(axis=1)).max())
+
+def _resumen_msh(msh):
+    """Nodos, elementos, tipo y dimensión de un .msh mapeado en memoria"""
+    coordenadas = _bloque(msh, b'coordinates')
+    elementos = _bloque(msh, b'elements', coordenadas[1] if coordenadas else 0)
+    encabezado = msh[:coordenadas[0]] if coordenadas else b''
+    return _datos_malla(encabezado,
+                        _contar_lineas(msh, coordenadas), _primera_linea(msh, coordenadas),
+                        _contar_lineas(msh, elementos), _primera_linea(msh, elementos))
+
+def _datos_malla(encabezado, nodos, primera_coordenada, elementos, primer_elemento):
+    """
+    Metadatos de la malla: tipo y dimensión del encabezado MESH (antes de las
+    coordenadas), o deducidos de la primera línea de cada bloque
+    """
+    dimension = _RE_DIMENSION.search(encabezado)
+    if dimension:
+        dimension = int(dimension.group(1))
+    else:
+        dimension = {4: 3, 3: 2}.get(len(primera_coordenada), 0)
+    tipo = _RE_ELEMTYPE.search(encabezado)
+    tipo = (tipo.group(1).decode('ascii', 'replace') if tipo
+            else TIPOS_POR_NODOS.get(len(primer_elemento) - 2, ''))
+    return {'nodos': nodos, 'elementos': elementos, 'tipo': tipo, 'dimension': dimension}
+
+def _resumen_res(res):
+    """Resultados, pasos y |u| máximo del último paso de un .RES mapeado en memoria"""
+    datos = {'resultados': [], 'pasos': 0, 'u_max': None}
+    ultimo_desplazamiento = None
+    for linea, fin in _lineas_con(res, b'result'):
+        tipo_resultado = _tipo_resultado(linea)
+        if tipo_resultado is None:
+            continue
+        if tipo_resultado not in datos['resultados']:
+            datos['resultados'].append(tipo_resultado)
+        if tipo_resultado == 'desplazamientos':
+            datos['pasos'] += 1
+            ultimo_desplazamiento = fin
+    
+    if ultimo_desplazamiento is not None:
+        valores = _bloque(res, b'values', ultimo_desplazamiento)
+        if valores is not None:
+            datos['u_max'] = _u_maximo(res, valores)
+    return datos
+
+def _trozos(ruta, tam=TAM_TROZO):
+    """
+    Contenido descomprimido en flujo, en trozos que terminan en salto de
+    línea: la memoria queda acotada al trozo más la línea más larga
+    """
+    resto = b''
+    with abrir_binario(ruta) as f:
+        while True:
+            bloque = f.read(tam)
+            if not bloque:
+                break
+            bloque = resto + bloque
+            fin = bloque.rfind(b'\n') + 1
+            resto = bloque[fin:]
+            if fin:
+                yield bloque[:fin]
+    if resto:
+        yield resto + b'\n'
+
+def _resumen_msh_flujo(ruta):
+    """
+    Como _resumen_msh para un archivo comprimido, recorriéndolo por trozos:
+    se buscan las mismas marcas y se cuentan los saltos de línea de cada
+    bloque. La lectura termina al cerrarse el bloque de elementos.
+    """
+    encabezado = b''
+    lineas = {b'coordinates': 0, b'elements': 0}
+    primeras = {b'coordinates': [], b'elements': []}
+    marca = b'coordinates'
+    dentro = None
+    for trozo in _trozos(ruta):
+        bajo = trozo.lower()
+        posicion = 0
+        while posicion < len(trozo) and (marca or dentro):
+            if dentro is None:
+                inicio = bajo.find(marca, posicion)
+                if marca == b'coordinates' and len(encabezado) < TAM_ENCABEZADO:
+                    encabezado += trozo[posicion:len(trozo) if inicio < 0 else inicio]
+                if inicio < 0:
+                    break
+                dentro = marca
+                posicion = bajo.find(b'\n', inicio) + 1
+                if posicion < len(trozo) and not lineas[dentro]:
+                    primeras[dentro] = trozo[posicion:trozo.find(b'\n', posicion)].split()
+                continue
+            
+            cierre = bajo.find(b'end ' + dentro, posicion)
+            hasta = len(trozo) if cierre < 0 else bajo.rfind(b'\n', posicion, cierre) + 1 or posicion
+            if not primeras[dentro] and hasta > posicion:
+                primeras[dentro] = trozo[posicion:trozo.find(b'\n', posicion)].split()
+            lineas[dentro] += trozo.count(b'\n', posicion, hasta)
+            if cierre < 0:
+                break
+            posicion = bajo.find(b'\n', cierre) + 1 or len(trozo)
+            marca = b'elements' if dentro == b'coordinates' else None
+            dentro = None
+        if marca is None and dentro is None:
+            break
+    return _datos_malla(encabezado,
+                        lineas[b'coordinates'], primeras[b'coordinates'],
+                        lineas[b'elements'], primeras[b'elements'])
+
+def _maximo_norma(texto, columnas):
+    """|u| máximo de líneas de desplazamientos (id ux uy [uz]), o None si no tienen esa forma"""
+    lineas = texto.count(b'\n')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', DeprecationWarning)
+        valores = np.fromstring(texto, sep=' ')
+    if columnas not in (3, 4) or lineas == 0 or valores.size != lineas * columnas:
+        return None
+    return float(np.sqrt((valores.reshape(-1, columnas)[:, 1:] ** 2).sum(axis=1)).max())
+
+def _resumen_res_flujo(ruta):
+    """
+    Como _resumen_res para un archivo comprimido, recorriéndolo por trozos.
+    No se sabe cuál es el último paso hasta el final, así que se calcula
+    |u| máximo de cada bloque de desplazamientos y se conserva el último.
+    """
+    datos = {'resultados': [], 'pasos': 0, 'u_max': None}
+    # Estado del bloque de desplazamientos: None, 'esperando' (después de la
+    # línea de resultado, antes de 'values') o 'valores'
+    estado = None
+    columnas = 0
+    maximo = None
+    valido = True
+    for trozo in _trozos(ruta):
+        bajo = trozo.lower()
+        posicion = 0
+        while posicion < len(trozo):
+            if estado == 'valores':
+                cierre = bajo.find(b'end values', posicion)
+                hasta = len(trozo) if cierre < 0 else bajo.rfind(b'\n', posicion, cierre) + 1 or posicion
+                if hasta > posicion and valido:
+                    if not columnas:
+                        columnas = len(trozo[posicion:trozo.find(b'\n', posicion)].split())
+                    parcial = _maximo_norma(trozo[posicion:hasta], columnas)
+                    if parcial is None:
+                        valido = False
+                    else:
+                        maximo = parcial if maximo is None else max(maximo, parcial)
+                if cierre < 0:
+                    break
+                datos['u_max'] = maximo if valido else None
+                estado = None
+                posicion = cierre
+                continue
+            
+            resultado = bajo.find(b'result', posicion)
+            valores = bajo.find(b'values', posicion) if estado == 'esperando' else -1
+            if valores >= 0 and (resultado < 0 or valores < resultado):
+                estado = 'valores'
+                columnas = 0
+                maximo = None
+                valido = True
+                posicion = bajo.find(b'\n', valores) + 1 or len(trozo)
+                continue
+            if resultado < 0:
+                break
+            
+            inicio = trozo.rfind(b'\n', 0, resultado) + 1
+            fin = trozo.find(b'\n', resultado)
+            tipo_resultado = _tipo_resultado(trozo[inicio:fin])
+            if tipo_resultado is not None:
+                if tipo_resultado not in datos['resultados']:
+                    datos['resultados'].append(tipo_resultado)
+                if tipo_resultado == 'desplazamientos':
+                    datos['pasos'] += 1
+                    estado = 'esperando'
+            posicion = fin + 1
+    return datos
+
+def _escaneo_formato(ruta, formatos):
+    """(escanear, con_resultados) del formato registrado que reconoce el archivo, o None"""
+    if not formatos:
+        return None
+    try:
+        with abrir_binario(ruta) as f:
+            cabecera = f.read(TAM_FIRMA)
+    except Exception:
+        return None
+    for reconoce, _, con_resultados, escanear in formatos:
+        if reconoce(cabecera):
+            return escanear, con_resultados
+    return None
+
+def escanear_modelo(carpeta, msh_file, res_file, formatos=()):
+    """
+    Metadatos de un par .msh/.RES leyendo solo los encabezados de sección:
+    nodos y elementos se cuentan por saltos de línea en bytes. Solo se
+    interpretan los valores del último bloque de desplazamientos (el que
+    muestra el visor) para obtener |u| máximo. Los archivos comprimidos se
+    recorren descomprimiendo en flujo, sin tenerlos completos en memoria.
+    Una malla de un formato registrado (formatos, ver Lector.formatos) se
+    escanea con la función del formato; si el formato incluye los resultados
+    no se busca un .RES (res_file None).
+    """
+    ruta_msh = os.path.join(carpeta, msh_file)
+    formato = None
+    try:
+        formato = _escaneo_formato(ruta_msh, formatos)
+        if formato is not None:
+            datos = formato[0](ruta_msh)
+        elif compresion(msh_file):
+            datos = _resumen_msh_flujo(ruta_msh)
+        else:
+            msh = _abrir(ruta_msh)
+            datos = _resumen_msh(msh)
+            _cerrar(msh)
+    except Exception as e:
+        print(f"Advertencia: no se pudo escanear {msh_file}: {e}")
+        datos = _datos_malla(b'', 0, [], 0, [])
+    
+    if res_file is None or (formato is not None and formato[1]):
+        for clave, vacio in (('resultados', []), ('pasos', 0), ('u_max', None)):
+            datos.setdefault(clave, vacio)
+        return datos
+    
+    ruta_res = os.path.join(carpeta, res_file)
+    try:
+        if not os.path.exists(ruta_res):
+            datos.update(resultados=[], pasos=0, u_max=None)
+        elif compresion(res_file):
+            datos.update(_resumen_res_flujo(ruta_res))
+        else:
+            res = _abrir(ruta_res)
+            datos.update(_resumen_res(res))
+            _cerrar(res)
+    except Exception as e:
+        print(f"Advertencia: no se pudo escanear {res_file}: {e}")
+        datos.update(resultados=[], pasos=0, u_max=None)
+    return datos
+
+def _cerrar(contenido):
+    if isinstance(contenido, mmap.mmap):
+        contenido.close()
+
+def _escanear(argumentos):
+    """Adaptador para el grupo de procesos"""
+    return escanear_modelo(*argumentos)
+
+def _leer_indice(carpeta):
+    """Entradas guardadas del índice ({archivo .msh: {'msh', 'res', 'datos'}})"""
+    try:
+        with open(os.path.join(carpeta, DIRECTORIO, INDICE), 'r', encoding='utf-8') as f:
+            indice = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return indice.get('modelos', {}) if indice.get('version') == VERSION else {}
+
+def _escribir_indice(carpeta, modelos):
+    """Guarda el índice (si la carpeta no admite escritura solo se avisa)"""
+    ruta = os.path.join(carpeta, DIRECTORIO, INDICE)
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION, 'modelos': modelos}, f)
+        os.replace(ruta + '.tmp', ruta)
+    except OSError as e:
+        print(f"Advertencia: no se pudo guardar el índice de la carpeta: {e}")
+
+def indexar_carpeta(carpeta, pares, procesos=None, formatos=()):
+    """
+    Metadatos de cada par (archivo .msh, archivo .RES) de la carpeta. Las
+    entradas guardadas con la misma firma se reutilizan; las demás se
+    escanean en un grupo de procesos y se guardan. formatos son los de
+    Lector.formatos (los que tienen función de escaneo). Retorna
+    {archivo .msh: datos}.
+    """
+    formatos = [f for f in formatos if f[3] is not None]
+    guardado = _leer_indice(carpeta)
+    modelos = {}
+    pendientes = []
+    for msh_file, res_file in pares:
+        firmas = {
+            'msh': firma_archivo(os.path.join(carpeta, msh_file)),
+            'res': firma_archivo(os.path.join(carpeta, res_file)) if res_file else None
+        }
+        entrada = guardado.get(msh_file)
+        if entrada is not None and entrada['msh'] == firmas['msh'] and entrada['res'] == firmas['res']:
+            modelos[msh_file] = entrada
+        else:
+            pendientes.append((msh_file, res_file, firmas))
+    
+    argumentos = [(carpeta, msh_file, res_file, formatos) for msh_file, res_file, _ in pendientes]
+    if len(pendientes) < MIN_ARCHIVOS_PROCESOS:
+        resultados = [_escanear(a) for a in argumentos]
+    else:
+        procesos = procesos or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(_escanear, argumentos,
+                                       chunksize=max(1, len(argumentos) // (4 * procesos))))
+    
+    for (msh_file, _, firmas), datos in zip(pendientes, resultados):
+        modelos[msh_file] = dict(firmas, datos=datos)
+    if pendientes or len(modelos) != len(guardado):
+        _escribir_indice(carpeta, modelos)
+    return {msh_file: entrada['datos'] for msh_file, entrada in modelos.items()}
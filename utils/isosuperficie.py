@@ -0,0 +1,112 @@
+import numpy as np
+
+# Aristas del tetraedro (nodos locales)
+TETRA_EDGES = np.array([[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]], dtype=np.int32)
+
+# Tabla de casos: bit i activo si el valor del nodo i supera el isovalor.
+# Cada caso genera hasta dos triángulos, expresados como índices de arista (-1 = sin triángulo)
+CASOS_TETRA = np.array([
+    [-1, -1, -1, -1, -1, -1],  # 0000
+    [ 0,  1,  2, -1, -1, -1],  # 0001 nodo 0
+    [ 0,  3,  4, -1, -1, -1],  # 0010 nodo 1
+    [ 1,  2,  4,  1,  4,  3],  # 0011 nodos 0,1 | 2,3
+    [ 1,  3,  5, -1, -1, -1],  # 0100 nodo 2
+    [ 0,  2,  5,  0,  5,  3],  # 0101 nodos 0,2 | 1,3
+    [ 0,  1,  5,  0,  5,  4],  # 0110 nodos 1,2 | 0,3
+    [ 2,  4,  5, -1, -1, -1],  # 0111 nodo 3
+    [ 2,  4,  5, -1, -1, -1],  # 1000 nodo 3
+    [ 0,  1,  5,  0,  5,  4],  # 1001 nodos 0,3 | 1,2
+    [ 0,  2,  5,  0,  5,  3],  # 1010 nodos 1,3 | 0,2
+    [ 1,  3,  5, -1, -1, -1],  # 1011 nodo 2
+    [ 1,  2,  4,  1,  4,  3],  # 1100 nodos 2,3 | 0,1
+    [ 0,  3,  4, -1, -1, -1],  # 1101 nodo 1
+    [ 0,  1,  2, -1, -1, -1],  # 1110 nodo 0
+    [-1, -1, -1, -1, -1, -1],  # 1111
+], dtype=np.int32).reshape(16, 2, 3)
+
+BITS_CASO = np.array([1, 2, 4, 8], dtype=np.int32)
+
+def extraer_isosuperficies(coords, elementos, valores, isovalores, tam_bloque=1_000_000):
+    """
+    Extrae isosuperficies de un campo nodal sobre una malla de tetraedros.
+    
+    Recorre la conectividad una sola vez por bloques de `tam_bloque` elementos
+    y evalúa todos los isovalores en cada bloque. Los vértices se comparten
+    entre triángulos vecinos identificándolos por la arista que cortan.
+    
+    Retorna (coords_iso, triangle_indices, valores_iso), donde valores_iso es
+    el isovalor de cada vértice para colorearlo con el mapa de colores.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1)
+    isovalores = np.atleast_1d(np.asarray(isovalores, dtype=np.float64))
+    
+    if elementos is None or len(elementos) == 0:
+        raise ValueError("La malla no tiene elementos")
+    if np.shape(elementos)[1] != 4:
+        raise ValueError("Las isosuperficies requieren una malla de tetraedros")
+    
+    n_nodos = np.int64(len(coords))
+    claves_bloques = []
+    arriba_bloques = []
+    
+    for inicio in range(0, len(elementos), tam_bloque):
+        tetras = np.asarray(elementos[inicio:inicio + tam_bloque], dtype=np.int64)
+        valores_tetra = valores[tetras]
+        
+        for k, iso in enumerate(isovalores):
+            casos = (valores_tetra > iso) @ BITS_CASO
+            cortados = np.nonzero((casos != 0) & (casos != 15))[0]
+            if len(cortados) == 0:
+                continue
+            
+            # Hasta dos triángulos por tetraedro cortado
+            aristas = CASOS_TETRA[casos[cortados]].reshape(-1, 3)
+            origen = np.repeat(cortados, 2)
+            validos = aristas[:, 0] >= 0
+            aristas = aristas[validos]
+            origen = origen[validos]
+            
+            # Nodos globales de cada arista cortada
+            nodos_tri = tetras[origen]
+            a = np.take_along_axis(nodos_tri, TETRA_EDGES[aristas, 0], axis=1)
+            b = np.take_along_axis(nodos_tri, TETRA_EDGES[aristas, 1], axis=1)
+            claves = (k * n_nodos + np.minimum(a, b)) * n_nodos + np.maximum(a, b)
+            claves_bloques.append(claves)
+            
+            # Un nodo por encima del isovalor para orientar la normal hacia valores crecientes
+            local_arriba = np.argmax(valores_tetra[origen] > iso, axis=1)
+            arriba_bloques.append(nodos_tri[np.arange(len(origen)), local_arriba])
+    
+    if not claves_bloques:
+        return (np.empty((0, 3), dtype=np.float64), np.empty(0, dtype=np.uint32),
+                np.empty(0, dtype=np.float32))
+    
+    claves = np.concatenate(claves_bloques)
+    nodo_arriba = np.concatenate(arriba_bloques)
+    del claves_bloques, arriba_bloques
+    
+    # Un vértice por arista cortada e isovalor
+    claves_unicas, inversa = np.unique(claves.reshape(-1), return_inverse=True)
+    triangulos = inversa.reshape(-1, 3)
+    
+    iso_idx = claves_unicas // (n_nodos * n_nodos)
+    resto = claves_unicas % (n_nodos * n_nodos)
+    a = resto // n_nodos
+    b = resto % n_nodos
+    
+    va = valores[a]
+    vb = valores[b]
+    iso = isovalores[iso_idx]
+    delta = vb - va
+    t = np.divide(iso - va, delta, out=np.full_like(va, 0.5), where=np.abs(delta) > 1e-300)
+    t = np.clip(t, 0.0, 1.0)[:, None]
+    coords_iso = coords[a] * (1.0 - t) + coords[b] * t
+    
+    # Orientar las normales hacia valores crecientes del campo
+    p0 = coords_iso[triangulos[:, 0]]
+    normales = np.cross(coords_iso[triangulos[:, 1]] - p0, coords_iso[triangulos[:, 2]] - p0)
+    invertir = np.einsum('ij,ij->i', normales, coords[nodo_arriba] - p0) < 0
+    triangulos[invertir] = triangulos[invertir][:, [0, 2, 1]]
+    
+    return coords_iso, triangulos.reshape(-1).astype(np.uint32), iso.astype(np.float32)
@@ -0,0 +1,168 @@
+import os
+import mmap
+import warnings
+import numpy as np
+from multiprocessing import RawArray
+from concurrent.futures import ProcessPoolExecutor
+from .indice import _bloque, _primera_linea
+
+# Lectura de .msh grandes en paralelo: el archivo se mapea en memoria, cada
+# bloque Coordinates/Elements se parte en rangos de bytes alineados a saltos
+# de línea y cada proceso interpreta los suyos directamente sobre los arreglos
+# de salida, que están en memoria compartida. Solo admite bloques regulares
+# (todas las líneas con las mismas columnas, sin líneas vacías ni texto); si
+# no, se usa la lectura secuencial de Lector._leer_msh
+
+# Tamaño a partir del cual Lector._leer_msh usa esta lectura
+TAM_MINIMO = 256 << 20
+
+# Tamaño de cada tarea y del trozo que un proceso interpreta de una vez (la
+# memoria de cada proceso queda acotada a unas veces TAM_TROZO)
+TAM_TAREA = 64 << 20
+TAM_TROZO = 8 << 20
+
+# Estado de cada proceso: el archivo mapeado y las vistas de las salidas
+_datos = None
+_salidas = None
+
+def rangos_alineados(datos, inicio, fin, tam):
+    """Rangos (a, b) de a lo sumo unos tam bytes que cubren [inicio, fin) y terminan en salto de línea"""
+    rangos = []
+    while inicio < fin:
+        corte = min(fin, inicio + tam)
+        if corte < fin:
+            salto = datos.find(b'\n', corte, fin)
+            corte = fin if salto < 0 else salto + 1
+        rangos.append((inicio, corte))
+        inicio = corte
+    return rangos
+
+def _bloques(datos, marca):
+    """
+    Rangos de todos los bloques 'marca', o None si alguno no empieza una
+    línea (el lector secuencial solo reconoce la palabra al inicio)
+    """
+    bloques = []
+    desde = 0
+    while True:
+        rango = _bloque(datos, marca, desde)
+        if rango is None:
+            return bloques
+        apertura = datos.rfind(b'\n', 0, rango[0] - 1) + 1
+        if datos[apertura:rango[0]].strip().lower()[:len(marca)] != marca:
+            return None
+        bloques.append(rango)
+        # Se sigue después de la línea de cierre, que también contiene la marca
+        desde = datos.find(b'\n', rango[1]) + 1 or len(datos)
+
+def _vistas(salidas):
+    """Arreglos numpy sobre la memoria compartida, sin copiarla"""
+    return {nombre: np.frombuffer(memoria, dtype=dtype).reshape(forma)
+            for nombre, (memoria, dtype, forma) in salidas.items()}
+
+def _iniciar(ruta, salidas=None):
+    """Inicializador de los procesos: mapea el archivo y abre las salidas"""
+    global _datos, _salidas
+    with open(ruta, 'rb') as f:
+        _datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    _salidas = _vistas(salidas) if salidas else None
+
+def _contar(rango):
+    """Saltos de línea de un rango, leído por trozos"""
+    inicio, fin = rango
+    return sum(_datos[a:min(fin, a + TAM_TROZO)].count(b'\n') for a in range(inicio, fin, TAM_TROZO))
+
+def _interpretar(tarea):
+    """
+    Interpreta un rango de un bloque y escribe sus filas a partir de 'fila'.
+    Retorna False si el rango no tiene la forma esperada.
+    """
+    tipo, inicio, fin, fila, columnas = tarea
+    dtype = np.float64 if tipo == 'coordenadas' else np.int64
+    for a, b in rangos_alineados(_datos, inicio, fin, TAM_TROZO):
+        texto = _datos[a:b]
+        lineas = texto.count(b'\n')
+        with warnings.catch_warnings():
+            # fromstring avisa si encuentra texto no numérico; se detecta por el tamaño
+            warnings.simplefilter('ignore', DeprecationWarning)
+            valores = np.fromstring(texto, dtype=dtype, sep=' ')
+        if valores.size != lineas * columnas:
+            return False
+        valores = valores.reshape(lineas, columnas)
+        
+        filas = slice(fila, fila + lineas)
+        if tipo == 'coordenadas':
+            # Una malla 2D (id x y) queda con z = 0: la memoria empieza en cero
+            _salidas['coordenadas'][filas, :columnas - 1] = valores[:, 1:]
+        else:
+            _salidas['elementos'][filas] = valores[:, 1:-1] - 1
+            _salidas['materiales'][filas] = valores[:, -1]
+        fila += lineas
+    return True
+
+def leer_msh_paralelo(ruta, procesos=None):
+    """
+    Lee un .msh de texto plano con el mapeo en memoria y un grupo de procesos.
+    
+    Retorna (coordenadas (n, 3) float64, elementos (m, k) int32 con índices
+    desde 0, materiales (m,) int32), como Lector._leer_msh pero con los
+    elementos en un arreglo rectangular, o None si el archivo no tiene bloques
+    regulares. Se hacen dos pasadas: una cuenta las líneas de cada rango (para
+    saber dónde escribe cada uno) y otra las interpreta.
+    """
+    with open(ruta, 'rb') as f:
+        datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        bloques = {
+            'coordenadas': _bloques(datos, b'coordinates'),
+            'elementos': _bloques(datos, b'elements')
+        }
+        if not bloques['coordenadas'] or bloques['elementos'] is None:
+            return None
+        
+        columnas = {tipo: {len(_primera_linea(datos, rango)) for rango in rangos}
+                    for tipo, rangos in bloques.items()}
+        if not columnas['coordenadas'] <= {3, 4} or len(columnas['elementos']) > 1:
+            return None
+        if columnas['elementos'] and min(columnas['elementos']) < 4:
+            return None
+        
+        tareas = []
+        for tipo, rangos in bloques.items():
+            for rango in rangos:
+                n_columnas = len(_primera_linea(datos, rango))
+                tareas += [(tipo, a, b, n_columnas) for a, b in rangos_alineados(datos, *rango, TAM_TAREA)]
+    finally:
+        datos.close()
+    
+    procesos = procesos or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar, initargs=(ruta,)) as pool:
+        lineas = list(pool.map(_contar, [(a, b) for _, a, b, _ in tareas]))
+    
+    # Fila inicial de cada tarea dentro de la salida de su tipo
+    filas = {'coordenadas': 0, 'elementos': 0}
+    asignadas = []
+    for (tipo, a, b, n_columnas), n in zip(tareas, lineas):
+        asignadas.append((tipo, a, b, filas[tipo], n_columnas))
+        filas[tipo] += n
+    
+    n_nodos = max(next(iter(columnas['elementos']), 4) - 2, 1)
+    salidas = {
+        'coordenadas': ('d', np.float64, (filas['coordenadas'], 3)),
+        'elementos': ('i', np.int32, (filas['elementos'], n_nodos)),
+        'materiales': ('i', np.int32, (filas['elementos'],))
+    }
+    try:
+        salidas = {nombre: (RawArray(codigo, int(np.prod(forma))), dtype, forma)
+                   for nombre, (codigo, dtype, forma) in salidas.items()}
+    except (OSError, MemoryError) as e:
+        print(f"Advertencia: no hay memoria compartida para la lectura en paralelo: {e}")
+        return None
+    
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar, initargs=(ruta, salidas)) as pool:
+        if not all(pool.map(_interpretar, asignadas)):
+            return None
+    
+    vistas = _vistas(salidas)
+    elementos = vistas['elementos'] if filas['elementos'] else np.array([])
+    return vistas['coordenadas'], elementos, vistas['materiales']
@@ -0,0 +1,145 @@
+import numpy as np
+from .malla import _construir_superficie
+
+def _materiales_por_triangulo(grupos, n_triangulos):
+    """
+    Expande los rangos de grupos a un material por triángulo.
+    """
+    if grupos is None:
+        return None
+    conteos = np.asarray(grupos['triangulos'][1], dtype=np.int64) // 3
+    if conteos.sum() != n_triangulos:
+        return None
+    return np.repeat(np.asarray(grupos['materiales'], dtype=np.int32), conteos)
+
+def _area_superficie(coords, triangulos):
+    """
+    Área total de una superficie triangulada.
+    """
+    a = coords[triangulos[:, 0]]
+    u = coords[triangulos[:, 1]] - a
+    v = coords[triangulos[:, 2]] - a
+    return 0.5 * float(np.linalg.norm(np.cross(u, v), axis=1).sum())
+
+def promediar_en_nivel(nivel, valores):
+    """
+    Promedia valores por vértice (n,) o (n, k) de la malla completa sobre los
+    vértices del nivel. Sirve para coordenadas y para campos escalares.
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    mapa = nivel['mapa']
+    validos = mapa >= 0
+    n = nivel['n_vertices']
+    
+    if valores.ndim == 1:
+        suma = np.bincount(mapa[validos], weights=valores[validos], minlength=n)
+        return (suma / nivel['pesos']).astype(np.float32)
+    
+    resultado = np.empty((n, valores.shape[1]), dtype=np.float32)
+    for k in range(valores.shape[1]):
+        suma = np.bincount(mapa[validos], weights=valores[validos, k], minlength=n)
+        resultado[:, k] = suma / nivel['pesos']
+    return resultado
+
+def agrupar_vertices(coords, triangle_indices, tam_celda, grupos=None, pesos=None):
+    """
+    Simplifica una superficie por agrupamiento de vértices en una rejilla.
+    
+    Todos los vértices de una celda de lado `tam_celda` se funden en su
+    centroide (ponderado por `pesos` si se indica); los triángulos que quedan
+    degenerados o repetidos se descartan.
+    
+    Retorna un nivel: {'coords', 'triangle_indices', 'line_indices', 'grupos',
+    'mapa' (vértice original -> vértice del nivel, -1 si desaparece),
+    'pesos' (vértices originales por vértice del nivel), 'n_vertices'}.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    triangulos = np.asarray(triangle_indices, dtype=np.int64).reshape(-1, 3)
+    materiales = _materiales_por_triangulo(grupos, len(triangulos))
+    
+    # Celda de cada vértice como clave entera única
+    celdas = np.floor((coords - coords.min(axis=0)) / tam_celda).astype(np.int64)
+    dims = celdas.max(axis=0) + 1
+    claves = (celdas[:, 0] * dims[1] + celdas[:, 1]) * dims[2] + celdas[:, 2]
+    _, cluster = np.unique(claves, return_inverse=True)
+    cluster = cluster.reshape(-1)
+    n_clusters = int(cluster.max()) + 1
+    
+    # Triángulos sobre los clusters: sin degenerados ni duplicados
+    tri = cluster[triangulos]
+    validos = (tri[:, 0] != tri[:, 1]) & (tri[:, 1] != tri[:, 2]) & (tri[:, 2] != tri[:, 0])
+    tri = tri[validos]
+    if materiales is not None:
+        materiales = materiales[validos]
+    
+    ordenados = np.sort(tri, axis=1)
+    clave_tri = (ordenados[:, 0] * n_clusters + ordenados[:, 1]) * n_clusters + ordenados[:, 2]
+    _, primeros = np.unique(clave_tri, return_index=True)
+    primeros.sort()
+    tri = tri[primeros]
+    if materiales is not None:
+        materiales = materiales[primeros]
+    
+    # Centroides de los clusters
+    pesos = np.ones(len(coords)) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    conteo = np.bincount(cluster, weights=pesos, minlength=n_clusters)
+    centroides = np.stack([np.bincount(cluster, weights=coords[:, k] * pesos, minlength=n_clusters)
+                           for k in range(3)], axis=1) / conteo[:, None]
+    
+    coords_nivel, tri_nivel, lineas_nivel, nodos, grupos_nivel = _construir_superficie(
+        centroides, tri, materiales)
+    
+    # Vértice original -> vértice compacto del nivel
+    compacto = np.full(n_clusters, -1, dtype=np.int32)
+    compacto[nodos] = np.arange(len(nodos), dtype=np.int32)
+    mapa = compacto[cluster]
+    
+    return {
+        'coords': coords_nivel.astype(np.float32),
+        'triangle_indices': tri_nivel,
+        'line_indices': lineas_nivel,
+        'grupos': grupos_nivel,
+        'mapa': mapa,
+        'pesos': conteo[nodos],
+        'n_vertices': len(nodos)
+    }
+
+def generar_niveles(coords, triangle_indices, grupos=None, min_triangulos=200_000,
+                    factor=4, max_niveles=4):
+    """
+    Genera niveles de detalle cada vez más gruesos de una superficie.
+    
+    Cada nivel apunta a ~1/factor de los vértices del anterior y se construye
+    a partir de él, por lo que solo el primero recorre la malla completa.
+    No se generan niveles para superficies con menos de `min_triangulos`
+    triángulos, ni niveles por debajo de ese tamaño dividido por factor.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    triangulos = np.asarray(triangle_indices, dtype=np.int64).reshape(-1, 3)
+    if len(triangulos) < min_triangulos:
+        return []
+    
+    # Con celdas de lado h, una superficie de área A ocupa ~A / h² celdas
+    area = _area_superficie(coords, triangulos)
+    objetivo = len(coords)
+    niveles = []
+    base = {'coords': coords, 'triangle_indices': triangulos, 'grupos': grupos, 'pesos': None}
+    mapa = np.arange(len(coords), dtype=np.int32)
+    
+    for _ in range(max_niveles):
+        objetivo //= factor
+        if objetivo * 2 < min_triangulos // factor:
+            break
+        tam_celda = np.sqrt(area / max(objetivo, 1))
+        nivel = agrupar_vertices(base['coords'], base['triangle_indices'], tam_celda,
+                                 base['grupos'], base['pesos'])
+        if len(nivel['triangle_indices']) == 0:
+            break
+        
+        # Componer el mapa para que apunte desde la malla completa
+        mapa = np.where(mapa >= 0, nivel['mapa'][np.maximum(mapa, 0)], -1).astype(np.int32)
+        nivel['mapa'] = mapa
+        niveles.append(nivel)
+        base = nivel
+    
+    return niveles
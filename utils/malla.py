@@ -1,12 +1,285 @@
 import numpy as np
-from collections import Counter
+from .clusters import codigos_morton
 
-def filtrar_elementos_visibles(coords, elements):
+TETRA_FACES = np.array([[0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3]], dtype=np.int32)
+TETRA_OPUESTOS = np.array([3, 2, 1, 0], dtype=np.int32)
+
+def _identificar_caras(caras):
+    """
+    Asigna un id a cada cara, igual para las caras que comparten nodos.
+    """
+    a, b, c = caras[:, 0], caras[:, 1], caras[:, 2]
+    menor = np.minimum(np.minimum(a, b), c).astype(np.int64)
+    mayor = np.maximum(np.maximum(a, b), c).astype(np.int64)
+    medio = a.astype(np.int64) + b + c - menor - mayor
+    
+    if len(caras) and mayor.max() < 2**21:
+        # Clave entera única por cara: un solo argsort
+        claves = (menor << 42) | (medio << 21) | mayor
+        orden = np.argsort(claves)
+        claves_orden = claves[orden]
+        nueva = np.empty(len(caras), dtype=bool)
+        nueva[:1] = True
+        np.not_equal(claves_orden[1:], claves_orden[:-1], out=nueva[1:])
+    else:
+        orden = np.lexsort((mayor, medio, menor))
+        caras_orden = np.stack((menor[orden], medio[orden], mayor[orden]), axis=1)
+        nueva = np.empty(len(caras), dtype=bool)
+        nueva[:1] = True
+        np.any(caras_orden[1:] != caras_orden[:-1], axis=1, out=nueva[1:])
+    
+    tipo = np.int32 if len(caras) < 2**31 else np.int64
+    ids = np.empty(len(caras), dtype=tipo)
+    ids[orden] = np.cumsum(nueva, dtype=tipo) - 1
+    return ids, int(np.count_nonzero(nueva))
+
+def _orientar_caras(coords, caras, opuestos):
+    """
+    Orienta las caras para que su normal apunte en sentido contrario al nodo opuesto.
+    """
+    a = coords[caras[:, 0]]
+    u = coords[caras[:, 1]] - a
+    v = coords[caras[:, 2]] - a
+    w = coords[opuestos] - a
+    
+    # Producto triple (u x v) · w por componentes
+    triple = ((u[:, 1] * v[:, 2] - u[:, 2] * v[:, 1]) * w[:, 0]
+              + (u[:, 2] * v[:, 0] - u[:, 0] * v[:, 2]) * w[:, 1]
+              + (u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]) * w[:, 2])
+    hacia_dentro = triple > 0
+    
+    caras = caras.copy()
+    caras[hacia_dentro] = caras[hacia_dentro][:, [0, 2, 1]]
+    return caras
+
+def _rangos_por_material(materiales_ordenados):
+    """
+    Retorna (materiales, inicios, conteos) de un arreglo ya ordenado por material.
+    """
+    materiales, inicios, conteos = np.unique(materiales_ordenados, return_index=True, return_counts=True)
+    return materiales.astype(np.int32), inicios.astype(np.int64), conteos.astype(np.int64)
+
+def acmr(triangle_indices, tam_cache=32, max_triangulos=50000):
+    """
+    Razón media de fallos de caché de vértices (vértices transformados por
+    triángulo) con una caché FIFO de `tam_cache` entradas. Se evalúan los
+    primeros `max_triangulos` triángulos: 3.0 es el peor caso y ~0.5 el
+    límite para mallas regulares.
+    """
+    indices = np.asarray(triangle_indices).reshape(-1)[:3 * max_triangulos].tolist()
+    if not indices:
+        return 0.0
+    entrada = {}
+    fallos = 0
+    for v in indices:
+        e = entrada.get(v)
+        if e is None or fallos - e >= tam_cache:
+            entrada[v] = fallos
+            fallos += 1
+    return fallos / (len(indices) // 3)
+
+def _ordenar_para_cache(coords_array, surface_nodes, triangles_array, materiales=None):
+    """
+    Ordena los nodos de superficie por curva de Morton y los triángulos por
+    su vértice menor (luego el intermedio y el mayor) dentro de cada material.
+    Triángulos vecinos comparten vértices cercanos en la numeración, lo que
+    aprovecha la caché de vértices transformados y la localidad de memoria.
+    Retorna (surface_nodes, triangles_array, materiales) reordenados.
+    """
+    surface_nodes = surface_nodes[np.argsort(codigos_morton(coords_array[surface_nodes]), kind='stable')]
+    
+    rango = np.full(coords_array.shape[0], -1, dtype=np.int64)
+    rango[surface_nodes] = np.arange(len(surface_nodes))
+    vertices = np.sort(rango[triangles_array], axis=1)
+    claves = (vertices[:, 2], vertices[:, 1], vertices[:, 0])
+    if materiales is not None:
+        claves += (materiales,)
+    orden = np.lexsort(claves)
+    
+    triangles_array = triangles_array[orden]
+    if materiales is not None:
+        materiales = materiales[orden]
+    return surface_nodes, triangles_array, materiales
+
+def _construir_superficie(coords_array, triangles_array, materiales=None, reordenar=False):
+    """
+    Reindexa los triángulos de superficie y extrae sus aristas únicas.
+    Si se indica el material de cada triángulo, triángulos y aristas quedan
+    ordenados por material y se retornan sus rangos de dibujo por grupo.
+    Con reordenar, vértices y triángulos se ordenan para la caché de vértices
+    (ver _ordenar_para_cache).
+    """
+    grupos = None
+    if materiales is not None:
+        orden = np.argsort(materiales, kind='stable')
+        triangles_array = triangles_array[orden]
+        materiales = materiales[orden]
+    
+    surface_nodes = np.unique(triangles_array.flatten())
+    
+    if reordenar:
+        surface_nodes, triangles_array, materiales = _ordenar_para_cache(
+            coords_array, surface_nodes, triangles_array, materiales)
+    
+    # Crear mapeo
+    node_map_array = np.full(coords_array.shape[0], -1, dtype=np.int32)
+    node_map_array[surface_nodes] = np.arange(len(surface_nodes), dtype=np.int32)
+    
+    # Reindexar
+    coords_surface = coords_array[surface_nodes]
+    triangles_reindexed = node_map_array[triangles_array]
+    triangle_indices = triangles_reindexed.flatten().astype(np.uint32)
+    
+    # Extraer aristas
+    edges = np.concatenate([
+        triangles_reindexed[:, [0, 1]],
+        triangles_reindexed[:, [1, 2]],
+        triangles_reindexed[:, [2, 0]]
+    ], axis=0)
+    
+    edges_sorted = np.sort(edges, axis=1)
+    edges_complex = edges_sorted[:, 0] + 1j * edges_sorted[:, 1]
+    _, unique_indices = np.unique(edges_complex, return_index=True)
+    
+    if materiales is not None:
+        # Cada arista pertenece al material del primer triángulo que la contiene
+        materiales_aristas = materiales[unique_indices % len(triangles_array)]
+        orden_aristas = np.argsort(materiales_aristas, kind='stable')
+        unique_indices = unique_indices[orden_aristas]
+        
+        grupo_ids, tri_inicios, tri_conteos = _rangos_por_material(materiales)
+        lin_ids, lin_inicios, lin_conteos = _rangos_por_material(materiales_aristas[orden_aristas])
+        
+        # Rangos en número de índices; un material puede no tener aristas propias
+        posicion = np.searchsorted(grupo_ids, lin_ids)
+        lineas_inicios = np.zeros(len(grupo_ids), dtype=np.int64)
+        lineas_conteos = np.zeros(len(grupo_ids), dtype=np.int64)
+        lineas_inicios[posicion] = lin_inicios * 2
+        lineas_conteos[posicion] = lin_conteos * 2
+        grupos = {
+            'materiales': grupo_ids,
+            'triangulos': (tri_inicios * 3, tri_conteos * 3),
+            'lineas': (lineas_inicios, lineas_conteos)
+        }
+    
+    line_indices = edges_sorted[unique_indices].flatten().astype(np.uint32)
+    
+    return coords_surface, triangle_indices, line_indices, surface_nodes, grupos
+
+def angulos_diedros(coords, triangle_indices, line_indices):
+    """
+    Ángulo diedro (grados) en cada arista de una superficie triangulada.
+    
+    Es el ángulo entre las normales de los dos triángulos que comparten la
+    arista: 0 en zonas planas. Las aristas de borde o compartidas por más de
+    dos triángulos reciben 180, para que siempre cuenten como aristas vivas.
+    Si los dos triángulos tienen orientación opuesta (recorren la arista en el
+    mismo sentido) se invierte una de las normales.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    triangulos = np.asarray(triangle_indices, dtype=np.int64).reshape(-1, 3)
+    lineas = np.asarray(line_indices, dtype=np.int64).reshape(-1, 2)
+    n_nodos = np.int64(len(coords))
+    
+    a = coords[triangulos[:, 0]]
+    normales = np.cross(coords[triangulos[:, 1]] - a, coords[triangulos[:, 2]] - a)
+    norma = np.linalg.norm(normales, axis=1)
+    normales /= np.where(norma > 0, norma, 1.0)[:, None]
+    
+    # Aristas dirigidas de cada triángulo (k -> triángulo k // 3)
+    origen = triangulos.reshape(-1)
+    destino = triangulos[:, [1, 2, 0]].reshape(-1)
+    menor = np.minimum(origen, destino)
+    claves = menor * n_nodos + np.maximum(origen, destino)
+    directa = origen == menor
+    
+    orden = np.argsort(claves, kind='stable')
+    claves_orden = claves[orden]
+    unicas, inicios, conteos = np.unique(claves_orden, return_index=True, return_counts=True)
+    
+    angulos_unicos = np.full(len(unicas), 180.0)
+    dobles = conteos == 2
+    k1 = orden[inicios[dobles]]
+    k2 = orden[inicios[dobles] + 1]
+    coseno = np.einsum('ij,ij->i', normales[k1 // 3], normales[k2 // 3])
+    coseno = np.where(directa[k1] == directa[k2], -coseno, coseno)
+    angulos_unicos[dobles] = np.degrees(np.arccos(np.clip(coseno, -1.0, 1.0)))
+    
+    claves_lineas = np.minimum(lineas[:, 0], lineas[:, 1]) * n_nodos + np.maximum(lineas[:, 0], lineas[:, 1])
+    posicion = np.minimum(np.searchsorted(unicas, claves_lineas), max(len(unicas) - 1, 0))
+    angulos = np.full(len(lineas), 180.0, dtype=np.float32)
+    if len(unicas):
+        encontradas = unicas[posicion] == claves_lineas
+        angulos[encontradas] = angulos_unicos[posicion[encontradas]]
+    return angulos
+
+def ordenar_aristas_por_angulo(line_indices, angulos, grupos=None):
+    """
+    Ordena las aristas de mayor a menor ángulo diedro dentro de cada grupo.
+    
+    Los rangos de los grupos no cambian; con este orden, las aristas con
+    ángulo >= umbral son un prefijo de cada grupo. Retorna (line_indices, angulos).
+    """
+    lineas = np.asarray(line_indices).reshape(-1, 2)
+    angulos = np.asarray(angulos, dtype=np.float32)
+    
+    if grupos is None:
+        orden = np.argsort(-angulos, kind='stable')
+    else:
+        inicios, conteos = (np.asarray(v, dtype=np.int64) // 2 for v in grupos['lineas'])
+        grupo = np.zeros(len(lineas), dtype=np.int64)
+        # Etiqueta de grupo por arista a partir de los rangos (los grupos son contiguos)
+        con_aristas = conteos > 0
+        grupo[inicios[con_aristas]] = 1
+        grupo = np.cumsum(grupo)
+        orden = np.lexsort((-angulos, grupo))
+    
+    return lineas[orden].reshape(-1), angulos[orden]
+
+def aristas_vivas_por_grupo(angulos, umbral, inicios, conteos):
+    """
+    Cuenta las aristas con ángulo >= umbral de cada grupo (aristas ya ordenadas
+    con ordenar_aristas_por_angulo; inicios y conteos en aristas).
+    """
+    acumulado = np.concatenate([[0], np.cumsum(np.asarray(angulos) >= umbral)])
+    inicios = np.asarray(inicios, dtype=np.int64)
+    return acumulado[inicios + np.asarray(conteos, dtype=np.int64)] - acumulado[inicios]
+
+def _mapa_nodos(surface_nodes):
+    """
+    Crea el diccionario nodo original -> nodo de superficie.
+    """
+    return {int(old_idx): int(new_idx) for new_idx, old_idx in enumerate(surface_nodes)}
+
+def _materiales_validos(materiales, n_elementos):
+    """
+    Retorna los materiales como arreglo si hay uno por elemento, o None.
+    """
+    if materiales is None:
+        return None
+    materiales = np.asarray(materiales, dtype=np.int32)
+    if len(materiales) != n_elementos:
+        print(f"Advertencia: {len(materiales)} materiales para {n_elementos} elementos, se ignoran")
+        return None
+    return materiales
+
+def filtrar_elementos_visibles(coords, elements, materiales=None, reordenar=False):
     """
     Filtra elementos para renderizar solo la superficie externa.
+    
+    Si se indica el material de cada elemento, los triángulos de superficie se
+    ordenan por material y se retornan los rangos de dibujo de cada grupo
+    ({'materiales', 'triangulos': (inicios, conteos), 'lineas': (inicios, conteos)});
+    en caso contrario grupos es None.
+    
+    Con reordenar (para la superficie que se dibuja), los nodos de superficie
+    siguen una curva de Morton y los triángulos se ordenan para la caché de
+    vértices. node_map refleja el nuevo orden, de modo que mapear_nodos()
+    remapea los campos nodales. La efectividad del orden se mide con
+    OpenGLWidget.benchmark_triangle_order.
     """
     
-    coords_array = np.asarray(coords, dtype=np.float32)
+    coords_array = np.asarray(coords, dtype=np.float64)
     
     # Detectar tipo de geometria
     n_nodes = len(elements[0])
@@ -14,79 +287,36 @@ def filtrar_elementos_visibles(coords, elements):
     # Caso 2D Triangulos
     if n_nodes == 3:
         triangles_array = np.array(elements, dtype=np.int32)
-        surface_nodes = np.unique(triangles_array.flatten())
-        
-        # Crear mapeo
-        node_map_array = np.full(coords_array.shape[0], -1, dtype=np.int32)
-        node_map_array[surface_nodes] = np.arange(len(surface_nodes), dtype=np.int32)
-        
-        # Reindexar
-        coords_surface = coords_array[surface_nodes]
-        triangles_reindexed = node_map_array[triangles_array]
-        triangle_indices = triangles_reindexed.flatten().astype(np.uint32)
-        
-        # Extraer aristas
-        edges = np.concatenate([
-            triangles_reindexed[:, [0, 1]],
-            triangles_reindexed[:, [1, 2]],
-            triangles_reindexed[:, [2, 0]]
-        ], axis=0)
-        
-        edges_sorted = np.sort(edges, axis=1)
-        edges_complex = edges_sorted[:, 0] + 1j * edges_sorted[:, 1]
-        _, unique_indices = np.unique(edges_complex, return_index=True)
-        line_indices = edges_sorted[unique_indices].flatten().astype(np.uint32)
-        
-        node_map = {int(old_idx): int(new_idx) for new_idx, old_idx in enumerate(surface_nodes)}
-        return coords_surface, triangle_indices, line_indices, node_map
+        materiales_tri = _materiales_validos(materiales, len(triangles_array))
+        coords_surface, triangle_indices, line_indices, surface_nodes, grupos = _construir_superficie(
+            coords_array, triangles_array, materiales_tri, reordenar)
+        return coords_surface, triangle_indices, line_indices, _mapa_nodos(surface_nodes), grupos
     
     # Caso 3D Tetraedros
     elif n_nodes == 4:
-        TETRA_FACES = np.array([[0, 1, 2], [0, 1, 3], [0, 2, 3], [1, 2, 3]], dtype=np.int32)
-        
         tetra_array = np.array(elements, dtype=np.int32)
         
         # Generar todas las caras vectorizadamente
-        all_faces = tetra_array[:, TETRA_FACES]
-        all_faces = all_faces.reshape(-1, 3)
-        
-        # Ordenar
-        faces_sorted = np.sort(all_faces, axis=1)
-        
-        # Contar caras usando Counter
-        faces_tuples = [tuple(face) for face in faces_sorted]
-        face_counts = Counter(faces_tuples)
+        all_faces = tetra_array[:, TETRA_FACES].reshape(-1, 3)
+        opuestos = tetra_array[:, TETRA_OPUESTOS].reshape(-1)
         
-        # Extraer solo caras externas
-        external_faces = [all_faces[i] for i, face_tuple in enumerate(faces_tuples) 
-                         if face_counts[face_tuple] == 1]
+        # Las caras externas aparecen una sola vez
+        face_ids, n_caras = _identificar_caras(all_faces)
+        face_counts = np.bincount(face_ids, minlength=n_caras)
+        externas = face_counts[face_ids] == 1
         
-        triangles_array = np.array(external_faces, dtype=np.int32)
-        surface_nodes = np.unique(triangles_array.flatten())
+        # Orientar hacia afuera para distinguir caras traseras expuestas por cortes
+        triangles_array = _orientar_caras(coords_array, all_faces[externas], opuestos[externas])
         
-        # Crear mapeo
-        node_map_array = np.full(coords_array.shape[0], -1, dtype=np.int32)
-        node_map_array[surface_nodes] = np.arange(len(surface_nodes), dtype=np.int32)
+        # Cada cara externa hereda el material de su tetraedro
+        materiales_tetra = _materiales_validos(materiales, len(tetra_array))
+        materiales_tri = None
+        if materiales_tetra is not None:
+            materiales_tri = materiales_tetra[np.nonzero(externas)[0] // 4]
         
-        # Reindexar
-        coords_surface = coords_array[surface_nodes]
-        triangles_reindexed = node_map_array[triangles_array]
-        triangle_indices = triangles_reindexed.flatten().astype(np.uint32)
-        
-        # Extraer aristas
-        edges = np.concatenate([
-            triangles_reindexed[:, [0, 1]],
-            triangles_reindexed[:, [1, 2]],
-            triangles_reindexed[:, [2, 0]]
-        ], axis=0)
-        
-        edges_sorted = np.sort(edges, axis=1)
-        edges_complex = edges_sorted[:, 0] + 1j * edges_sorted[:, 1]
-        _, unique_indices = np.unique(edges_complex, return_index=True)
-        line_indices = edges_sorted[unique_indices].flatten().astype(np.uint32)
-        
-        node_map = {int(old_idx): int(new_idx) for new_idx, old_idx in enumerate(surface_nodes)}
-        return coords_surface, triangle_indices, line_indices, node_map
+        coords_surface, triangle_indices, line_indices, surface_nodes, grupos = _construir_superficie(
+            coords_array, triangles_array, materiales_tri, reordenar)
+        return coords_surface, triangle_indices, line_indices, _mapa_nodos(surface_nodes), grupos
     
     else:
         raise ValueError(f"Tipo de elemento no soportado: {n_nodes} nodos")
@@ -110,5 +340,5 @@ def mapear_nodos(nodos, node_map):
     valid_new = new_indices[valid_mask]
     
     disp_array[valid_new] = np.nan_to_num(lookup[valid_old], nan=0.0)
-            
+    
     return disp_array
\ No newline at end of file
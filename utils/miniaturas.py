@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import numpy as np
+from .almacen import DIRECTORIO, firma_archivo, entrada_vigente
+from .malla import filtrar_elementos_visibles
+from .lod import agrupar_vertices, _area_superficie
+from .msh import Lector
+
+# Miniaturas de una carpeta: un PNG por contenido de malla en
+# .compilado/miniaturas, de modo que una copia o un renombrado del .msh
+# reutiliza la imagen. claves.json recuerda la clave de cada archivo por su
+# firma para no releerlo al volver a abrir la carpeta
+DIRECTORIO_MINIATURAS = 'miniaturas'
+CLAVES = 'claves.json'
+VERSION = 1
+
+# Lado de la imagen en píxeles y tamaño de la superficie que se dibuja
+LADO = 96
+MAX_TRIANGULOS = 20000
+
+def directorio_miniaturas(carpeta):
+    return os.path.join(carpeta, DIRECTORIO, DIRECTORIO_MINIATURAS)
+
+def ruta_miniatura(carpeta, clave):
+    return os.path.join(directorio_miniaturas(carpeta), clave + '.png')
+
+def clave_contenido(ruta, tam_bloque=1 << 20):
+    """
+    Hash del contenido de un archivo (más la versión y el lado de la
+    miniatura, para que un cambio de formato no reutilice imágenes viejas)
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{VERSION}:{LADO}:".encode())
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def leer_claves(carpeta):
+    """Claves guardadas ({archivo .msh: {'msh': firma, 'clave'}})"""
+    try:
+        with open(os.path.join(directorio_miniaturas(carpeta), CLAVES), 'r', encoding='utf-8') as f:
+            claves = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return claves.get('modelos', {}) if claves.get('version') == VERSION else {}
+
+def escribir_claves(carpeta, claves):
+    """Guarda las claves (si la carpeta no admite escritura solo se avisa)"""
+    ruta = os.path.join(directorio_miniaturas(carpeta), CLAVES)
+    try:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION, 'modelos': claves}, f)
+        os.replace(ruta + '.tmp', ruta)
+    except OSError as e:
+        print(f"Advertencia: no se pudieron guardar las claves de miniaturas: {e}")
+
+def clave_vigente(carpeta, claves, msh_file):
+    """Clave guardada de un archivo si su firma no cambió, o None"""
+    entrada = claves.get(msh_file)
+    if entrada is not None and entrada['msh'] == firma_archivo(os.path.join(carpeta, msh_file)):
+        return entrada['clave']
+    return None
+
+def reducir_superficie(coords, triangle_indices, max_triangulos=MAX_TRIANGULOS):
+    """
+    Superficie gruesa para una miniatura: agrupamiento de vértices con celdas
+    del tamaño que deja unos max_triangulos triángulos (el nivel más grueso
+    que se distingue a LADO píxeles)
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    triangulos = np.asarray(triangle_indices, dtype=np.int64).reshape(-1, 3)
+    if len(triangulos) <= max_triangulos:
+        return coords, triangulos
+    
+    # Una superficie cerrada tiene ~2 triángulos por vértice y ~1 vértice por celda
+    tam_celda = np.sqrt(_area_superficie(coords, triangulos) / (max_triangulos / 2))
+    nivel = agrupar_vertices(coords, triangulos, tam_celda)
+    if len(nivel['triangle_indices']) == 0:
+        return coords, triangulos
+    return np.asarray(nivel['coords'], dtype=np.float64), np.asarray(nivel['triangle_indices']).reshape(-1, 3)
+
+def preparar_superficie(carpeta, msh_file, entrada=None):
+    """
+    Superficie reducida de un modelo para su miniatura (se ejecuta en un
+    proceso aparte): usa la superficie del almacén compilado si la entrada
+    está vigente y si no lee el .msh. Retorna (coords float32 centradas en la
+    caja, triángulos uint32 (m, 3)) o None si el modelo no tiene superficie.
+    """
+    lector = Lector()
+    lector.carpeta = carpeta
+    lector.lectura_paralela = False
+    res_file = lector._archivo_res(msh_file)
+    
+    if entrada_vigente(carpeta, entrada, msh_file, res_file):
+        destino = os.path.join(carpeta, DIRECTORIO, entrada['directorio'])
+        coords = np.load(os.path.join(destino, 'sup_coords.npy'), mmap_mode='r')
+        triangulos = np.load(os.path.join(destino, 'sup_triangulos.npy'), mmap_mode='r')
+    else:
+        coordenadas, elementos, materiales = lector._leer_msh(msh_file)
+        if len(coordenadas) == 0 or len(elementos) == 0:
+            return None
+        coords, triangulos, _, _, _ = filtrar_elementos_visibles(coordenadas, elementos, materiales)
+    
+    if len(triangulos) == 0:
+        return None
+    coords, triangulos = reducir_superficie(coords, triangulos)
+    centro = 0.5 * (coords.min(axis=0) + coords.max(axis=0))
+    return (coords - centro).astype(np.float32), triangulos.astype(np.uint32)
+
+def bajar_prioridad():
+    """Inicializador de los procesos de miniaturas: prioridad baja del sistema"""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
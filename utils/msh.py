@@ -1,37 +1,228 @@
 import os
+import re
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .almacen import (DIRECTORIO, firma_archivo, leer_manifiesto, escribir_manifiesto,
+                      entrada_vigente, guardar_modelo, cargar_modelo)
+from .indice import TAM_FIRMA, indexar_carpeta
+from .resultados import LectorResultados
+from .comprimidos import es_msh, es_res, compresion, base_modelo, archivo_res, abrir_texto, abrir_binario
+from .lectura_paralela import TAM_MINIMO, leer_msh_paralelo
+from .gmsh import es_gmsh, leer_gmsh, escanear_gmsh
+from .vtu import es_vtu, leer_vtu, escanear_vtu
+
+def clave_natural(nombre):
+    """Clave de orden natural: 'caso2' antes que 'caso10'"""
+    return [int(parte) if parte.isdigit() else parte.lower() for parte in re.split(r'(\d+)', nombre)]
 
 class Lector:
+    # Formatos de malla además del de GiD: (reconoce, leer, con_resultados,
+    # escanear). reconoce recibe los primeros bytes del archivo
+    # (descomprimidos) y leer la ruta, y retorna (coordenadas, elementos,
+    # materiales) como _leer_msh; si el formato incluye sus resultados
+    # (con_resultados), retorna (malla, resultados como _leer_res) y no se
+    # busca un .RES. escanear (opcional) recibe la ruta y retorna los
+    # metadatos del índice sin leer la malla completa (ver
+    # indice.escanear_modelo). Un archivo que ningún formato reconoce se lee
+    # como GiD
+    formatos = []
+    TAM_FIRMA = TAM_FIRMA
+
+    @classmethod
+    def registrar_formato(cls, reconoce, leer, con_resultados=False, escanear=None):
+        cls.formatos.append((reconoce, leer, con_resultados, escanear))
+
     def __init__(self):
         self.carpeta = None
-        self.archivos_msh = []
+        self._archivos = []
+        self._ordenados = True
         self.total_modelos = 0
+        self._res = None
+        self.compilado = {}
+        self.metadatos = {}
+        self._ultimo_res = None
+        # Formato de cada archivo ({nombre: (firma, (leer, con_resultados) o
+        # None)}): se reconoce una vez mientras el archivo no cambie
+        self._formatos_archivo = {}
+        # Los .msh planos de al menos TAM_MINIMO bytes se leen en paralelo
+        # (ver leer_msh_paralelo); None usa todos los núcleos
+        self.lectura_paralela = True
+        self.procesos = None
 
     def abrir_carpeta(self, carpeta):
         self.carpeta = carpeta
         if not os.path.exists(carpeta):
             raise FileNotFoundError(f"La carpeta {carpeta} no existe")
 
-        self.archivos_msh = sorted([f for f in os.listdir(carpeta) if f.lower().endswith('.msh')])
-        self.total_modelos = len(self.archivos_msh)
+        self._archivos, self._res = self._listar()
+        self._ordenados = False
+        self.total_modelos = len(self._archivos)
+        self.compilado = leer_manifiesto(carpeta)
+        self.metadatos = {}
+        self._formatos_archivo = {}
 
         if self.total_modelos == 0:
             print("Advertencia: No se encontraron archivos .msh en la carpeta.")
         else:
             print(f"Total de modelos cargados: {self.total_modelos}")
+        if self.compilado:
+            print(f"Modelos compilados en la carpeta: {len(self.compilado)}")
+
+    def actualizar_carpeta(self):
+        """
+        Vuelve a listar la carpeta abierta. Retorna (nuevos, eliminados) con
+        los archivos .msh que aparecieron y los que ya no están.
+        """
+        archivos, self._res = self._listar()
+        actuales = set(archivos)
+        anteriores = set(self._archivos)
+        nuevos = sorted(actuales - anteriores, key=clave_natural)
+        eliminados = sorted(anteriores - actuales, key=clave_natural)
+        if nuevos or eliminados:
+            self._archivos = [f for f in self._archivos if f in actuales] + nuevos
+            self._ordenados = False
+            self.total_modelos = len(self._archivos)
+            self.compilado = {f: e for f, e in self.compilado.items() if f in actuales}
+            self._formatos_archivo = {f: c for f, c in self._formatos_archivo.items() if f in actuales}
+        return nuevos, eliminados
+
+    def _listar(self):
+        """
+        Archivos .msh de la carpeta (planos o comprimidos) y el .RES de cada
+        modelo ({nombre base: archivo .RES}, el plano antes que un comprimido).
+        os.scandir obtiene el tipo de cada entrada sin un stat por archivo; el
+        orden natural se calcula al pedir la lista por primera vez.
+        """
+        with os.scandir(self.carpeta) as entradas:
+            nombres = [e.name for e in entradas if e.is_file()]
+        archivos = [n for n in nombres if es_msh(n)]
+        res = {}
+        for nombre in nombres:
+            if es_res(nombre):
+                base = base_modelo(nombre)
+                if base not in res or not compresion(nombre):
+                    res[base] = nombre
+        return archivos, res
+
+    @property
+    def archivos_msh(self):
+        if not self._ordenados:
+            self._archivos.sort(key=clave_natural)
+            self._ordenados = True
+        return self._archivos
+
+    def pares_archivos(self):
+        """Pares (archivo .msh, archivo .RES) en el orden de archivos_msh"""
+        return [(f, self._archivo_res(f)) for f in self.archivos_msh]
+
+    def _archivo_res(self, msh_file):
+        # None si el formato incluye los resultados. Con la carpeta listada
+        # basta el diccionario; si no (procesos del grupo), se busca el
+        # archivo en el disco
+        formato = self._formato_archivo(msh_file)
+        if formato is not None and formato[1]:
+            return None
+        if self._res is not None:
+            return self._res.get(base_modelo(msh_file), base_modelo(msh_file) + '.RES')
+        return archivo_res(self.carpeta, msh_file)
+
+    def indexar(self, procesos=None):
+        """
+        Metadatos de todos los modelos de la carpeta (nodos, elementos, tipo,
+        dimensión, resultados y |u| máximo) a partir de los encabezados, con
+        caché por tamaño y fecha de cada archivo. Retorna {archivo .msh: datos}.
+        """
+        self.metadatos = indexar_carpeta(self.carpeta, self.pares_archivos(), procesos, self.formatos)
+        return self.metadatos
+
+    def compilar_carpeta(self, procesos=None, progreso=None):
+        """
+        Lee todos los pares .msh/.RES de la carpeta en un grupo de procesos y
+        escribe el almacén compilado (columnas .npy y manifiesto, ver
+        utils/almacen.py). Los modelos con una entrada vigente no se vuelven a
+        leer. progreso(hechos, total, archivo) se llama al terminar cada modelo.
+        Retorna el número de modelos compilados.
+        """
+        pendientes = [f for f in self.archivos_msh
+                      if not entrada_vigente(self.carpeta, self.compilado.get(f), f, self._archivo_res(f))]
+        os.makedirs(os.path.join(self.carpeta, DIRECTORIO), exist_ok=True)
+
+        compilados = 0
+        if pendientes:
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                futuros = {pool.submit(_compilar_modelo, self.carpeta, f): f for f in pendientes}
+                for hechos, futuro in enumerate(as_completed(futuros), 1):
+                    msh_file = futuros[futuro]
+                    try:
+                        self.compilado[msh_file] = futuro.result()
+                        compilados += 1
+                    except Exception as e:
+                        print(f"Error al compilar {msh_file}: {e}")
+                    if progreso:
+                        progreso(hechos, len(pendientes), msh_file)
+
+        # Se descartan las entradas de archivos que ya no están en la carpeta
+        presentes = set(self._archivos)
+        self.compilado = {f: e for f, e in self.compilado.items() if f in presentes}
+        escribir_manifiesto(self.carpeta, self.compilado)
+        return compilados
+
+    def _formato(self, ruta):
+        """(leer, con_resultados) del formato registrado que reconoce el archivo, o None"""
+        if not self.formatos:
+            return None
+        try:
+            with abrir_binario(ruta) as f:
+                cabecera = f.read(self.TAM_FIRMA)
+        except Exception:
+            return None
+        for reconoce, leer, con_resultados, _ in self.formatos:
+            if reconoce(cabecera):
+                return leer, con_resultados
+        return None
+
+    def _formato_archivo(self, msh_file):
+        """_formato de un archivo de la carpeta, guardado mientras no cambie su firma"""
+        ruta = os.path.join(self.carpeta, msh_file)
+        firma = firma_archivo(ruta)
+        guardado = self._formatos_archivo.get(msh_file)
+        if guardado is not None and guardado[0] == firma:
+            return guardado[1]
+        formato = self._formato(ruta)
+        self._formatos_archivo[msh_file] = (firma, formato)
+        return formato
 
-    def _leer_msh(self, msh_file):
+    def _leer_msh(self, msh_file, formato=None):
+        """Malla de un archivo; formato es el de _formato_archivo si ya se conoce"""
         ruta = os.path.join(self.carpeta, msh_file)
         
+        if formato is None:
+            formato = self._formato_archivo(msh_file)
+        if formato is not None:
+            leer, con_resultados = formato
+            return leer(ruta)[0] if con_resultados else leer(ruta)
+        
+        if self.lectura_paralela and not compresion(msh_file) and os.path.getsize(ruta) >= TAM_MINIMO:
+            try:
+                resultado = leer_msh_paralelo(ruta, self.procesos)
+            except Exception as e:
+                print(f"Error en la lectura en paralelo de {msh_file}: {e}")
+                resultado = None
+            if resultado is not None:
+                return resultado
+            print(f"{msh_file} no tiene bloques regulares, se lee línea por línea")
+        
         try:
-            with open(ruta, 'r', encoding='utf-8') as f:
+            # Los .msh.zst y .msh.gz se descomprimen en flujo
+            with abrir_texto(ruta, 'utf-8') as f:
                 lineas = f.readlines()
         except Exception as e:
             print(f"Error al leer {msh_file}: {e}")
-            return np.array([]), np.array([])
+            return np.array([]), np.array([]), np.array([], dtype=np.int32)
 
         coordenadas_lista = []
         elementos_lista = []
+        materiales_lista = []
 
         i = 0
         while i < len(lineas):
@@ -71,7 +262,9 @@ class Lector:
                     if len(partes) >= 4:
                         try:
                             nodos = [int(idx) - 1 for idx in partes[1:-1]]
+                            material = int(partes[-1])
                             elementos_lista.append(nodos)
+                            materiales_lista.append(material)
                         except ValueError:
                             pass
                     i += 1
@@ -80,8 +273,9 @@ class Lector:
 
         coordenadas = np.array(coordenadas_lista, dtype=np.float64) if coordenadas_lista else np.array([])
         elementos = np.array(elementos_lista, dtype=object) if elementos_lista else np.array([])
+        materiales = np.array(materiales_lista, dtype=np.int32)
         
-        return coordenadas, elementos
+        return coordenadas, elementos, materiales
 
     def _leer_res(self, res_file):
         ruta = os.path.join(self.carpeta, res_file)
@@ -94,8 +288,8 @@ class Lector:
             }
 
         try:
-            with open(ruta, 'r', encoding='iso-8859-1') as f:
-                lineas = f.readlines()
+            lector = LectorResultados(ruta)
+            lector.actualizar()
         except Exception as e:
             print(f"Error al leer {res_file}: {e}")
             return {
@@ -104,101 +298,52 @@ class Lector:
                 "esfuerzos_gauss": None
             }
 
-        datos = {
-            "desplazamientos": None,
-            "esfuerzos_nodos": None,
-            "esfuerzos_gauss": None
-        }
-
-        seccion_actual = None
-        valores_actuales = []
-        ids_actuales = []
-        tipo_actual = None
-
-        for i, linea in enumerate(lineas):
-            linea_clean = linea.strip().lower()
-
-            # Detectar inicio de sección
-            if 'result' in linea_clean:
-                if 'desplazamientos' in linea_clean:
-                    tipo_actual = "desplazamientos"
-                    seccion_actual = "values"
-                    valores_actuales = []
-                    ids_actuales = []
-                elif 'esfuerzo' in linea_clean and 'gauss' not in linea_clean:
-                    tipo_actual = "esfuerzos_nodos"
-                    seccion_actual = "values"
-                    valores_actuales = []
-                    ids_actuales = []
-                elif 'gauss' in linea_clean:
-                    tipo_actual = "esfuerzos_gauss"
-                    seccion_actual = "values"
-                    valores_actuales = []
-                    ids_actuales = []
-                continue
-
-            # Detectar inicio de bloque values
-            if linea_clean.startswith("values"):
-                seccion_actual = "values"
-                continue
-
-            # Detectar fin de bloque values
-            if linea_clean.startswith("end values"):
-                if tipo_actual and valores_actuales:
-                    if tipo_actual == "desplazamientos":
-                        desplazamientos_procesados = []
-                        for val in valores_actuales:
-                            if len(val) == 3:
-                                desplazamientos_procesados.append(val)
-                            elif len(val) == 4:
-                                desplazamientos_procesados.append(val[1:])
-                        if desplazamientos_procesados:
-                            datos[tipo_actual] = (np.array(ids_actuales, dtype=np.int32), 
-                                                 np.array(desplazamientos_procesados, dtype=np.float64))
-                    else:
-                        datos[tipo_actual] = (np.array(ids_actuales, dtype=np.int32), 
-                                             np.array(valores_actuales, dtype=np.float64))
-                
-                # Resetear para la próxima sección
-                seccion_actual = None
-                tipo_actual = None
-                valores_actuales = []
-                ids_actuales = []
-                continue
-
-            # Procesar líneas de datos dentro de la sección values
-            if seccion_actual == "values" and linea_clean and linea_clean[0].isdigit():
-                partes = linea_clean.split()
-                try:
-                    id_val = int(partes[0])
-                    if tipo_actual == "desplazamientos":
-                        if len(partes) == 4:
-                            valores = list(map(float, partes[1:4]))
-                        elif len(partes) == 3:
-                            valores = list(map(float, partes[1:3]))
-                            valores.append(0.0)
-                        else:
-                            continue
-                    else:
-                        valores = list(map(float, partes[1:]))
-                    
-                    ids_actuales.append(id_val)
-                    valores_actuales.append(valores)
-                    
-                except (ValueError, IndexError):
-                    continue
-
-        return datos
+        # Se conserva el lector del último .RES para seguirlo sin releerlo
+        self._ultimo_res = (res_file, lector)
+        return lector.resultados()
 
     def obtener_modelo(self, indice):
         msh_file = self.archivos_msh[indice]
-        res_file = msh_file.rsplit('.', 1)[0] + '.RES'
+        res_file = self._archivo_res(msh_file)
+
+        # Con una entrada compilada vigente, las columnas se abren con mmap
+        entrada = self.compilado.get(msh_file)
+        if entrada_vigente(self.carpeta, entrada, msh_file, res_file):
+            try:
+                return cargar_modelo(self.carpeta, entrada)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error al abrir {msh_file} compilado, se lee el original: {e}")
+
+        msh, res = self._leer_datos(msh_file, res_file)
         datos = {
-            "msh": self._leer_msh(msh_file),
-            "res": self._leer_res(res_file)
+            "msh": msh,
+            "res": res
         }
         return datos
 
+    def _leer_datos(self, msh_file, res_file):
+        """Malla y resultados de un modelo, de su .RES o del archivo si el formato los incluye"""
+        formato = self._formato_archivo(msh_file)
+        if formato is not None and formato[1]:
+            return formato[0](os.path.join(self.carpeta, msh_file))
+        return self._leer_msh(msh_file, formato), self._leer_res(res_file)
+
+    def seguir_resultados(self, indice):
+        """
+        Lector reanudable del .RES de un modelo (ver LectorResultados) para
+        leer solo los pasos que el solver agregue. Si es el último .RES leído
+        por obtener_modelo se reutiliza su lector, que continúa donde quedó;
+        si no, el lector empieza desde el principio en su primer actualizar().
+        Retorna None si el modelo no tiene .RES (su formato incluye los
+        resultados).
+        """
+        res_file = self._archivo_res(self.archivos_msh[indice])
+        if res_file is None:
+            return None
+        if self._ultimo_res is None or self._ultimo_res[0] != res_file:
+            self._ultimo_res = (res_file, LectorResultados(os.path.join(self.carpeta, res_file)))
+        return self._ultimo_res[1]
+
     def obtener_nombre_modelo(self, indice):
         return self.archivos_msh[indice]
 
@@ -211,4 +356,26 @@ class Lector:
             status.append("Modelos:")
             for i, msh in enumerate(self.archivos_msh):
                 status.append(f"  [{i}] {msh}")
-        return "\n".join(status)
\ No newline at end of file
+        return "\n".join(status)
+Lector.registrar_formato(es_gmsh, leer_gmsh, escanear=escanear_gmsh)
+Lector.registrar_formato(es_vtu, leer_vtu, con_resultados=True, escanear=escanear_vtu)
+
+def _compilar_modelo(carpeta, msh_file):
+    """Lee un par .msh/.RES y escribe sus columnas (se ejecuta en un proceso del grupo)"""
+    lector = Lector()
+    lector.carpeta = carpeta
+    # Los modelos ya se compilan en paralelo
+    lector.lectura_paralela = False
+    res_file = lector._archivo_res(msh_file)
+
+    # Las firmas se toman antes de leer: si el archivo cambia durante la
+    # lectura, la entrada queda desactualizada en lugar de parecer vigente
+    firmas = {
+        'msh': firma_archivo(os.path.join(carpeta, msh_file)),
+        'res': firma_archivo(os.path.join(carpeta, res_file)) if res_file else None
+    }
+    # El directorio lleva el nombre completo del archivo: 'caso.msh',
+    # 'caso.msh.gz' y 'caso.vtu' son modelos distintos
+    entrada = guardar_modelo(carpeta, msh_file, *lector._leer_datos(msh_file, res_file))
+    entrada.update(firmas)
+    return entrada
\ No newline at end of file
@@ -0,0 +1,195 @@
+import os
+import numpy as np
+from .almacen import firma_archivo
+from .comprimidos import compresion, abrir_binario
+from .indice import TAM_TROZO
+
+TIPOS = ('desplazamientos', 'esfuerzos_nodos', 'esfuerzos_gauss')
+
+# Bytes del comienzo del archivo que se comparan para detectar que se reescribió
+TAM_CABECERA = 4096
+
+class LectorResultados:
+    """
+    Lectura reanudable de un archivo .RES.
+    
+    Cada llamada a actualizar() interpreta solo las líneas completas
+    agregadas desde la anterior, conservando el estado del bloque abierto, de
+    modo que un .RES que el solver sigue escribiendo se lee por partes sin
+    volver a interpretar los pasos ya leídos. Como Lector._leer_res, guarda
+    el último bloque de cada tipo; además cuenta los bloques (pasos) leídos.
+    Si el archivo se trunca o cambia su comienzo, se vuelve a leer desde cero.
+    
+    Un .RES comprimido no se puede retomar a mitad del flujo: se vuelve a
+    leer completo solo si cambia su firma. En los dos casos el contenido se
+    interpreta por trozos de TAM_TROZO bytes, sin tenerlo completo en memoria.
+    """
+    
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.reiniciar()
+    
+    def reiniciar(self):
+        """Olvida todo lo leído"""
+        self.posicion = 0
+        self.firma = None
+        self.cabecera = b''
+        self.resto = b''
+        self.pasos = {tipo: 0 for tipo in TIPOS}
+        self.ultimos = {tipo: None for tipo in TIPOS}
+        self.tipo_actual = None
+        self.seccion_actual = None
+        self.ids_actuales = []
+        self.valores_actuales = []
+    
+    def _reescrito(self, f, tamano):
+        """Indica si el archivo se truncó o cambió su comienzo desde la última lectura"""
+        if tamano < self.posicion:
+            return True
+        f.seek(0)
+        return f.read(len(self.cabecera)) != self.cabecera
+    
+    def actualizar(self):
+        """
+        Lee los bytes agregados desde la última llamada. Retorna {tipo: pasos
+        nuevos} con los bloques cerrados en esta llamada (vacío si no hay).
+        """
+        if compresion(self.ruta):
+            firma = firma_archivo(self.ruta)
+            if self.firma is not None and firma == self.firma:
+                return {}
+            self.reiniciar()
+            self.firma = firma
+            antes = dict(self.pasos)
+            with abrir_binario(self.ruta) as f:
+                for trozo in iter(lambda: f.read(TAM_TROZO), b''):
+                    self._consumir(trozo)
+        else:
+            with open(self.ruta, 'rb') as f:
+                tamano = os.fstat(f.fileno()).st_size
+                if self.posicion and self._reescrito(f, tamano):
+                    print(f"{os.path.basename(self.ruta)} se reescribió, se vuelve a leer")
+                    self.reiniciar()
+                antes = dict(self.pasos)
+                # 'resto' se vuelve a leer desde la posición
+                self.resto = b''
+                f.seek(self.posicion)
+                pendiente = tamano - self.posicion
+                while pendiente > 0:
+                    trozo = f.read(min(pendiente, TAM_TROZO))
+                    if not trozo:
+                        break
+                    pendiente -= len(trozo)
+                    self._consumir(trozo)
+        return {tipo: self.pasos[tipo] - antes[tipo] for tipo in TIPOS if self.pasos[tipo] != antes[tipo]}
+    
+    def _consumir(self, trozo):
+        """
+        Interpreta las líneas completas de 'resto' más el trozo. La última
+        línea sin salto puede estar a medio escribir: queda en 'resto' y se
+        interpreta completa con el trozo siguiente o en la próxima llamada
+        """
+        datos = self.resto + trozo
+        fin = datos.rfind(b'\n') + 1
+        self.resto = datos[fin:]
+        if fin == 0:
+            return
+        self._interpretar(datos[:fin].decode('iso-8859-1').split('\n'))
+        if len(self.cabecera) < TAM_CABECERA:
+            self.cabecera = (self.cabecera + datos[:fin])[:TAM_CABECERA]
+        self.posicion += fin
+    
+    def resultados(self):
+        """
+        Último bloque de cada tipo, con el formato de Lector._leer_res. Si el
+        archivo termina sin salto de línea, esa línea se interpreta sobre una
+        copia del estado: cuenta para este resultado sin consumirse.
+        """
+        if not self.resto.strip():
+            return dict(self.ultimos)
+        
+        copia = LectorResultados(self.ruta)
+        copia.ultimos = dict(self.ultimos)
+        copia.pasos = dict(self.pasos)
+        copia.tipo_actual = self.tipo_actual
+        copia.seccion_actual = self.seccion_actual
+        copia.ids_actuales = list(self.ids_actuales)
+        copia.valores_actuales = list(self.valores_actuales)
+        copia._interpretar([self.resto.decode('iso-8859-1')])
+        return dict(copia.ultimos)
+    
+    def _cerrar_bloque(self):
+        """Guarda el bloque de valores que termina y prepara el siguiente"""
+        tipo = self.tipo_actual
+        if tipo and self.valores_actuales:
+            if tipo == "desplazamientos":
+                procesados = []
+                for val in self.valores_actuales:
+                    if len(val) == 3:
+                        procesados.append(val)
+                    elif len(val) == 4:
+                        procesados.append(val[1:])
+                if procesados:
+                    self.ultimos[tipo] = (np.array(self.ids_actuales, dtype=np.int32),
+                                          np.array(procesados, dtype=np.float64))
+                    self.pasos[tipo] += 1
+            else:
+                self.ultimos[tipo] = (np.array(self.ids_actuales, dtype=np.int32),
+                                      np.array(self.valores_actuales, dtype=np.float64))
+                self.pasos[tipo] += 1
+        
+        self.seccion_actual = None
+        self.tipo_actual = None
+        self.valores_actuales = []
+        self.ids_actuales = []
+    
+    def _interpretar(self, lineas):
+        """Las mismas reglas que Lector._leer_res, con el estado entre llamadas"""
+        for linea in lineas:
+            linea_clean = linea.strip().lower()
+            
+            # Inicio de un resultado
+            if 'result' in linea_clean:
+                if 'desplazamientos' in linea_clean:
+                    tipo = "desplazamientos"
+                elif 'esfuerzo' in linea_clean and 'gauss' not in linea_clean:
+                    tipo = "esfuerzos_nodos"
+                elif 'gauss' in linea_clean:
+                    tipo = "esfuerzos_gauss"
+                else:
+                    continue
+                self.tipo_actual = tipo
+                self.seccion_actual = "values"
+                self.valores_actuales = []
+                self.ids_actuales = []
+                continue
+            
+            if linea_clean.startswith("values"):
+                self.seccion_actual = "values"
+                continue
+            
+            if linea_clean.startswith("end values"):
+                self._cerrar_bloque()
+                continue
+            
+            # Líneas de datos dentro del bloque values
+            if self.seccion_actual == "values" and linea_clean and linea_clean[0].isdigit():
+                partes = linea_clean.split()
+                try:
+                    id_val = int(partes[0])
+                    if self.tipo_actual == "desplazamientos":
+                        if len(partes) == 4:
+                            valores = list(map(float, partes[1:4]))
+                        elif len(partes) == 3:
+                            valores = list(map(float, partes[1:3]))
+                            valores.append(0.0)
+                        else:
+                            continue
+                    else:
+                        valores = list(map(float, partes[1:]))
+                    
+                    self.ids_actuales.append(id_val)
+                    self.valores_actuales.append(valores)
+                
+                except (ValueError, IndexError):
+                    continue
@@ -0,0 +1,127 @@
+import numpy as np
+from .malla import TETRA_FACES, TETRA_OPUESTOS, _identificar_caras, _orientar_caras, _construir_superficie
+
+class FiltroUmbral:
+    """
+    Filtro de elementos por rango de valores con actualización incremental.
+    
+    La topología de caras del volumen se calcula una vez. Al fijar un campo,
+    los elementos se ordenan por su valor medio, de modo que la selección
+    [lo, hi] es siempre un intervalo contiguo de ese orden: al mover un
+    límite solo se suman o restan los elementos que lo cruzan.
+    """
+    
+    def __init__(self, coords, elementos):
+        self.coords = np.asarray(coords, dtype=np.float64)
+        self.elementos = np.asarray(elementos, dtype=np.int32)
+        self.n_elementos = len(self.elementos)
+        self.es_volumen = self.elementos.shape[1] == 4
+        
+        if self.es_volumen:
+            self._preparar_caras()
+        
+        self.valores = None
+        self.orden = None
+        self.valores_ordenados = None
+        self.intervalo = (0, 0)
+        self.seleccion = np.zeros(self.n_elementos, dtype=bool)
+    
+    def _preparar_caras(self):
+        """Identifica las caras de todos los tetraedros y sus (hasta dos) apariciones"""
+        caras = self.elementos[:, TETRA_FACES].reshape(-1, 3)
+        self.id_cara, n_caras = _identificar_caras(caras)
+        del caras
+        self.conteo = np.zeros(n_caras, dtype=np.int8)
+        
+        # Apariciones de cada cara (elemento * 4 + cara local): la primera y,
+        # si es interior, la segunda. La orientación se calcula solo para las
+        # caras de frontera al extraer la superficie.
+        tipo = np.int32 if len(self.id_cara) < 2**31 else np.int64
+        apariciones = np.arange(len(self.id_cara), dtype=tipo)
+        self.aparicion_b = np.full(n_caras, -1, dtype=tipo)
+        self.aparicion_b[self.id_cara] = apariciones
+        self.aparicion_a = np.empty(n_caras, dtype=tipo)
+        self.aparicion_a[self.id_cara[::-1]] = apariciones[::-1]
+        self.aparicion_b[self.aparicion_b == self.aparicion_a] = -1
+    
+    def set_valores(self, valores_nodales):
+        """Fija el campo nodal y ordena los elementos por su valor medio"""
+        valores_nodales = np.asarray(valores_nodales, dtype=np.float64).reshape(-1)
+        self.valores = valores_nodales[self.elementos].mean(axis=1)
+        self.orden = np.argsort(self.valores, kind='stable')
+        self.valores_ordenados = self.valores[self.orden]
+        
+        self.intervalo = (0, 0)
+        self.seleccion[:] = False
+        if self.es_volumen:
+            self.conteo[:] = 0
+    
+    def get_rango(self):
+        """Retorna el rango de valores por elemento"""
+        if self.valores_ordenados is None or len(self.valores_ordenados) == 0:
+            return 0.0, 1.0
+        return float(self.valores_ordenados[0]), float(self.valores_ordenados[-1])
+    
+    def _cambiar(self, inicio, fin, agregar):
+        """Agrega o quita los elementos de las posiciones [inicio, fin) del orden"""
+        if fin <= inicio:
+            return
+        indices = self.orden[inicio:fin]
+        self.seleccion[indices] = agregar
+        if self.es_volumen:
+            caras = self.id_cara.reshape(-1, 4)[indices].reshape(-1)
+            np.add.at(self.conteo, caras, 1 if agregar else -1)
+    
+    def actualizar(self, lo, hi):
+        """Ajusta la selección al rango [lo, hi] tocando solo los elementos que cruzan los límites"""
+        if self.valores_ordenados is None:
+            raise RuntimeError("FiltroUmbral sin valores. Llame a set_valores() primero.")
+        
+        nuevo_inicio = int(np.searchsorted(self.valores_ordenados, lo, side='left'))
+        nuevo_fin = int(np.searchsorted(self.valores_ordenados, hi, side='right'))
+        nuevo_fin = max(nuevo_fin, nuevo_inicio)
+        inicio, fin = self.intervalo
+        
+        if nuevo_inicio >= fin or nuevo_fin <= inicio:
+            # Intervalos disjuntos: se reemplaza la selección completa
+            self._cambiar(inicio, fin, False)
+            self._cambiar(nuevo_inicio, nuevo_fin, True)
+        else:
+            self._cambiar(nuevo_inicio, inicio, True)
+            self._cambiar(inicio, nuevo_inicio, False)
+            self._cambiar(fin, nuevo_fin, True)
+            self._cambiar(nuevo_fin, fin, False)
+        
+        self.intervalo = (nuevo_inicio, nuevo_fin)
+        return nuevo_fin - nuevo_inicio
+    
+    def triangulos_frontera(self):
+        """Retorna los triángulos orientados de la frontera del subconjunto seleccionado"""
+        if not self.es_volumen:
+            return self.elementos[self.seleccion]
+        
+        frontera = np.nonzero(self.conteo == 1)[0]
+        a = self.aparicion_a[frontera]
+        b = self.aparicion_b[frontera]
+        usar_b = (b >= 0) & ~self.seleccion[a // 4]
+        apariciones = np.where(usar_b, b, a)
+        
+        # Orientar solo las caras de frontera, hacia afuera de su elemento
+        elementos = self.elementos[apariciones // 4]
+        locales = apariciones % 4
+        caras = np.take_along_axis(elementos, TETRA_FACES[locales], axis=1)
+        opuestos = np.take_along_axis(elementos, TETRA_OPUESTOS[locales][:, None], axis=1)[:, 0]
+        return _orientar_caras(self.coords, caras, opuestos)
+    
+    def superficie(self, valores_nodales):
+        """
+        Extrae la superficie de la selección actual.
+        Retorna (coords, triangle_indices, line_indices, valores) o None si está vacía.
+        """
+        triangulos = self.triangulos_frontera()
+        if len(triangulos) == 0:
+            return None
+        
+        coords, triangle_indices, line_indices, nodos, _ = _construir_superficie(self.coords, triangulos)
+        valores = np.asarray(valores_nodales, dtype=np.float32).reshape(-1)[nodos]
+        return coords, triangle_indices, line_indices, valores
@@ -0,0 +1,336 @@
+import os
+import zlib
+import base64
+import binascii
+import warnings
+import numpy as np
+import xml.etree.ElementTree as ET
+from .indice import _abrir, TAM_TROZO
+from .comprimidos import abrir_binario
+from .gmsh import TRIANGULOS, TETRAEDROS
+
+# Lector de VTK XML UnstructuredGrid (.vtu). La cabecera XML se interpreta con
+# ElementTree; los datos pueden estar en línea (ascii o base64) o al final en
+# AppendedData (raw o base64), comprimidos con zlib o no. Los arreglos raw sin
+# comprimir se leen con np.frombuffer sobre el archivo mapeado, sin copiarlos
+
+FIRMA = b'<VTKFile'
+
+TIPOS_DATOS = {'Int8': 'i1', 'UInt8': 'u1', 'Int16': 'i2', 'UInt16': 'u2',
+               'Int32': 'i4', 'UInt32': 'u4', 'Int64': 'i8', 'UInt64': 'u8',
+               'Float32': 'f4', 'Float64': 'f8'}
+
+# Tipos de celda de VTK convertidos a los tipos de Gmsh equivalentes, para
+# dibujarlos con las mismas reglas (vértices de orden superior, cuadriláteros
+# partidos en triángulos)
+CELDAS_GMSH = {5: 2, 9: 3, 10: 4, 22: 9, 23: 16, 24: 11}
+DIMENSION_CELDA = {5: 2, 6: 2, 7: 2, 8: 2, 9: 2, 22: 2, 23: 2, 28: 2, 10: 3, 11: 3,
+                   12: 3, 13: 3, 14: 3, 24: 3, 25: 3, 26: 3, 27: 3, 29: 3, 42: 3}
+
+# Nombres (en minúsculas) de los datos de punto que se leen como los
+# resultados del .RES; los demás quedan como campos con su nombre
+NOMBRES_DESPLAZAMIENTOS = {'u', 'disp', 'displacement', 'displacements', 'desplazamiento', 'desplazamientos'}
+NOMBRES_ESFUERZOS = {'s', 'sigma', 'stress', 'stresses', 'esfuerzo', 'esfuerzos'}
+NOMBRES_MATERIAL = {'mat', 'gmsh:physical', 'cellentityids'}
+# Tensor completo 3x3 -> (Sxx, Syy, Szz, Sxy, Syz, Sxz)
+TENSOR_VOIGT = [0, 4, 8, 1, 5, 2]
+
+def es_vtu(cabecera):
+    """Indica si los primeros bytes de un archivo son de un archivo VTK XML"""
+    return FIRMA in cabecera
+
+class _Datos:
+    """Acceso a los arreglos de un archivo .vtu según los atributos de VTKFile"""
+    
+    def __init__(self, datos, raiz):
+        self.datos = datos
+        self.orden = '>' if raiz.get('byte_order') == 'BigEndian' else '<'
+        self.cabecera = np.dtype(self.orden + TIPOS_DATOS[raiz.get('header_type', 'UInt32')])
+        self.comprimido = raiz.get('compressor') is not None
+        if self.comprimido and 'ZLib' not in raiz.get('compressor'):
+            raise ValueError(f"compresor {raiz.get('compressor')} no soportado (solo zlib)")
+        
+        # Los datos agregados empiezan después del '_' que sigue a la etiqueta
+        self.agregados = None
+        self.codificacion = None
+        etiqueta = datos.find(b'<AppendedData')
+        if etiqueta >= 0:
+            fin_etiqueta = datos.find(b'>', etiqueta)
+            self.codificacion = b'base64' if b'base64' in datos[etiqueta:fin_etiqueta] else b'raw'
+            self.agregados = datos.find(b'_', fin_etiqueta) + 1
+    
+    def _enteros_cabecera(self, crudo, n, inicio=0):
+        return [int(v) for v in np.frombuffer(crudo, dtype=self.cabecera, count=n, offset=inicio)]
+    
+    def _descomprimir(self, cabecera, bloques):
+        """Concatena los bloques zlib descritos por la cabecera [n, tam, último, tamaños...]"""
+        n, tam, ultimo = cabecera[:3]
+        salida = bytearray((n - 1) * tam + (ultimo or tam) if n else 0)
+        posicion = 0
+        escrito = 0
+        for tam_comprimido in cabecera[3:3 + n]:
+            bloque = zlib.decompress(bloques[posicion:posicion + tam_comprimido])
+            salida[escrito:escrito + len(bloque)] = bloque
+            posicion += tam_comprimido
+            escrito += len(bloque)
+        return salida
+    
+    def _binario_crudo(self, inicio):
+        """Bytes de un arreglo raw de AppendedData (vista del archivo si no está comprimido)"""
+        h = self.cabecera.itemsize
+        if not self.comprimido:
+            tam, = self._enteros_cabecera(self.datos, 1, inicio)
+            return memoryview(self.datos)[inicio + h:inicio + h + tam]
+        n, = self._enteros_cabecera(self.datos, 1, inicio)
+        cabecera = self._enteros_cabecera(self.datos, 3 + n, inicio)
+        inicio += (3 + n) * h
+        return self._descomprimir(cabecera, self.datos[inicio:inicio + sum(cabecera[3:])])
+    
+    def _binario_base64(self, texto):
+        """
+        Bytes de un arreglo en base64. VTK codifica la cabecera aparte de los
+        datos; algunos escritores codifican todo junto, lo que se reconoce
+        porque la cabecera no termina con relleno '='
+        """
+        texto = b''.join(texto.split())
+        h = self.cabecera.itemsize
+        if self.comprimido:
+            largo = 4 * ((3 * h + 2) // 3)
+            n, = self._enteros_cabecera(base64.b64decode(texto[:largo]), 1)
+            largo = 4 * (((3 + n) * h + 2) // 3)
+            cabecera = self._enteros_cabecera(base64.b64decode(texto[:largo]), 3 + n)
+            return self._descomprimir(cabecera, base64.b64decode(texto[largo:]))
+        largo = 4 * ((h + 2) // 3)
+        if texto[largo - 1:largo] == b'=':
+            tam, = self._enteros_cabecera(base64.b64decode(texto[:largo]), 1)
+            return base64.b64decode(texto[largo:])[:tam]
+        crudo = base64.b64decode(texto)
+        tam, = self._enteros_cabecera(crudo, 1)
+        return crudo[h:h + tam]
+    
+    def arreglo(self, elemento, fin_agregado=None):
+        """Arreglo (n, componentes) o (n,) de un DataArray"""
+        dtype = np.dtype(self.orden + TIPOS_DATOS[elemento.get('type')])
+        componentes = int(elemento.get('NumberOfComponents', 1))
+        formato = elemento.get('format', 'ascii')
+        if formato == 'ascii':
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', DeprecationWarning)
+                valores = np.fromstring(elemento.text or '', dtype=dtype, sep=' ')
+        elif formato == 'binary':
+            valores = np.frombuffer(self._binario_base64((elemento.text or '').encode()), dtype=dtype)
+        elif formato == 'appended' and self.agregados is not None:
+            inicio = self.agregados + int(elemento.get('offset', 0))
+            if self.codificacion == b'raw':
+                crudo = self._binario_crudo(inicio)
+            else:
+                crudo = self._binario_base64(self.datos[inicio:fin_agregado])
+            valores = np.frombuffer(crudo, dtype=dtype)
+        else:
+            raise ValueError(f"formato de datos '{formato}' no soportado")
+        return valores.reshape(-1, componentes) if componentes > 1 else valores
+
+def _cabecera_xml(datos):
+    """Raíz XML del archivo; con datos agregados solo se interpreta lo anterior a ellos"""
+    etiqueta = datos.find(b'<AppendedData')
+    if etiqueta < 0:
+        return ET.fromstring(bytes(datos))
+    return ET.fromstring(bytes(datos[:etiqueta]) + b'</VTKFile>')
+
+def _fines_agregados(datos, lector, raiz):
+    """Fin de cada arreglo agregado en base64 (el comienzo del siguiente)"""
+    if lector.agregados is None or lector.codificacion != b'base64':
+        return {}
+    inicios = sorted({int(e.get('offset', 0)) for e in raiz.iter('DataArray') if e.get('format') == 'appended'})
+    final = datos.find(b'</AppendedData', lector.agregados)
+    final = (final if final >= 0 else len(datos)) - lector.agregados
+    return {inicio: lector.agregados + fin for inicio, fin in zip(inicios, inicios[1:] + [final])}
+
+def _celdas(conectividad, desplazamientos, tipos, nombre):
+    """
+    Elementos (m, k) de las celdas que se dibujan y la celda de cada uno:
+    tetraedros si hay, si no triángulos (ver gmsh.TRIANGULOS y TETRAEDROS)
+    """
+    presentes = {int(t) for t in np.unique(tipos)}
+    volumen = any(CELDAS_GMSH.get(t) in TETRAEDROS for t in presentes)
+    conversion, dimension_dibujo = (TETRAEDROS, 3) if volumen else (TRIANGULOS, 2)
+    omitidos = [t for t in presentes
+                if CELDAS_GMSH.get(t) not in conversion and DIMENSION_CELDA.get(t, 0) >= dimension_dibujo]
+    if omitidos:
+        print(f"Advertencia: {nombre} tiene {int(np.isin(tipos, omitidos).sum())} celdas "
+              f"de tipos no soportados que se omiten")
+    
+    # 'offsets' marca el final de cada celda en la conectividad
+    inicios = np.concatenate(([0], desplazamientos[:-1])).astype(np.int64)
+    elementos = []
+    celdas = []
+    for tipo_vtk in sorted(presentes):
+        tipo = CELDAS_GMSH.get(tipo_vtk)
+        if tipo not in conversion:
+            continue
+        indices = np.flatnonzero(tipos == tipo_vtk)
+        for vertices in conversion[tipo]:
+            elementos.append(conectividad[inicios[indices, None] + np.asarray(vertices)])
+            celdas.append(indices)
+    if not elementos:
+        return None, None
+    return np.concatenate(elementos).astype(np.int32), np.concatenate(celdas)
+
+def _materiales(celda_datos, lector, fines, celdas):
+    """Material de cada elemento: el primer dato de celda entero con nombre de material, o 1"""
+    for elemento in celda_datos:
+        nombre = (elemento.get('Name') or '').lower()
+        if ('material' in nombre or nombre in NOMBRES_MATERIAL) and elemento.get('type', '').startswith(('Int', 'UInt')):
+            valores = lector.arreglo(elemento, fines.get(int(elemento.get('offset', 0))))
+            return np.asarray(valores, dtype=np.int32).reshape(-1)[celdas]
+    return np.ones(len(celdas), dtype=np.int32)
+
+def _tipo_resultado(nombre, componentes):
+    """Tipo de resultado de un dato de punto por su nombre y componentes, o None si es otro campo"""
+    nombre = nombre.lower()
+    if nombre in NOMBRES_DESPLAZAMIENTOS and componentes in (2, 3):
+        return 'desplazamientos'
+    if nombre in NOMBRES_ESFUERZOS and componentes in (3, 6, 9):
+        return 'esfuerzos_nodos'
+    return None
+
+def _resultado(nombre, valores):
+    """
+    Tipo de resultado y valores de un dato de punto: desplazamientos (n, 3),
+    esfuerzos_nodos (n, 3) o (n, 6), o None si es otro campo
+    """
+    componentes = 1 if valores.ndim == 1 else valores.shape[1]
+    tipo = _tipo_resultado(nombre, componentes)
+    if tipo == 'desplazamientos' and componentes == 2:
+        valores = np.column_stack([valores, np.zeros(len(valores))])
+    elif tipo == 'esfuerzos_nodos' and componentes == 9:
+        valores = valores[:, TENSOR_VOIGT]
+    return tipo, valores
+
+def leer_vtu(ruta):
+    """
+    Lee un .vtu (plano o comprimido). Retorna ((coordenadas (n, 3) float64,
+    elementos (m, k) int32 con índices desde 0, materiales (m,) int32),
+    resultados) con la malla como Lector._leer_msh y los resultados como
+    Lector._leer_res: los datos de punto reconocidos como desplazamientos o
+    esfuerzos van en esas claves y los demás en 'campos' ({nombre: (ids,
+    valores)}). Con una sola pieza y datos raw sin comprimir, los datos de
+    punto son vistas del archivo mapeado.
+    """
+    vacio = ((np.array([]), np.array([]), np.array([], dtype=np.int32)),
+             {'desplazamientos': None, 'esfuerzos_nodos': None, 'esfuerzos_gauss': None})
+    nombre = os.path.basename(ruta)
+    datos = _abrir(ruta)
+    try:
+        raiz = _cabecera_xml(datos)
+        if raiz.get('type') != 'UnstructuredGrid':
+            print(f"Error al leer {nombre}: tipo VTK {raiz.get('type')} no soportado (se necesita UnstructuredGrid)")
+            return vacio
+        lector = _Datos(datos, raiz)
+        fines = _fines_agregados(datos, lector, raiz)
+        
+        def arreglo(elemento):
+            return lector.arreglo(elemento, fines.get(int(elemento.get('offset', 0))))
+        
+        piezas = []
+        for pieza in raiz.iter('Piece'):
+            puntos = arreglo(pieza.find('Points/DataArray'))
+            celdas = {e.get('Name'): arreglo(e) for e in pieza.findall('Cells/DataArray')}
+            elementos, indices = _celdas(celdas['connectivity'], celdas['offsets'], celdas['types'], nombre)
+            piezas.append({
+                'puntos': puntos,
+                'elementos': elementos,
+                'materiales': None if indices is None else _materiales(
+                    pieza.findall('CellData/DataArray'), lector, fines, indices),
+                'datos': {e.get('Name'): arreglo(e) for e in pieza.findall('PointData/DataArray') if e.get('Name')}
+            })
+    except (ET.ParseError, ValueError, KeyError, AttributeError, IndexError, TypeError,
+            zlib.error, binascii.Error) as e:
+        print(f"Error al leer {nombre}: {e}")
+        return vacio
+    
+    piezas = [p for p in piezas if p['elementos'] is not None]
+    if not piezas:
+        print(f"Error al leer {nombre}: no tiene celdas que se puedan dibujar")
+        return vacio
+    
+    # Varias piezas se unen desplazando los índices de sus nodos; solo se
+    # conservan los datos de punto presentes en todas
+    if len(piezas) == 1:
+        pieza = piezas[0]
+        coordenadas = np.asarray(pieza['puntos'], dtype=np.float64)
+        elementos, materiales = pieza['elementos'], pieza['materiales']
+        datos_punto = pieza['datos']
+    else:
+        base = np.cumsum([0] + [len(p['puntos']) for p in piezas[:-1]])
+        coordenadas = np.concatenate([p['puntos'] for p in piezas]).astype(np.float64)
+        elementos = np.concatenate([p['elementos'] + b for p, b in zip(piezas, base)]).astype(np.int32)
+        materiales = np.concatenate([p['materiales'] for p in piezas])
+        comunes = set.intersection(*(set(p['datos']) for p in piezas))
+        datos_punto = {n: np.concatenate([p['datos'][n] for p in piezas]) for n in piezas[0]['datos'] if n in comunes}
+    
+    resultados = dict(vacio[1], campos={})
+    ids = np.arange(1, len(coordenadas) + 1, dtype=np.int32)
+    for nombre_dato, valores in datos_punto.items():
+        tipo, valores = _resultado(nombre_dato, valores)
+        if tipo is not None and resultados[tipo] is None:
+            resultados[tipo] = (ids, valores)
+        else:
+            resultados['campos'][nombre_dato] = (ids, valores)
+    return (coordenadas, elementos, materiales), resultados
+
+def escanear_vtu(ruta):
+    """
+    Metadatos de un .vtu para el índice de la carpeta (como
+    indice.escanear_modelo, con sus resultados) leyendo solo la cabecera XML:
+    NumberOfPoints y NumberOfCells de cada pieza y el nombre de sus datos de
+    punto. El XML se interpreta en flujo hasta AppendedData; los datos en
+    línea se descartan a medida que se leen. El tipo de elemento no está en la
+    cabecera y los elementos son las celdas, incluidas las que no se dibujan.
+    """
+    analizador = ET.XMLPullParser(events=('start', 'end'))
+    etiqueta_agregados = b'<AppendedData'
+    abiertas = []
+    piezas = []
+    nodos = 0
+    celdas = 0
+    with abrir_binario(ruta) as archivo:
+        resto = b''
+        while True:
+            bloque = archivo.read(TAM_TROZO)
+            bloque = resto + bloque if bloque else resto
+            fin = bloque.find(etiqueta_agregados)
+            terminado = fin >= 0 or len(bloque) == len(resto)
+            if fin < 0:
+                # Se conserva el final por si la etiqueta quedó partida entre trozos
+                fin = len(bloque) if terminado else max(0, len(bloque) - len(etiqueta_agregados))
+            resto = bloque[fin:]
+            analizador.feed(bloque[:fin])
+            for evento, elemento in analizador.read_events():
+                if evento == 'end':
+                    abiertas.pop()
+                    if elemento.tag == 'DataArray':
+                        elemento.clear()
+                    continue
+                abiertas.append(elemento.tag)
+                if elemento.tag == 'VTKFile' and elemento.get('type') != 'UnstructuredGrid':
+                    raise ValueError(f"tipo VTK {elemento.get('type')} no soportado")
+                if elemento.tag == 'Piece':
+                    nodos += int(elemento.get('NumberOfPoints', 0))
+                    celdas += int(elemento.get('NumberOfCells', 0))
+                    piezas.append({})
+                elif elemento.tag == 'DataArray' and abiertas[-2:-1] == ['PointData'] and piezas:
+                    if elemento.get('Name'):
+                        piezas[-1][elemento.get('Name')] = int(elemento.get('NumberOfComponents', 1))
+            if terminado:
+                break
+    
+    # Como en leer_vtu, solo cuentan los datos de punto presentes en todas las piezas
+    resultados = []
+    for nombre, componentes in (piezas[0].items() if piezas else ()):
+        if all(p.get(nombre) == componentes for p in piezas[1:]):
+            tipo = _tipo_resultado(nombre, componentes)
+            if tipo is not None and tipo not in resultados:
+                resultados.append(tipo)
+    return {'nodos': nodos, 'elementos': celdas, 'tipo': '', 'dimension': 3 if nodos else 0,
+            'resultados': resultados, 'pasos': int('desplazamientos' in resultados), 'u_max': None}
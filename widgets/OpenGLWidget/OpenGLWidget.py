@@ -1,29 +1,42 @@
 """
 Widget OpenGL
 """
+import time
 import numpy as np
 from OpenGL.GL import *
 import utils.Matrix44 as Matrix44
+from utils.lod import generar_niveles
+from utils.malla import acmr
 from PyQt6.QtOpenGLWidgets import QOpenGLWidget
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QSurfaceFormat
-from .modules import Camera,ShaderManager,ColormapManager,BufferManager,Renderer
+from PyQt6.QtWidgets import QLabel
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+from PyQt6.QtGui import QSurfaceFormat, QImage
+from .modules import Camera,ShaderManager,ColormapManager,BufferManager,Renderer,ClipManager,ResolutionManager,InputManager,FrameProfiler
 
 class OpenGLWidget(QOpenGLWidget):
     """Widget OpenGL para visualización de modelos 3D"""
     
+    clip_changed = pyqtSignal()
+    interaction_changed = pyqtSignal(bool)
+    
     def __init__(self, parent=None):
         super().__init__(parent)
-
+        
         self.shader_manager = ShaderManager()
         self.colormap_manager = ColormapManager()
         self.buffer_manager = BufferManager()
-        self.renderer = Renderer(self.shader_manager, self.buffer_manager, self.colormap_manager)
+        self.clip_manager = ClipManager()
+        self.resolution_manager = ResolutionManager()
+        self.input_manager = InputManager()
+        self.profiler = FrameProfiler()
+        self.renderer = Renderer(self.shader_manager, self.buffer_manager, self.colormap_manager, self.clip_manager)
+        self.renderer.set_profiler(self.profiler)
         
         # Datos de geometría
         self.triangle_indices = None
         self.line_indices = None
         self.coords = None
+        self.groups = None
         
         # Cámara
         self.camera = None
@@ -33,6 +46,33 @@ class OpenGLWidget(QOpenGLWidget):
         self.last_y = 0
         self.current_mode = "combined"
         
+        # Nivel de detalle durante la interacción: presupuesto por cuadro en ms
+        self.lod_enabled = True
+        self.frame_budget_ms = 33.0
+        self.interacting = False
+        self.ms_per_triangle = None
+        self.last_frame_ms = 0.0
+        self.interaction_timer = QTimer(self)
+        self.interaction_timer.setSingleShot(True)
+        self.interaction_timer.setInterval(200)
+        self.interaction_timer.timeout.connect(self._end_interaction)
+        
+        # Ritmo de cuadros: un solo cuadro en vuelo, el siguiente tras frameSwapped
+        self.frame_in_flight = False
+        self.frameSwapped.connect(self._on_frame_swapped)
+        
+        # Panel de estadísticas superpuesto (se refresca aparte de los cuadros)
+        self.stats_overlay = QLabel(self)
+        self.stats_overlay.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.stats_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 160); color: #e0e0e0; "
+            "font-family: monospace; font-size: 11px; padding: 6px; border-radius: 4px;")
+        self.stats_overlay.move(8, 8)
+        self.stats_overlay.hide()
+        self.stats_timer = QTimer(self)
+        self.stats_timer.setInterval(500)
+        self.stats_timer.timeout.connect(self._update_stats_overlay)
+        
         # Flags
         self.gl_initialized = False
         self.geometry_initialized = False
@@ -49,11 +89,12 @@ class OpenGLWidget(QOpenGLWidget):
         fmt.setDepthBufferSize(24)
         self.setFormat(fmt)
     
-    def initialize_geometry(self, coords, triangle_indices, line_indices, reset_camera=True):
-        """Inicializa la geometría del modelo"""
+    def initialize_geometry(self, coords, triangle_indices, line_indices, reset_camera=True, groups=None):
+        """Inicializa la geometría del modelo (groups: rangos de dibujo por material, opcional)"""
         self.coords = coords
         self.triangle_indices = triangle_indices
         self.line_indices = line_indices
+        self.groups = groups
         
         self.geometry_initialized = True
         
@@ -79,13 +120,15 @@ class OpenGLWidget(QOpenGLWidget):
             self.buffers_created = False
         
         # Crear nuevos buffers
-        self.buffer_manager.initialize(self.coords, self.triangle_indices, self.line_indices)
+        self.buffer_manager.initialize(self.coords, self.triangle_indices, self.line_indices, self.groups)
         self.buffer_manager.create_all_buffers()
         self.buffers_created = True
+        self._create_lod_levels()
         
-        # Solo resetear cámara si se solicita explícitamente
+        # Solo resetear cámara y caja de corte si se solicita explícitamente
         if reset_camera:
             self._setup_camera()
+            self._setup_clip_box()
         
         coords = self.buffer_manager.get_coords()
         print(f"Buffers creados. Vértices: {len(coords)}, "
@@ -94,6 +137,17 @@ class OpenGLWidget(QOpenGLWidget):
         
         self.update()
     
+    def _create_lod_levels(self):
+        """Genera los niveles de detalle del modelo (solo para superficies grandes)"""
+        start = time.perf_counter()
+        levels = generar_niveles(self.buffer_manager.coords_array,
+                                 self.buffer_manager.triangle_indices, self.groups)
+        self.buffer_manager.set_lod_levels(levels)
+        if levels:
+            counts = self.buffer_manager.get_lod_triangle_counts()
+            print(f"Niveles de detalle: {counts} triángulos "
+                  f"({(time.perf_counter() - start) * 1000:.0f} ms)")
+    
     def initializeGL(self):
         """Inicializa OpenGL"""
         print("Inicializando OpenGL...")
@@ -104,6 +158,9 @@ class OpenGLWidget(QOpenGLWidget):
         # Crear recursos de shaders y texturas
         self.shader_manager.compile_all()
         self.colormap_manager.create_texture()
+        self.clip_manager.create_buffers()
+        self.resolution_manager.create_buffers()
+        self.profiler.create_queries()
         
         self.gl_initialized = True
         
@@ -119,35 +176,122 @@ class OpenGLWidget(QOpenGLWidget):
     def _setup_camera(self):
         """Configura la cámara basada en el modelo"""
         coords = self.buffer_manager.get_coords()
-        model_center = coords.mean(axis=0)
-        distances = np.linalg.norm(coords - model_center, axis=1)
+        local_center = coords.mean(axis=0, dtype=np.float64)
+        distances = np.linalg.norm(coords - local_center, axis=1)
         model_radius = max(distances.max() * 1.5, 1.0)
-        self.camera = Camera(model_center, model_radius)
+        # La cámara trabaja en coordenadas del mundo (float64)
+        self.camera = Camera(local_center + self.buffer_manager.get_origin(), model_radius)
+    
+    def _setup_clip_box(self):
+        """Ajusta la caja de corte a los límites del modelo"""
+        coords = self.buffer_manager.get_coords()
+        self.clip_manager.set_model_bounds(coords.min(axis=0), coords.max(axis=0))
+        self.clip_changed.emit()
     
     def paintGL(self):
         """Renderiza la escena"""
         if not self.camera or not self.geometry_initialized or not self.buffers_created:
+            self.input_manager.reset_pending()
             glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
             return
         
+        # Durante la interacción se mide el costo real de cada cuadro en la GPU
+        # para ajustar los siguientes; los resultados llegan con uno o dos
+        # cuadros de retraso, sin detener el pipeline
+        measuring = self.interacting and (self.lod_enabled or self.resolution_manager.enabled)
+        self.profiler.frame_timing = measuring
+        self.profiler.begin_frame()
+        for elapsed_ms, measured_level in self.profiler.take_frame_times():
+            self._record_frame_time(elapsed_ms, measured_level)
+        self.shader_manager.state.begin_frame()
+        
+        # La entrada acumulada desde el cuadro anterior se aplica una sola vez
+        self._apply_pending_input()
+        
         mvp_matrix = self._calculate_mvp_matrix()
+        level = self._select_lod_level()
+        self.renderer.set_lod_level(level)
+        
+        # Tamaño real en píxeles del dispositivo para el framebuffer reducido
+        ratio = self.devicePixelRatioF()
+        pixel_width, pixel_height = int(self.width() * ratio), int(self.height() * ratio)
+        reduced = self.interacting and self.resolution_manager.begin(pixel_width, pixel_height)
+        
         self.renderer.render_scene(
             self.current_mode,
             mvp_matrix,
             self.width(),
             self.height()
         )
+        if reduced:
+            self.profiler.begin_pass("upscale")
+            self.resolution_manager.end(self.defaultFramebufferObject(), pixel_width, pixel_height,
+                                        self.shader_manager)
+            self.profiler.end_pass()
+        self.shader_manager.state.end_frame()
+        self.profiler.end_frame(level if measuring else None)
     
     def _calculate_mvp_matrix(self):
-        """Calcula la matriz MVP"""
+        """
+        Calcula la matriz MVP para las posiciones de la GPU, que son relativas
+        al origen del modelo: la traslación al origen se compone con la vista en
+        float64, donde las traslaciones grandes se cancelan, antes de pasar a float32
+        """
         width, height = self.width(), max(self.height(), 1)
         ratio = width / height
         
+        model = Matrix44.translation(self.buffer_manager.get_origin())
         view = self.camera.get_view_matrix()
         proj = Matrix44.perspective_projection(45.0, ratio, 0.1, self.camera.radius * 10.0)
-        mvp = (view @ proj).astype(np.float32)
+        mvp = (model @ view @ proj).astype(np.float32)
         return mvp
     
+    # ============ Nivel de Detalle ============
+    
+    def _select_lod_level(self):
+        """Elige el nivel más fino cuyo costo estimado cabe en el presupuesto por cuadro"""
+        if not self.interacting or not self.lod_enabled or self.ms_per_triangle is None:
+            return 0
+        
+        counts = self.buffer_manager.get_lod_triangle_counts()
+        for level, triangles in enumerate(counts):
+            if triangles * self.ms_per_triangle <= self.frame_budget_ms:
+                return level
+        return len(counts) - 1
+    
+    def _record_frame_time(self, elapsed_ms, level):
+        """
+        Actualiza la estimación de ms por triángulo (media móvil exponencial)
+        con el tiempo de GPU de un cuadro ya dibujado en el nivel indicado
+        """
+        counts = self.buffer_manager.get_lod_triangle_counts()
+        if level >= len(counts):
+            # Cuadro de un modelo anterior con más niveles
+            return
+        self.last_frame_ms = elapsed_ms
+        triangles = max(counts[level], 1)
+        sample = elapsed_ms / triangles
+        if self.ms_per_triangle is None:
+            self.ms_per_triangle = sample
+        else:
+            self.ms_per_triangle = 0.7 * self.ms_per_triangle + 0.3 * sample
+        
+        self.resolution_manager.adapt(elapsed_ms, self.frame_budget_ms)
+    
+    def _begin_interaction(self):
+        """Marca el inicio de una interacción (arrastre o rueda)"""
+        self.interaction_timer.stop()
+        if not self.interacting:
+            self.interacting = True
+            self.interaction_changed.emit(True)
+    
+    def _end_interaction(self):
+        """Termina la interacción y vuelve a dibujar a resolución completa"""
+        if self.interacting:
+            self.interacting = False
+            self.interaction_changed.emit(False)
+        self.update()
+    
     def resizeGL(self, w, h):
         """Maneja el redimensionamiento del widget"""
         glViewport(0, 0, w, h)
@@ -158,6 +302,12 @@ class OpenGLWidget(QOpenGLWidget):
         """Maneja el evento de presión del mouse"""
         self.last_x = event.position().x()
         self.last_y = event.position().y()
+        self._begin_interaction()
+    
+    def mouseReleaseEvent(self, event):
+        """Maneja el evento de liberación del mouse"""
+        if not event.buttons():
+            self._end_interaction()
     
     def mouseMoveEvent(self, event):
         """Maneja el movimiento del mouse"""
@@ -168,27 +318,95 @@ class OpenGLWidget(QOpenGLWidget):
         dx, dy = x - self.last_x, y - self.last_y
         self.last_x, self.last_y = x, y
         
+        # Solo se acumula: la cámara se actualiza una vez por cuadro en paintGL
         buttons = event.buttons()
-        if buttons & Qt.MouseButton.LeftButton:
-            self.camera.rotate(dx, dy)
-            self.update()
+        modifiers = event.modifiers()
+        if (buttons & Qt.MouseButton.LeftButton and modifiers & Qt.KeyboardModifier.ShiftModifier
+                and self.clip_manager.is_active()):
+            self.input_manager.add_clip_drag(dx, dy)
+            self._request_frame()
+        elif buttons & Qt.MouseButton.LeftButton:
+            self.input_manager.add_rotate(dx, dy)
+            self._request_frame()
         elif buttons & Qt.MouseButton.RightButton:
-            self.camera.pan(dx, dy)
-            self.update()
+            self.input_manager.add_pan(dx, dy)
+            self._request_frame()
+    
+    def _drag_clip_plane(self, dx, dy):
+        """Desplaza el plano activo según el arrastre proyectado sobre su normal en pantalla"""
+        index = self.clip_manager.active_plane
+        normal = self.clip_manager.get_plane_normal(index)
+        center = np.asarray(self.camera.center, dtype=np.float64) - self.buffer_manager.get_origin()
+        mvp = self._calculate_mvp_matrix().astype(np.float64)
+        
+        p0 = np.append(center, 1.0) @ mvp
+        p1 = np.append(center + normal, 1.0) @ mvp
+        
+        distance = -dy * self.camera.distance * 0.002
+        if p0[3] > 1e-6 and p1[3] > 1e-6:
+            size = np.array([self.width(), -self.height()], dtype=np.float64) * 0.5
+            screen_dir = (p1[:2] / p1[3] - p0[:2] / p0[3]) * size
+            length_sq = float(screen_dir @ screen_dir)
+            if length_sq > 1e-6:
+                # Píxeles arrastrados a lo largo de la normal -> unidades del modelo
+                distance = (dx * screen_dir[0] + dy * screen_dir[1]) / length_sq
+        
+        self.clip_manager.move_plane(index, distance)
+        self.clip_changed.emit()
     
     def wheelEvent(self, event):
         """Maneja el evento de la rueda del mouse"""
         if self.camera:
             delta = event.angleDelta().y() / 120
             if delta != 0:
-                self.camera.zoom(delta)
-                self.update()
+                # La rueda no tiene evento de fin: la interacción termina tras una pausa
+                self._begin_interaction()
+                self.interaction_timer.start()
+                self.input_manager.add_zoom(delta)
+                self._request_frame()
+    
+    # ============ Ritmo de Cuadros ============
+    
+    def _request_frame(self):
+        """Pide un cuadro si no hay otro en vuelo; si lo hay, se pedirá al presentarse"""
+        if not self.frame_in_flight:
+            self.frame_in_flight = True
+            self.update()
+    
+    def _on_frame_swapped(self):
+        """Al presentarse un cuadro, pide el siguiente si llegó entrada mientras tanto"""
+        self.frame_in_flight = False
+        if self.input_manager.has_pending():
+            self._request_frame()
+    
+    def _apply_pending_input(self):
+        """Aplica a la cámara toda la entrada acumulada desde el último cuadro"""
+        if not self.input_manager.has_pending():
+            return
+        
+        rotate, pan, clip, zoom = self.input_manager.take()
+        if clip != (0.0, 0.0):
+            self._drag_clip_plane(*clip)
+        if rotate != (0.0, 0.0):
+            self.camera.rotate(*rotate)
+        if pan != (0.0, 0.0):
+            self.camera.pan(*pan)
+        if zoom != 0.0:
+            self.camera.zoom(zoom)
+    
+    def get_input_stats(self):
+        """Retorna estadísticas de entrada: eventos por cuadro, fusionados y latencia"""
+        return self.input_manager.get_stats()
+    
+    def reset_input_stats(self):
+        """Reinicia las estadísticas de entrada"""
+        self.input_manager.reset_stats()
     
     # ============ API Pública ============
     
     def set_mode(self, mode):
         """Establece el modo de renderizado"""
-        if mode in ["solid", "wireframe", "combined"]:
+        if mode in ["solid", "wireframe", "hidden_line", "combined"]:
             self.current_mode = mode
             self.update()
     
@@ -196,12 +414,12 @@ class OpenGLWidget(QOpenGLWidget):
         """Establece el grosor de línea"""
         self.renderer.set_line_width(width)
         self.update()
-        
+    
     def set_line_color(self,color):
         """Establece el color de línea"""
         self.renderer.set_line_color(color)
         self.update()
-        
+    
     def set_solid_color(self,color):
         """Establece el color de solid"""
         self.renderer.set_solid_color(color)
@@ -218,6 +436,498 @@ class OpenGLWidget(QOpenGLWidget):
             self.camera.reset()
             self.update()
     
+    def set_lod_enabled(self, enabled):
+        """Habilita o deshabilita la simplificación durante la interacción"""
+        self.lod_enabled = enabled
+        self.update()
+    
+    def set_frame_budget(self, budget_ms):
+        """Establece el presupuesto de tiempo por cuadro (ms) durante la interacción"""
+        self.frame_budget_ms = max(1.0, float(budget_ms))
+    
+    def set_feature_angle(self, angle):
+        """
+        Dibuja solo las aristas vivas, con ángulo diedro >= angle grados
+        (None = todas las aristas, incluidas las de teselado en zonas planas)
+        """
+        self.buffer_manager.set_feature_angle(angle)
+        self.update()
+    
+    def get_edge_counts(self):
+        """Retorna (aristas totales, aristas dibujadas con el filtro de ángulo)"""
+        return self.buffer_manager.get_edge_counts()
+    
+    def set_compact_buffers(self, enabled):
+        """
+        Usa el formato compacto (posiciones, valores e índices de 16 bits) para
+        los buffers del modelo. Si hay un modelo cargado se vuelven a crear sus
+        buffers conservando las coordenadas y los valores actuales; los niveles
+        de detalle y las superficies auxiliares no cambian.
+        """
+        enabled = bool(enabled)
+        if enabled == self.buffer_manager.compact:
+            return
+        if not self.buffers_created:
+            self.buffer_manager.compact = enabled
+            return
+        
+        self.makeCurrent()
+        self.buffer_manager.set_compact(enabled)
+        self.doneCurrent()
+        
+        used, float_bytes = self.buffer_manager.get_model_memory()
+        print(f"Memoria del modelo: {used / 2**20:.1f} MB (float: {float_bytes / 2**20:.1f} MB)")
+        self.update()
+    
+    def set_streaming_uploads(self, enabled):
+        """
+        Sube las coordenadas en modo streaming (buffers huérfanos), pensado para
+        deformaciones o animaciones que cambian la geometría en cada cuadro
+        """
+        self.buffer_manager.set_streaming(enabled)
+    
+    def is_compact_buffers(self):
+        """Retorna si los buffers del modelo usan el formato compacto"""
+        return self.buffer_manager.compact
+    
+    def _grab_pixels(self):
+        """Renderiza un cuadro y retorna sus píxeles RGBA como arreglo (alto, ancho, 4)"""
+        image = self.grabFramebuffer().convertToFormat(QImage.Format.Format_RGBA8888)
+        pixels = np.frombuffer(image.constBits().asstring(image.sizeInBytes()), dtype=np.uint8)
+        return pixels.reshape(image.height(), image.bytesPerLine())[:, :image.width() * 4].reshape(
+            image.height(), image.width(), 4).copy()
+    
+    def compare_compact_images(self):
+        """
+        Renderiza la vista actual con buffers float y compactos y compara las
+        imágenes. Retorna {'max_diff', 'mean_diff', 'differing_pixels'} (canales
+        de 0 a 255; píxeles con alguna diferencia mayor a 2) y la memoria de
+        ambos formatos.
+        """
+        if not self.buffers_created:
+            print("No hay un modelo cargado")
+            return {}
+        
+        compact = self.buffer_manager.compact
+        images = {}
+        memory = {}
+        for enabled in (False, True):
+            self.set_compact_buffers(enabled)
+            images[enabled] = self._grab_pixels().astype(np.int16)
+            memory[enabled] = self.buffer_manager.get_model_memory()[0]
+        self.set_compact_buffers(compact)
+        
+        diff = np.abs(images[True] - images[False])
+        result = {
+            'max_diff': int(diff.max()),
+            'mean_diff': float(diff.mean()),
+            'differing_pixels': int(np.count_nonzero(diff.max(axis=2) > 2)),
+            'float_bytes': memory[False],
+            'compact_bytes': memory[True]
+        }
+        print(f"Compacto vs float: diferencia máx {result['max_diff']}, media {result['mean_diff']:.3f}, "
+              f"{result['differing_pixels']} píxeles distintos; "
+              f"{memory[True] / 2**20:.1f} MB frente a {memory[False] / 2**20:.1f} MB")
+        return result
+    
+    def set_cluster_culling(self, enabled):
+        """
+        Activa o desactiva el descarte por clusters (frustum, planos de corte
+        y orientación) en mallas grandes
+        """
+        self.buffer_manager.set_cluster_culling(enabled)
+        self.update()
+    
+    def set_line_method(self, method):
+        """Selecciona cómo se dibujan las aristas ("instanced": quads instanciados, "geometry": geometry shader)"""
+        self.renderer.set_line_method(method)
+        self.update()
+    
+    def get_line_method(self):
+        """Retorna la ruta de dibujo de aristas seleccionada"""
+        return self.renderer.line_method
+    
+    @staticmethod
+    def _benchmark_grid(edge_count):
+        """Rejilla cúbica con al menos edge_count aristas en los tres ejes (coords, aristas)"""
+        side = max(2, int(round((edge_count / 3) ** (1.0 / 3.0))))
+        while 3 * side * side * (side - 1) < edge_count:
+            side += 1
+        
+        index = np.arange(side ** 3, dtype=np.uint32).reshape(side, side, side)
+        edges = np.concatenate([
+            np.stack([index[:-1, :, :].ravel(), index[1:, :, :].ravel()], axis=1),
+            np.stack([index[:, :-1, :].ravel(), index[:, 1:, :].ravel()], axis=1),
+            np.stack([index[:, :, :-1].ravel(), index[:, :, 1:].ravel()], axis=1)
+        ])[:edge_count]
+        
+        axis = np.linspace(0.0, 1.0, side, dtype=np.float32)
+        coords = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+        return coords, edges.reshape(-1)
+    
+    def benchmark_line_methods(self, edge_counts=(1_000_000, 5_000_000, 10_000_000), frames=10):
+        """
+        Compara las dos rutas de aristas sobre rejillas sintéticas de edge_counts aristas.
+        Retorna {aristas: {'geometry': ms, 'instanced': ms}} con el tiempo medio por cuadro
+        (medido con glFinish, en el framebuffer del widget).
+        """
+        if not self.gl_initialized:
+            print("OpenGL no está inicializado todavía")
+            return {}
+        
+        ratio = self.devicePixelRatioF()
+        pixel_width, pixel_height = int(self.width() * ratio), int(self.height() * ratio)
+        camera = Camera(np.full(3, 0.5), 1.5)
+        proj = Matrix44.perspective_projection(45.0, self.width() / max(self.height(), 1), 0.1, 15.0)
+        mvp = (camera.get_view_matrix() @ proj).astype(np.float32)
+        state = self.shader_manager.state
+        results = {}
+        
+        self.makeCurrent()
+        for edge_count in edge_counts:
+            coords, lines = self._benchmark_grid(edge_count)
+            buf = self.buffer_manager.create_line_set(coords, lines)
+            del coords, lines
+            results[edge_count] = {}
+            
+            for method in ("geometry", "instanced"):
+                glBindFramebuffer(GL_FRAMEBUFFER, self.defaultFramebufferObject())
+                glViewport(0, 0, pixel_width, pixel_height)
+                state.begin_frame()
+                if not self.renderer.render_line_set(buf, method, mvp, self.width(), self.height()):
+                    state.end_frame()
+                    continue
+                glFinish()
+                
+                start = time.perf_counter()
+                for _ in range(frames):
+                    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                    self.renderer.render_line_set(buf, method, mvp, self.width(), self.height())
+                glFinish()
+                results[edge_count][method] = (time.perf_counter() - start) * 1000.0 / frames
+                state.end_frame()
+            
+            self.buffer_manager.delete_line_set(buf)
+            print(f"Aristas {edge_count:,}: " + ", ".join(
+                f"{method} {ms:.2f} ms" for method, ms in results[edge_count].items()))
+        self.doneCurrent()
+        
+        self.update()
+        return results
+    
+    def benchmark_triangle_order(self, frames=20):
+        """
+        Compara el tiempo de la pasada sólida con el orden de triángulos cargado
+        y con los mismos triángulos barajados dentro de cada grupo (referencia
+        sin localidad). Retorna {'actual': ms, 'aleatorio': ms} con el tiempo
+        medio por cuadro (medido con glFinish) e imprime el ACMR de cada orden
+        (la carga del modelo no lo calcula: recorrer los índices en Python es
+        caro).
+        """
+        if not self.gl_initialized or self.buffer_manager.triangle_indices is None:
+            print("No hay un modelo cargado")
+            return {}
+        
+        current = self.buffer_manager.triangle_indices
+        triangles = current.reshape(-1, 3)
+        groups = self.buffer_manager.groups
+        if groups is not None:
+            group_of = np.repeat(np.arange(len(groups['tri_counts'])), groups['tri_counts'] // 3)
+        else:
+            group_of = np.zeros(len(triangles), dtype=np.int64)
+        shuffled = triangles[np.lexsort((np.random.default_rng(0).random(len(triangles)), group_of))]
+        orders = {'actual': current, 'aleatorio': shuffled.reshape(-1)}
+        
+        ratio = self.devicePixelRatioF()
+        pixel_width, pixel_height = int(self.width() * ratio), int(self.height() * ratio)
+        mvp = self._calculate_mvp_matrix()
+        state = self.shader_manager.state
+        lod_level = self.renderer.lod_level
+        self.renderer.lod_level = 0
+        self.renderer.visible_ranges = self.buffer_manager.get_draw_ranges()
+        results = {}
+        
+        self.makeCurrent()
+        for name, indices in orders.items():
+            self.buffer_manager.upload_triangle_order(indices)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.defaultFramebufferObject())
+            glViewport(0, 0, pixel_width, pixel_height)
+            state.begin_frame()
+            self.renderer.render_solid(mvp)
+            glFinish()
+            
+            start = time.perf_counter()
+            for _ in range(frames):
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                self.renderer.render_solid(mvp)
+            glFinish()
+            results[name] = (time.perf_counter() - start) * 1000.0 / frames
+            state.end_frame()
+            print(f"Orden {name}: {results[name]:.2f} ms, ACMR {acmr(indices):.3f}")
+        self.buffer_manager.upload_triangle_order(current)
+        self.doneCurrent()
+        
+        self.renderer.lod_level = lod_level
+        self.update()
+        return results
+    
+    def benchmark_coords_upload(self, frames=60, amplitude=None):
+        """
+        Deforma el modelo en cada cuadro (subida completa de posiciones) con
+        glBufferSubData directo y con buffers huérfanos (streaming). Los cuadros
+        se encadenan con glFlush, sin glFinish, de modo que una espera implícita
+        por un buffer en uso aparece en el tiempo de subida. Retorna por modo
+        {'mb_s': rendimiento de subida (incluye la preparación en CPU),
+        'frame_ms': media y 'frame_std_ms': desviación del tiempo de cuadro}.
+        """
+        if not self.gl_initialized or not self.buffers_created:
+            print("No hay un modelo cargado")
+            return {}
+        
+        bm = self.buffer_manager
+        base = bm.get_coords().astype(np.float64) + bm.get_origin()
+        if amplitude is None:
+            amplitude = 0.01 * self.camera.radius
+        phase = np.linspace(0.0, 2.0 * np.pi, len(base))
+        
+        ratio = self.devicePixelRatioF()
+        pixel_width, pixel_height = int(self.width() * ratio), int(self.height() * ratio)
+        mvp = self._calculate_mvp_matrix()
+        state = self.shader_manager.state
+        lod_level = self.renderer.lod_level
+        self.renderer.lod_level = 0
+        self.renderer.visible_ranges = bm.get_draw_ranges()
+        streaming = bm.streaming
+        results = {}
+        
+        self.makeCurrent()
+        for name, enabled in (('directo', False), ('streaming', True)):
+            bm.set_streaming(enabled)
+            glBindFramebuffer(GL_FRAMEBUFFER, self.defaultFramebufferObject())
+            glViewport(0, 0, pixel_width, pixel_height)
+            state.begin_frame()
+            glFinish()
+            
+            bm.upload_bytes = 0
+            upload_time = 0.0
+            frame_times = []
+            for frame in range(frames):
+                coords = base.copy()
+                coords[:, 1] += amplitude * np.sin(phase + 0.3 * frame)
+                start = time.perf_counter()
+                bm.update_coords(coords)
+                uploaded = time.perf_counter()
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                self.renderer.render_solid(mvp)
+                glFlush()
+                upload_time += uploaded - start
+                frame_times.append((time.perf_counter() - start) * 1000.0)
+            glFinish()
+            state.end_frame()
+            
+            results[name] = {
+                'mb_s': bm.upload_bytes / 1e6 / max(upload_time, 1e-9),
+                'frame_ms': float(np.mean(frame_times)),
+                'frame_std_ms': float(np.std(frame_times))
+            }
+            print(f"Subida {name}: {results[name]['mb_s']:.0f} MB/s, cuadro "
+                  f"{results[name]['frame_ms']:.2f} ± {results[name]['frame_std_ms']:.2f} ms")
+        
+        bm.set_streaming(streaming)
+        bm.update_coords(base)
+        self.doneCurrent()
+        
+        self.renderer.lod_level = lod_level
+        self.update()
+        return results
+    
+    def set_dynamic_resolution_enabled(self, enabled):
+        """Habilita o deshabilita la resolución reducida durante la interacción"""
+        self.resolution_manager.enabled = enabled
+        if not enabled:
+            self.resolution_manager.scale = self.resolution_manager.MAX_SCALE
+        self.update()
+    
+    def get_render_scale(self):
+        """Retorna la escala de resolución usada durante la interacción"""
+        return self.resolution_manager.scale
+    
+    def get_lod_info(self):
+        """Retorna (nivel actual, triángulos por nivel, último tiempo de cuadro en ms)"""
+        return (self.renderer.lod_level, self.buffer_manager.get_lod_triangle_counts(),
+                self.last_frame_ms)
+    
+    # ============ Estadísticas de Cuadro ============
+    
+    def set_stats_overlay_visible(self, visible):
+        """Muestra u oculta el panel de tiempos por pasada (activa la medición mientras se ve)"""
+        self.set_profiling_enabled(visible)
+        self.stats_overlay.setVisible(visible)
+        if visible:
+            self._update_stats_overlay()
+            self.stats_timer.start()
+        else:
+            self.stats_timer.stop()
+    
+    def set_profiling_enabled(self, enabled):
+        """Activa o desactiva la medición de tiempos sin mostrar el panel (p. ej. para benchmarks)"""
+        if enabled and not self.profiler.enabled:
+            self.profiler.reset()
+        self.profiler.enabled = enabled
+        self.update()
+    
+    def get_frame_stats(self):
+        """
+        Retorna las estadísticas medias de los últimos cuadros: fps, ms por pasada
+        en GPU y CPU, triángulos y líneas dibujados, llamadas GL emitidas y
+        omitidas por la caché de estado y clusters dibujados en el último
+        cuadro, memoria de GPU y bytes del modelo (y los que ocuparía en float).
+        """
+        stats = self.profiler.get_stats()
+        stats['buffer_bytes'] = self.buffer_manager.get_memory_usage()
+        stats['gpu_memory'] = None
+        if self.gl_initialized:
+            self.makeCurrent()
+            stats['gpu_memory'] = self.profiler.get_gpu_memory()
+            self.doneCurrent()
+        stats['gl_calls'], stats['gl_calls_skipped'] = self.shader_manager.state.get_stats()
+        stats['clusters_drawn'], stats['clusters_total'] = self.buffer_manager.get_cluster_stats()
+        stats['model_bytes'], stats['model_float_bytes'] = self.buffer_manager.get_model_memory()
+        stats['lod_level'] = self.renderer.lod_level
+        stats['render_scale'] = self.resolution_manager.scale
+        return stats
+    
+    def _update_stats_overlay(self):
+        """Refresca el texto del panel de estadísticas"""
+        stats = self.get_frame_stats()
+        lines = [f"{stats['fps']:6.1f} fps   {stats['frame_ms']:6.2f} ms/cuadro",
+                 f"CPU cuadro {stats['cpu_frame_ms']:6.2f} ms",
+                 "pasada          GPU ms   CPU ms"]
+        for name, cpu_ms in stats['cpu_ms'].items():
+            gpu_ms = stats['gpu_ms'].get(name)
+            gpu_text = f"{gpu_ms:8.2f}" if gpu_ms is not None else "       -"
+            lines.append(f"{name:<14}{gpu_text} {cpu_ms:8.2f}")
+        lines.append(f"triángulos {stats['triangles']:,}   líneas {stats['lines']:,}")
+        lines.append(f"llamadas GL {stats['gl_calls']}   omitidas {stats['gl_calls_skipped']}")
+        if stats['clusters_total'] > 0:
+            lines.append(f"clusters {stats['clusters_drawn']}/{stats['clusters_total']}")
+        lines.append(f"nivel {stats['lod_level']}   escala {stats['render_scale']:.2f}")
+        memory = f"buffers {stats['buffer_bytes'] / 2**20:.1f} MB"
+        if stats['model_bytes'] < stats['model_float_bytes']:
+            saved = stats['model_float_bytes'] - stats['model_bytes']
+            memory += f" (compacto, -{saved / 2**20:.1f} MB)"
+        if stats['gpu_memory'] is not None:
+            used, total = stats['gpu_memory']
+            memory += f"   GPU {used / 2**20:.0f}/{total / 2**20:.0f} MB"
+        lines.append(memory)
+        
+        self.stats_overlay.setText("\n".join(lines))
+        self.stats_overlay.adjustSize()
+    
+    # ============ Planos de Corte ============
+    
+    def set_clip_enabled(self, enabled):
+        """Habilita o deshabilita los planos de corte"""
+        self.clip_manager.enabled = enabled
+        self.update()
+    
+    def set_clip_gizmo_visible(self, visible):
+        """Muestra u oculta el gizmo de la caja de corte"""
+        self.clip_manager.show_gizmo = visible
+        self.update()
+    
+    def set_active_clip_plane(self, index):
+        """Selecciona el plano que se mueve con Shift + arrastre"""
+        if 0 <= index < self.clip_manager.MAX_PLANES:
+            self.clip_manager.active_plane = index
+    
+    def set_clip_box_face(self, face, fraction):
+        """Coloca una cara de la caja de corte en una fracción de los límites del modelo"""
+        self.clip_manager.set_box_face(face, fraction)
+        self.update()
+    
+    def get_clip_box_face(self, face):
+        """Retorna la posición de una cara de la caja como fracción de los límites"""
+        return self.clip_manager.get_box_face_fraction(face)
+    
+    def reset_clip_box(self):
+        """Restablece la caja de corte a los límites del modelo"""
+        self.clip_manager.set_box(self.clip_manager.bounds_min, self.clip_manager.bounds_max)
+        self.clip_changed.emit()
+        self.update()
+    
+    def set_clip_plane(self, index, normal, offset):
+        """
+        Establece un plano de corte arbitrario (normal · p + offset >= 0 se conserva)
+        en coordenadas del mundo; los planos se guardan relativos al origen del modelo
+        """
+        offset = offset + float(np.dot(normal, self.buffer_manager.get_origin()))
+        if self.clip_manager.set_plane(index, normal, offset):
+            self.update()
+    
+    def set_clip_cap_color(self, color):
+        """Establece el color plano de las caras interiores expuestas por el corte"""
+        self.clip_manager.cap_color = tuple(color)
+        self.update()
+    
+    # ============ Superficies Auxiliares ============
+    
+    def set_aux_surface(self, name, coords, triangle_indices, values, value_range=None, line_indices=None):
+        """Muestra una superficie auxiliar (p. ej. una isosuperficie) coloreada por sus valores"""
+        if not self.gl_initialized:
+            print("OpenGL no está inicializado todavía")
+            return False
+        
+        self.makeCurrent()
+        success = self.buffer_manager.set_aux_surface(name, coords, triangle_indices, values,
+                                                     value_range, line_indices)
+        self.doneCurrent()
+        
+        self.update()
+        return success
+    
+    def remove_aux_surface(self, name):
+        """Elimina una superficie auxiliar"""
+        if not self.gl_initialized:
+            return
+        
+        self.makeCurrent()
+        self.buffer_manager.remove_aux_surface(name)
+        self.doneCurrent()
+        self.update()
+    
+    # ============ Partes (grupos por material) ============
+    
+    def get_parts(self):
+        """Retorna los ids de material de las partes del modelo"""
+        if self.groups is None:
+            return []
+        return [int(material) for material in self.groups['materiales']]
+    
+    def is_part_visible(self, material):
+        """Retorna si una parte está visible"""
+        return self.buffer_manager.is_group_visible(material)
+    
+    def set_part_visible(self, material, visible):
+        """Muestra u oculta una parte sin volver a subir geometría"""
+        self.buffer_manager.set_group_visible(material, visible)
+        self.update()
+    
+    def set_all_parts_visible(self, visible):
+        """Muestra u oculta todas las partes"""
+        self.buffer_manager.set_all_groups_visible(visible)
+        self.update()
+    
+    def set_parts_colored(self, enabled, colors=None):
+        """Colorea cada parte con su color (dict material -> RGBA) en el modo sólido"""
+        self.buffer_manager.set_group_colors(colors, enabled)
+        self.update()
+    
+    def set_model_visible(self, visible):
+        """Muestra u oculta el modelo principal, p. ej. mientras un filtro lo reemplaza"""
+        self.renderer.set_model_visible(visible)
+        self.update()
+    
     # ============ Gestión de Gradientes ============
     
     def set_node_values(self, values, auto_range=True):
@@ -248,7 +958,12 @@ class OpenGLWidget(QOpenGLWidget):
     
     def set_color_palette(self, palette_name):
         """Cambia la paleta de colores."""
-        if self.colormap_manager.set_palette(palette_name):
+        # La textura se sube con el contexto propio: ThumbnailRenderer deja
+        # el hilo de la interfaz sin contexto actual
+        self.makeCurrent()
+        cambiada = self.colormap_manager.set_palette(palette_name)
+        self.doneCurrent()
+        if cambiada:
             self.update()
     
     def enable_gradient(self, enabled=True):
@@ -297,6 +1012,9 @@ class OpenGLWidget(QOpenGLWidget):
                 self.makeCurrent()
                 self.buffer_manager.cleanup()
                 self.colormap_manager.cleanup()
+                self.clip_manager.cleanup()
+                self.resolution_manager.cleanup()
+                self.profiler.cleanup()
                 self.doneCurrent()
                 self.buffers_created = False
             print("Recursos OpenGL liberados")
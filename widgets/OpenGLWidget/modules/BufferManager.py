@@ -1,46 +1,236 @@
 """
 Módulo para gestión de buffers OpenGL
 """
+import ctypes
 import numpy as np
 from OpenGL.GL import *
+from utils.lod import promediar_en_nivel
+from utils.malla import angulos_diedros, ordenar_aristas_por_angulo, aristas_vivas_por_grupo
+from utils.clusters import construir_clusters, geometria_clusters, planos_frustum, posicion_camara, clusters_visibles
+from utils.cuantizacion import (cuantizar_posiciones, cuantizar_valores, indices_por_trozos,
+                                primera_copia, partir_rangos)
 
 class BufferManager:
     """Gestiona los buffers OpenGL (VAO, VBO, IBO)"""
     
+    # Triángulos por cluster y mínimo de triángulos para dividir el modelo
+    CLUSTER_SIZE = 65536
+    CLUSTER_MIN_TRIANGLES = 4 * CLUSTER_SIZE
+    
     def __init__(self):
+        # Coordenadas en float32 relativas al origen del modelo (float64): las
+        # coordenadas georreferenciadas (UTM, ~1e6 m) perderían en float32 la
+        # precisión de los desplazamientos; restando el origen solo queda la
+        # extensión del modelo. La vista vuelve a sumar el origen en float64
         self.coords_array = None
+        self.origin = np.zeros(3, dtype=np.float64)
         self.triangle_indices = None
         self.line_indices = None
         self.line_vertices_buffer = None
         self.buffers = self._init_buffer_structure()
+        self.aux_surfaces = {}
+        
+        # Grupos por material: rangos de dibujo dentro de los índices ya subidos.
+        # La visibilidad y los colores se conservan entre modelos por id de material
+        self.groups = None
+        self.hidden_materials = set()
+        self.material_colors = {}
+        self.group_colors_enabled = False
+        self.draw_ranges = None
+        
+        # Aristas vivas: ángulo diedro por arista (ordenadas de mayor a menor en
+        # cada grupo) y umbral en grados; None = todas las aristas
+        self.edge_angles = None
+        self.feature_angle = None
+        
+        # Clusters del modelo para descartar por frustum y orientación
+        # (None en mallas pequeñas, que se dibujan completas)
+        self.clusters = None
+        self.closed_surface = False
+        self.cluster_culling = True
+        self.cluster_stats = (0, 0)
+        
+        # Formato compacto del modelo (opcional): posiciones unorm16 en la caja
+        # del modelo, valores unorm16 en su rango e índices uint16 por trozos
+        # con vértice base (vertex_remap: vértice original de cada vértice
+        # subido; None si los índices quedaron de 32 bits)
+        self.compact = False
+        self.vertex_remap = None
+        self.index_chunks = None
+        self.compact_bytes = 0
+        
+        # Subidas en streaming (deformación por cuadro): cada actualización
+        # deja huérfano el almacenamiento del buffer con glBufferData(None) antes de
+        # escribirlo, de modo que el controlador asigna memoria nueva en lugar
+        # de esperar a que la GPU termine de leer la anterior
+        self.streaming = False
+        self.upload_bytes = 0
+        
+        # Niveles de detalle: superficies simplificadas con sus propios buffers
+        self.lod_levels = []
+        self.gradient_values = None
     
     def _init_buffer_structure(self):
         """Inicializa la estructura de buffers"""
         return {
             'solid': {'vao': None, 'vbo': None, 'ibo': None, 'count': 0},
-            'line': {'vao': None, 'vbo': None, 'count': 0},
+            'line': {'vao': None, 'vbo': None, 'edge_vbo': None, 'count': 0},
             'gradient': {'vao': None, 'vbo_pos': None, 'vbo_val': None, 'ibo': None, 'count': 0}
         }
     
-    def initialize(self, coords, triangle_indices, line_indices):
+    def initialize(self, coords, triangle_indices, line_indices, groups=None):
         """Inicializa el BufferManager con los datos de la geometría"""
-        self.coords_array = np.asarray(coords, dtype=np.float32)
+        coords = np.asarray(coords, dtype=np.float64)
+        self.origin = (0.5 * (coords.min(axis=0) + coords.max(axis=0))
+                       if len(coords) else np.zeros(3, dtype=np.float64))
+        self.coords_array = self.to_local(coords)
         self.triangle_indices = np.asarray(triangle_indices, dtype=np.uint32)
-        self.line_indices = np.asarray(line_indices, dtype=np.uint32)
+        self.line_indices, self.edge_angles = self._sort_edges_by_angle(
+            self.coords_array, self.triangle_indices, line_indices, groups)
+        self._build_clusters(groups)
+        self.gradient_values = None
+        self.set_groups(groups)
         return self
     
+    def to_local(self, coords):
+        """Coordenadas del mundo (restadas en float64) a float32 relativas al origen del modelo"""
+        return (np.asarray(coords, dtype=np.float64) - self.origin).astype(np.float32)
+    
+    def get_origin(self):
+        """Origen del modelo en coordenadas del mundo (float64)"""
+        return self.origin
+    
+    @staticmethod
+    def _sort_edges_by_angle(coords, triangle_indices, line_indices, groups):
+        """Calcula el ángulo diedro de cada arista y las ordena de mayor a menor en cada grupo"""
+        angles = angulos_diedros(coords, triangle_indices, line_indices)
+        lines, angles = ordenar_aristas_por_angulo(line_indices, angles, groups)
+        return lines.astype(np.uint32), angles
+    
     def create_all_buffers(self):
         """Crea todos los buffers OpenGL"""
         if self.coords_array is None or self.triangle_indices is None or self.line_indices is None:
             raise RuntimeError("BufferManager no ha sido inicializado. Llame a initialize() primero.")
         
-        self._prepare_line_buffer()
-        self._create_solid_buffers()
-        self._create_line_buffers()
-        self._create_gradient_buffers()
+        if self.compact:
+            self._create_compact_buffers()
+        else:
+            self.vertex_remap = None
+            self.index_chunks = None
+            self._prepare_line_buffer()
+            self._create_solid_buffers()
+            self._create_line_buffers()
+            self._create_gradient_buffers()
         glBindVertexArray(0)
+        self._update_draw_ranges()
         print("Buffers creados exitosamente")
     
+    def _create_compact_buffers(self):
+        """
+        Crea los buffers del modelo en formato compacto.
+        
+        Posiciones RGBA16 normalizadas (8 bytes por vértice) compartidas por los
+        programas sólido y de gradientes y por el texture buffer de las aristas
+        instanciadas; valores unorm16; índices uint16 por trozos con vértice
+        base si compensan los vértices duplicados en los bordes de los trozos,
+        si no uint32. Las aristas del geometry shader usan el mismo formato.
+        """
+        vertex_count = len(self.coords_array)
+        indices, remap, starts, bases = indices_por_trozos(self.triangle_indices, vertex_count)
+        if len(remap) * 8 + indices.nbytes < vertex_count * 8 + self.triangle_indices.nbytes:
+            self.vertex_remap = remap
+            self.index_chunks = (starts, bases)
+        else:
+            self.vertex_remap = None
+            self.index_chunks = None
+            indices = self.triangle_indices
+        del remap
+        
+        packed, decode = self._pack_positions()
+        solid_buf = self.buffers['solid']
+        solid_buf['vao'] = glGenVertexArrays(1)
+        solid_buf['vbo'] = glGenBuffers(1)
+        solid_buf['ibo'] = glGenBuffers(1)
+        solid_buf['count'] = len(self.triangle_indices)
+        
+        glBindVertexArray(solid_buf['vao'])
+        glBindBuffer(GL_ARRAY_BUFFER, solid_buf['vbo'])
+        glBufferData(GL_ARRAY_BUFFER, packed.nbytes, packed, GL_DYNAMIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_UNSIGNED_SHORT, GL_TRUE, 8, None)
+        glEnableVertexAttribArray(0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, solid_buf['ibo'])
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        
+        # Gradientes: mismas posiciones e índices, solo el buffer de valores es propio
+        grad_buf = self.buffers['gradient']
+        grad_buf['vao'] = glGenVertexArrays(1)
+        grad_buf['vbo_val'] = glGenBuffers(1)
+        grad_buf['count'] = len(self.triangle_indices)
+        glBindVertexArray(grad_buf['vao'])
+        glBindBuffer(GL_ARRAY_BUFFER, solid_buf['vbo'])
+        glVertexAttribPointer(0, 3, GL_UNSIGNED_SHORT, GL_TRUE, 8, None)
+        glEnableVertexAttribArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, grad_buf['vbo_val'])
+        dummy_values = np.zeros(len(packed), dtype=np.uint16)
+        glBufferData(GL_ARRAY_BUFFER, dummy_values.nbytes, dummy_values, GL_DYNAMIC_DRAW)
+        glVertexAttribPointer(1, 1, GL_UNSIGNED_SHORT, GL_TRUE, 0, None)
+        glEnableVertexAttribArray(1)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, solid_buf['ibo'])
+        
+        # Aristas: vértices expandidos para el geometry shader e instanciadas sobre las posiciones
+        line_buf = self.buffers['line']
+        line_buf['vao'] = glGenVertexArrays(1)
+        line_buf['vbo'] = glGenBuffers(1)
+        line_buf['count'] = len(self.line_indices)
+        glBindVertexArray(line_buf['vao'])
+        glBindBuffer(GL_ARRAY_BUFFER, line_buf['vbo'])
+        glBufferData(GL_ARRAY_BUFFER, self.line_vertices_buffer.nbytes, self.line_vertices_buffer, GL_DYNAMIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_UNSIGNED_SHORT, GL_TRUE, 8, None)
+        glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+        
+        edges = self.line_indices
+        if self.vertex_remap is not None:
+            edges = primera_copia(self.vertex_remap, vertex_count)[self.line_indices].astype(np.uint32)
+        line_buf['edge_vbo'] = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, line_buf['edge_vbo'])
+        glBufferData(GL_ARRAY_BUFFER, edges.nbytes, edges, GL_STATIC_DRAW)
+        self._create_edge_instancing(line_buf, solid_buf['vbo'], line_buf['edge_vbo'],
+                                     len(packed), len(self.line_indices) // 2, packed=True)
+        
+        for buf_type in ('solid', 'gradient', 'line'):
+            self.buffers[buf_type]['position_decode'] = decode
+        self.buffers['gradient']['value_decode'] = (1.0, 0.0)
+        self.compact_bytes = (packed.nbytes + indices.nbytes + dummy_values.nbytes
+                              + self.line_vertices_buffer.nbytes + edges.nbytes)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+    
+    def set_compact(self, enabled):
+        """
+        Cambia el formato de los buffers del modelo; si ya existen se vuelven a
+        crear con las coordenadas y valores actuales (requiere el contexto activo)
+        """
+        self.compact = bool(enabled)
+        if self.line_vertices_buffer is None or self.buffers['solid']['vao'] is None:
+            return
+        for buf_type in self.buffers.values():
+            self._delete_buffer_set(buf_type)
+        self.buffers = self._init_buffer_structure()
+        self.create_all_buffers()
+        if self.gradient_values is not None:
+            self.update_gradient_values(self.gradient_values)
+    
+    def _pack_positions(self):
+        """
+        Cuantiza las coordenadas actuales; prepara también los vértices
+        expandidos de las aristas. Retorna (posiciones a subir, (escala, desplazamiento)).
+        """
+        packed, scale, offset = cuantizar_posiciones(self.coords_array)
+        self.line_vertices_buffer = packed[self.line_indices]
+        if self.vertex_remap is not None:
+            packed = packed[self.vertex_remap]
+        return packed, (tuple(scale.tolist()), tuple(offset.tolist()))
+    
     def _prepare_line_buffer(self):
         """Prepara el buffer de vértices para líneas"""
         self.line_vertices_buffer = np.zeros(len(self.line_indices) * 3, dtype=np.float32)
@@ -83,6 +273,86 @@ class BufferManager:
         glBufferData(GL_ARRAY_BUFFER, self.line_vertices_buffer.nbytes, self.line_vertices_buffer, GL_DYNAMIC_DRAW)
         glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
         glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+        
+        # Aristas instanciadas: pares de índices sobre el buffer de posiciones del sólido
+        line_buf['edge_vbo'] = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, line_buf['edge_vbo'])
+        glBufferData(GL_ARRAY_BUFFER, self.line_indices.nbytes, self.line_indices, GL_STATIC_DRAW)
+        self._create_edge_instancing(line_buf, self.buffers['solid']['vbo'], line_buf['edge_vbo'],
+                                     len(self.coords_array), len(self.line_indices) // 2)
+    
+    def _create_edge_instancing(self, buf, position_vbo, edge_buffer, vertex_count, edge_count, packed=False):
+        """
+        Prepara el dibujo de aristas como quads instanciados: un VAO con un par
+        de índices por instancia (divisor 1) y un texture buffer sobre las
+        posiciones ya subidas, sin copiarlas (R32F, o RGBA16 si están
+        cuantizadas). Si el texture buffer no admite tantos vértices, el
+        conjunto queda solo con la ruta del geometry shader.
+        """
+        buf.pop('edge_vao', None)
+        buf.pop('position_texture', None)
+        texels = vertex_count if packed else vertex_count * 3
+        if texels > int(glGetIntegerv(GL_MAX_TEXTURE_BUFFER_SIZE)):
+            print(f"Advertencia: {vertex_count} vértices exceden GL_MAX_TEXTURE_BUFFER_SIZE, "
+                  f"las aristas usan el geometry shader")
+            return False
+        
+        buf['edge_vao'] = glGenVertexArrays(1)
+        buf['edge_buffer'] = edge_buffer
+        buf['edge_count'] = edge_count
+        buf['packed_positions'] = packed
+        glBindVertexArray(buf['edge_vao'])
+        glBindBuffer(GL_ARRAY_BUFFER, edge_buffer)
+        glVertexAttribIPointer(0, 2, GL_UNSIGNED_INT, 0, None)
+        glVertexAttribDivisor(0, 1)
+        glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+        
+        buf['position_texture'] = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_BUFFER, buf['position_texture'])
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_RGBA16 if packed else GL_R32F, position_vbo)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        return True
+    
+    def create_line_set(self, coords, line_indices):
+        """
+        Crea un conjunto de aristas independiente del modelo con ambas rutas de
+        dibujo (vértices expandidos para el geometry shader y aristas instanciadas).
+        Se elimina con delete_line_set().
+        """
+        coords_array = np.ascontiguousarray(coords, dtype=np.float32)
+        lines_array = np.ascontiguousarray(line_indices, dtype=np.uint32).reshape(-1)
+        expanded = coords_array[lines_array].reshape(-1)
+        
+        buf = {
+            'vao': glGenVertexArrays(1),
+            'vbo': glGenBuffers(1),
+            'vbo_pos': glGenBuffers(1),
+            'edge_vbo': glGenBuffers(1),
+            'count': len(lines_array)
+        }
+        
+        glBindVertexArray(buf['vao'])
+        glBindBuffer(GL_ARRAY_BUFFER, buf['vbo'])
+        glBufferData(GL_ARRAY_BUFFER, expanded.nbytes, expanded, GL_STATIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+        del expanded
+        
+        glBindBuffer(GL_ARRAY_BUFFER, buf['vbo_pos'])
+        glBufferData(GL_ARRAY_BUFFER, coords_array.nbytes, coords_array, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, buf['edge_vbo'])
+        glBufferData(GL_ARRAY_BUFFER, lines_array.nbytes, lines_array, GL_STATIC_DRAW)
+        self._create_edge_instancing(buf, buf['vbo_pos'], buf['edge_vbo'],
+                                     len(coords_array), len(lines_array) // 2)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return buf
+    
+    def delete_line_set(self, buf):
+        """Elimina un conjunto creado con create_line_set()"""
+        self._delete_buffer_set(buf)
     
     def _create_gradient_buffers(self):
         """Crea buffers para renderizado con gradientes"""
@@ -112,12 +382,30 @@ class BufferManager:
         glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, grad_buf['ibo'])
         glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.triangle_indices.nbytes, self.triangle_indices, GL_STATIC_DRAW)
     
+    def _build_clusters(self, groups):
+        """Reordena los triángulos por clusters espaciales si la malla es grande"""
+        self.clusters = None
+        self.closed_surface = False
+        self.cluster_stats = (0, 0)
+        if len(self.triangle_indices) // 3 < self.CLUSTER_MIN_TRIANGLES:
+            return
+        
+        triangle_indices, self.clusters = construir_clusters(
+            self.coords_array, self.triangle_indices, groups, self.CLUSTER_SIZE)
+        self.triangle_indices = triangle_indices.astype(np.uint32)
+        
+        # Superficie cerrada (cada arista en dos triángulos: 2·aristas = 3·triángulos);
+        # si no, las caras traseras pueden verse y no se descartan por orientación
+        triangles = len(self.triangle_indices) // 3
+        self.closed_surface = len(self.line_indices) == triangles * 3
+        self.cluster_stats = (len(self.clusters['inicio']), len(self.clusters['inicio']))
+    
     def update_coords(self, new_coords):
-        """Actualiza las coordenadas de los vértices"""
+        """Actualiza las coordenadas de los vértices (en coordenadas del mundo)"""
         if self.coords_array is None:
             raise RuntimeError("BufferManager no ha sido inicializado.")
         
-        new_coords_array = np.asarray(new_coords, dtype=np.float32)
+        new_coords_array = self.to_local(new_coords)
         if new_coords_array.shape != self.coords_array.shape:
             print(f"Error: Las nuevas coordenadas deben tener la misma forma que las originales")
             print(f"Original: {self.coords_array.shape}, Nueva: {new_coords_array.shape}")
@@ -126,22 +414,78 @@ class BufferManager:
         # Actualizar coordenadas
         self.coords_array[:] = new_coords_array
         
+        if self.compact:
+            # Se recuantiza en la caja de las nuevas coordenadas
+            packed, decode = self._pack_positions()
+            self._upload_array(self.buffers['solid']['vbo'], packed)
+            self._upload_array(self.buffers['line']['vbo'], self.line_vertices_buffer)
+            for buf_type in ('solid', 'gradient', 'line'):
+                self.buffers[buf_type]['position_decode'] = decode
+            self._update_cluster_bounds()
+            self._update_lod_coords()
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            return True
+        
         # Actualizar buffer sólido
-        glBindBuffer(GL_ARRAY_BUFFER, self.buffers['solid']['vbo'])
-        glBufferSubData(GL_ARRAY_BUFFER, 0, self.coords_array.nbytes, self.coords_array)
+        self._upload_array(self.buffers['solid']['vbo'], self.coords_array)
         
         # Actualizar buffer de gradientes
-        glBindBuffer(GL_ARRAY_BUFFER, self.buffers['gradient']['vbo_pos'])
-        glBufferSubData(GL_ARRAY_BUFFER, 0, self.coords_array.nbytes, self.coords_array)
+        self._upload_array(self.buffers['gradient']['vbo_pos'], self.coords_array)
         
         # Actualizar buffer de líneas
         self._update_line_vertices_buffer()
-        glBindBuffer(GL_ARRAY_BUFFER, self.buffers['line']['vbo'])
-        glBufferSubData(GL_ARRAY_BUFFER, 0, self.line_vertices_buffer.nbytes, self.line_vertices_buffer)
+        self._upload_array(self.buffers['line']['vbo'], self.line_vertices_buffer)
+        
+        # Actualizar cajas y conos de los clusters
+        self._update_cluster_bounds()
+        
+        # Actualizar niveles de detalle
+        self._update_lod_coords()
         
         glBindBuffer(GL_ARRAY_BUFFER, 0)
         return True
     
+    def _upload_array(self, vbo, data):
+        """
+        Reescribe todo el contenido de un buffer de vértices (queda enlazado).
+        En modo streaming el almacenamiento anterior se deja huérfano primero, así
+        la escritura no se sincroniza con los cuadros que aún lo están leyendo
+        """
+        data = np.ascontiguousarray(data)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        if self.streaming:
+            glBufferData(GL_ARRAY_BUFFER, data.nbytes, None, GL_STREAM_DRAW)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, data.nbytes, data)
+        self.upload_bytes += data.nbytes
+    
+    def set_streaming(self, enabled):
+        """Activa las subidas con almacenamiento huérfano para geometría que cambia en cada cuadro"""
+        self.streaming = bool(enabled)
+    
+    def _update_cluster_bounds(self):
+        """Recalcula cajas y conos de los clusters tras mover los vértices"""
+        if self.clusters is not None:
+            self.clusters.update(geometria_clusters(self.coords_array, self.triangle_indices,
+                                                    self.clusters['inicio']))
+    
+    def upload_triangle_order(self, triangle_indices):
+        """
+        Sube a los IBO sólido y de gradiente otro orden de los mismos
+        triángulos (mismo tamaño) sin tocar triangle_indices.
+        """
+        indices = np.asarray(triangle_indices, dtype=np.uint32)
+        if self.triangle_indices is None or indices.shape != self.triangle_indices.shape:
+            print("Error: El nuevo orden debe tener la misma cantidad de índices")
+            return False
+        if self.compact:
+            print("Error: El formato compacto no admite reordenar los índices subidos")
+            return False
+        for buf_type in ('solid', 'gradient'):
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.buffers[buf_type]['ibo'])
+            glBufferSubData(GL_ELEMENT_ARRAY_BUFFER, 0, indices.nbytes, indices)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        return True
+    
     def update_gradient_values(self, values):
         """Actualiza los valores del gradiente"""
         if self.coords_array is None:
@@ -153,32 +497,477 @@ class BufferManager:
             print(f"Error: Se esperan {len(self.coords_array)} valores, se recibieron {len(values_array)}")
             return False
         
-        glBindBuffer(GL_ARRAY_BUFFER, self.buffers['gradient']['vbo_val'])
-        glBufferSubData(GL_ARRAY_BUFFER, 0, values_array.nbytes, values_array)
+        if self.compact:
+            packed, scale, offset = cuantizar_valores(values_array)
+            if self.vertex_remap is not None:
+                packed = packed[self.vertex_remap]
+            self._upload_array(self.buffers['gradient']['vbo_val'], packed)
+            self.buffers['gradient']['value_decode'] = (scale, offset)
+        else:
+            self._upload_array(self.buffers['gradient']['vbo_val'], values_array)
+        self.gradient_values = values_array
+        self._update_lod_values(values_array)
         glBindBuffer(GL_ARRAY_BUFFER, 0)
         return True
     
+    # ============ Grupos por material ============
+    
+    @staticmethod
+    def _normalize_groups(groups):
+        """Convierte los rangos de grupos a los tipos que consume OpenGL"""
+        if groups is None:
+            return None
+        tri_starts, tri_counts = groups['triangulos']
+        line_starts, line_counts = groups['lineas']
+        return {
+            'materials': np.asarray(groups['materiales'], dtype=np.int32),
+            'tri_starts': np.asarray(tri_starts, dtype=np.int64),
+            'tri_counts': np.asarray(tri_counts, dtype=np.int32),
+            'line_starts': np.asarray(line_starts, dtype=np.int32),
+            'line_counts': np.asarray(line_counts, dtype=np.int32)
+        }
+    
+    def set_groups(self, groups):
+        """
+        Establece los grupos de dibujo ({'materiales', 'triangulos': (inicios, conteos),
+        'lineas': (inicios, conteos)}), en número de índices. None = un solo grupo.
+        """
+        self.groups = self._normalize_groups(groups)
+        self._update_draw_ranges()
+    
+    def _triangle_ranges(self, materials, tri_starts, tri_counts, chunks=None):
+        """
+        Rangos de triángulos para glMultiDrawElements (en número de índices).
+        Con índices uint16 por trozos, cada rango se parte en los límites de los
+        trozos y lleva el vértice base de cada pieza.
+        """
+        if chunks is None:
+            tri_offsets = np.asarray(tri_starts, dtype=np.int64) * np.dtype(np.uint32).itemsize
+            return {
+                'materials': materials,
+                'tri_starts': tri_starts,
+                'tri_counts': np.asarray(tri_counts, dtype=np.int32),
+                'tri_offsets': (ctypes.c_void_p * len(tri_offsets))(*tri_offsets.tolist())
+            }
+        
+        source, starts, counts, bases = partir_rangos(tri_starts, tri_counts, *chunks)
+        tri_offsets = starts * np.dtype(np.uint16).itemsize
+        return {
+            'materials': np.asarray(materials)[source],
+            'tri_starts': starts,
+            'tri_counts': counts.astype(np.int32),
+            'tri_offsets': (ctypes.c_void_p * len(tri_offsets))(*tri_offsets.tolist()),
+            'tri_basevertex': bases.astype(np.int32)
+        }
+    
+    def _compute_draw_ranges(self, groups, edge_angles=None, index_count=0, line_index_count=0, chunks=None):
+        """
+        Rangos visibles de un conjunto de grupos, o None si se dibuja todo de una
+        vez (nunca con índices por trozos, que siempre se dibujan por rangos)
+        """
+        features = self.feature_angle is not None and edge_angles is not None
+        if groups is None:
+            if not features and chunks is None:
+                return None
+            # Sin materiales, el filtro de aristas vivas usa un único grupo
+            groups = {
+                'materials': np.zeros(1, dtype=np.int32),
+                'tri_starts': np.zeros(1, dtype=np.int64),
+                'tri_counts': np.array([index_count], dtype=np.int32),
+                'line_starts': np.zeros(1, dtype=np.int32),
+                'line_counts': np.array([line_index_count], dtype=np.int32)
+            }
+        
+        materials = groups['materials']
+        visible = ~np.isin(materials, list(self.hidden_materials))
+        if visible.all() and not self.group_colors_enabled and not features and chunks is None:
+            # Todo visible con un solo color: basta un glDrawElements completo
+            return None
+        
+        index_size = np.dtype(np.uint32).itemsize
+        line_counts = groups['line_counts']
+        if features:
+            # Las aristas vivas son un prefijo de cada grupo
+            line_counts = 2 * aristas_vivas_por_grupo(edge_angles, self.feature_angle,
+                                                      groups['line_starts'] // 2,
+                                                      line_counts // 2).astype(np.int32)
+        line_counts = line_counts[visible]
+        has_lines = line_counts > 0
+        line_firsts = groups['line_starts'][visible][has_lines]
+        line_offsets = line_firsts.astype(np.int64) * index_size
+        
+        ranges = self._triangle_ranges(materials[visible], groups['tri_starts'][visible],
+                                       groups['tri_counts'][visible], chunks)
+        ranges.update({
+            'line_firsts': line_firsts,
+            'line_counts': line_counts[has_lines],
+            'line_offsets': (ctypes.c_void_p * len(line_offsets))(*line_offsets.tolist())
+        })
+        return ranges
+    
+    def _update_draw_ranges(self):
+        """Recalcula los rangos visibles del modelo y de sus niveles de detalle"""
+        if self.triangle_indices is None:
+            return
+        self.draw_ranges = self._compute_draw_ranges(self.groups, self.edge_angles,
+                                                     len(self.triangle_indices), len(self.line_indices),
+                                                     self.index_chunks)
+        for level in self.lod_levels:
+            level['ranges'] = self._compute_draw_ranges(level['groups'], level['edge_angles'],
+                                                        level['count'], level['line_count'])
+    
+    def get_group_materials(self):
+        """Retorna los ids de material de los grupos del modelo actual"""
+        if self.groups is None:
+            return []
+        return self.groups['materials'].tolist()
+    
+    def set_group_visible(self, material, visible):
+        """Muestra u oculta un grupo (solo cambia los rangos que se dibujan)"""
+        if visible:
+            self.hidden_materials.discard(material)
+        else:
+            self.hidden_materials.add(material)
+        self._update_draw_ranges()
+    
+    def set_all_groups_visible(self, visible):
+        """Muestra u oculta todos los grupos del modelo actual"""
+        if visible:
+            self.hidden_materials.clear()
+        else:
+            self.hidden_materials.update(self.get_group_materials())
+        self._update_draw_ranges()
+    
+    def is_group_visible(self, material):
+        """Retorna si un grupo está visible"""
+        return material not in self.hidden_materials
+    
+    def set_group_colors(self, colors, enabled=True):
+        """Asigna colores RGBA por material y activa o desactiva su uso"""
+        if colors:
+            self.material_colors.update({int(m): tuple(c) for m, c in colors.items()})
+        self.group_colors_enabled = enabled
+        self._update_draw_ranges()
+    
+    def set_feature_angle(self, angle):
+        """Dibuja solo las aristas con ángulo diedro >= angle (grados); None = todas"""
+        self.feature_angle = None if angle is None else float(angle)
+        self._update_draw_ranges()
+    
+    def get_edge_counts(self):
+        """Retorna (aristas totales, aristas dibujadas con el filtro de ángulo actual)"""
+        if self.line_indices is None:
+            return 0, 0
+        total = len(self.line_indices) // 2
+        if self.feature_angle is None or self.edge_angles is None:
+            return total, total
+        return total, int(np.count_nonzero(self.edge_angles >= self.feature_angle))
+    
+    def get_draw_ranges(self):
+        """Retorna los rangos visibles, o None si se dibuja el modelo completo de una vez"""
+        return self.draw_ranges
+    
+    def set_cluster_culling(self, enabled):
+        """Activa o desactiva el descarte de clusters"""
+        self.cluster_culling = bool(enabled)
+    
+    def get_visible_ranges(self, mvp_matrix, clip_planes=None):
+        """
+        Rangos de triángulos del modelo que pueden verse con la matriz mvp.
+        
+        Descarta los clusters fuera del frustum o de algún plano de corte y,
+        en superficies cerradas sin grupos ocultos ni cortes, los que están
+        completamente de espaldas a la cámara. Los clusters contiguos del
+        mismo grupo se unen en un solo rango. Sin clusters retorna los rangos
+        de get_draw_ranges().
+        """
+        if self.clusters is None or not self.cluster_culling:
+            return self.draw_ranges
+        
+        clusters = self.clusters
+        total = len(clusters['inicio'])
+        planes = planos_frustum(mvp_matrix)
+        if clip_planes is not None and len(clip_planes) > 0:
+            planes = np.vstack([planes, clip_planes])
+        
+        eye = None
+        if self.closed_surface and not self.hidden_materials and (clip_planes is None or len(clip_planes) == 0):
+            try:
+                eye = posicion_camara(mvp_matrix)
+            except np.linalg.LinAlgError:
+                # Proyección ortográfica: no hay un punto de vista finito
+                eye = None
+        
+        if self.groups is not None:
+            materials = self.groups['materials'][clusters['grupo']]
+            shown = ~np.isin(materials, list(self.hidden_materials))
+        else:
+            materials = np.zeros(total, dtype=np.int32)
+            shown = np.ones(total, dtype=bool)
+        visible = clusters_visibles(clusters, planes, eye) & shown
+        
+        indices = np.flatnonzero(visible)
+        self.cluster_stats = (len(indices), total)
+        if len(indices) == np.count_nonzero(shown):
+            # Nada que descartar: los rangos por grupo dibujan lo mismo con menos llamadas
+            return self.draw_ranges
+        
+        # Rangos: tramos de clusters consecutivos del mismo grupo
+        if len(indices) > 0:
+            breaks = np.flatnonzero((np.diff(indices) != 1) | (np.diff(clusters['grupo'][indices]) != 0)) + 1
+            firsts = indices[np.concatenate(([0], breaks))]
+            lasts = indices[np.concatenate((breaks - 1, [len(indices) - 1]))]
+        else:
+            firsts = lasts = indices
+        tri_starts = clusters['inicio'][firsts] * 3
+        tri_counts = (clusters['inicio'][lasts] + clusters['conteo'][lasts]) * 3 - tri_starts
+        ranges = self._triangle_ranges(materials[firsts], tri_starts, tri_counts, self.index_chunks)
+        # Las aristas no se agrupan en clusters: se conservan sus rangos
+        if self.draw_ranges is not None:
+            for key in ('line_firsts', 'line_counts', 'line_offsets'):
+                ranges[key] = self.draw_ranges[key]
+        return ranges
+    
+    def get_cluster_stats(self):
+        """Retorna (clusters dibujados en el último cuadro, clusters totales)"""
+        return self.cluster_stats
+    
+    def get_group_color(self, material, default):
+        """Retorna el color de un grupo si el coloreado por grupo está activo"""
+        if not self.group_colors_enabled:
+            return default
+        return self.material_colors.get(int(material), default)
+    
+    # ============ Niveles de detalle ============
+    
+    def set_lod_levels(self, levels):
+        """
+        Crea los buffers de los niveles de detalle generados por utils.lod.
+        Cada nivel tiene un VAO de triángulos (posición + valor) y otro de
+        aristas indexadas que comparte el buffer de posiciones.
+        """
+        self.clear_lod_levels()
+        
+        for level in levels:
+            coords = np.asarray(level['coords'], dtype=np.float32)
+            triangles = np.asarray(level['triangle_indices'], dtype=np.uint32)
+            lines, angles = self._sort_edges_by_angle(coords, triangles, level['line_indices'], level['grupos'])
+            values = np.zeros(len(coords), dtype=np.float32)
+            if self.gradient_values is not None:
+                values = promediar_en_nivel(level, self.gradient_values)
+            
+            buf = {
+                'vao': glGenVertexArrays(1),
+                'vbo_pos': glGenBuffers(1),
+                'vbo_val': glGenBuffers(1),
+                'ibo': glGenBuffers(1),
+                'line_vao': glGenVertexArrays(1),
+                'line_ibo': glGenBuffers(1),
+                'count': len(triangles),
+                'line_count': len(lines),
+                'bytes': coords.nbytes + values.nbytes + triangles.nbytes + lines.nbytes,
+                'level': level,
+                'groups': self._normalize_groups(level['grupos']),
+                'edge_angles': angles
+            }
+            
+            glBindVertexArray(buf['vao'])
+            glBindBuffer(GL_ARRAY_BUFFER, buf['vbo_pos'])
+            glBufferData(GL_ARRAY_BUFFER, coords.nbytes, coords, GL_DYNAMIC_DRAW)
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+            glEnableVertexAttribArray(0)
+            
+            glBindBuffer(GL_ARRAY_BUFFER, buf['vbo_val'])
+            glBufferData(GL_ARRAY_BUFFER, values.nbytes, values, GL_DYNAMIC_DRAW)
+            glVertexAttribPointer(1, 1, GL_FLOAT, GL_FALSE, 0, None)
+            glEnableVertexAttribArray(1)
+            
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, buf['ibo'])
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, triangles.nbytes, triangles, GL_STATIC_DRAW)
+            
+            glBindVertexArray(buf['line_vao'])
+            glBindBuffer(GL_ARRAY_BUFFER, buf['vbo_pos'])
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+            glEnableVertexAttribArray(0)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, buf['line_ibo'])
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, lines.nbytes, lines, GL_STATIC_DRAW)
+            
+            glBindVertexArray(0)
+            # El buffer de índices de aristas sirve también como atributo instanciado
+            self._create_edge_instancing(buf, buf['vbo_pos'], buf['line_ibo'], len(coords), len(lines) // 2)
+            self.lod_levels.append(buf)
+        
+        self._update_draw_ranges()
+    
+    def clear_lod_levels(self):
+        """Elimina los buffers de los niveles de detalle"""
+        for buf in self.lod_levels:
+            self._delete_buffer_set(buf)
+        self.lod_levels = []
+    
+    def get_lod_level(self, index):
+        """Retorna los buffers del nivel index (1 = primer nivel simplificado), o None"""
+        if 1 <= index <= len(self.lod_levels):
+            return self.lod_levels[index - 1]
+        return None
+    
+    def get_lod_triangle_counts(self):
+        """Triángulos por nivel, empezando por la malla completa"""
+        return [len(self.triangle_indices) // 3] + [buf['count'] // 3 for buf in self.lod_levels]
+    
+    def _update_lod_coords(self):
+        """Recalcula y sube las posiciones de los niveles a partir de las coordenadas actuales"""
+        for buf in self.lod_levels:
+            coords = promediar_en_nivel(buf['level'], self.coords_array)
+            self._upload_array(buf['vbo_pos'], coords)
+    
+    def _update_lod_values(self, values):
+        """Promedia y sube los valores del gradiente en cada nivel"""
+        for buf in self.lod_levels:
+            level_values = promediar_en_nivel(buf['level'], values)
+            self._upload_array(buf['vbo_val'], level_values)
+    
+    # ============ Superficies auxiliares ============
+    
+    def set_aux_surface(self, name, coords, triangle_indices, values, value_range=None, line_indices=None):
+        """
+        Crea o reemplaza una superficie auxiliar (isosuperficies, filtros) con valores propios.
+        Las coordenadas son del mundo y se suben relativas al origen del modelo.
+        Si se indican line_indices, se crea además un VAO indexado para sus aristas.
+        """
+        self.remove_aux_surface(name)
+        
+        coords_array = self.to_local(coords)
+        indices_array = np.asarray(triangle_indices, dtype=np.uint32)
+        values_array = np.asarray(values, dtype=np.float32)
+        
+        if len(indices_array) == 0:
+            return False
+        
+        if len(values_array) != len(coords_array):
+            print(f"Error: Se esperan {len(coords_array)} valores, se recibieron {len(values_array)}")
+            return False
+        
+        if value_range is None:
+            value_range = (float(values_array.min()), float(values_array.max()))
+        
+        surface = {
+            'vao': glGenVertexArrays(1),
+            'vbo_pos': glGenBuffers(1),
+            'vbo_val': glGenBuffers(1),
+            'ibo': glGenBuffers(1),
+            'count': len(indices_array),
+            'bytes': coords_array.nbytes + values_array.nbytes + indices_array.nbytes,
+            'value_range': value_range
+        }
+        
+        glBindVertexArray(surface['vao'])
+        
+        glBindBuffer(GL_ARRAY_BUFFER, surface['vbo_pos'])
+        glBufferData(GL_ARRAY_BUFFER, coords_array.nbytes, coords_array, GL_STATIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glEnableVertexAttribArray(0)
+        
+        glBindBuffer(GL_ARRAY_BUFFER, surface['vbo_val'])
+        glBufferData(GL_ARRAY_BUFFER, values_array.nbytes, values_array, GL_STATIC_DRAW)
+        glVertexAttribPointer(1, 1, GL_FLOAT, GL_FALSE, 0, None)
+        glEnableVertexAttribArray(1)
+        
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, surface['ibo'])
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices_array.nbytes, indices_array, GL_STATIC_DRAW)
+        
+        glBindVertexArray(0)
+        
+        if line_indices is not None and len(line_indices) > 0:
+            # Las aristas reutilizan el buffer de posiciones de la superficie
+            lines_array = np.asarray(line_indices, dtype=np.uint32)
+            surface['line_vao'] = glGenVertexArrays(1)
+            surface['line_ibo'] = glGenBuffers(1)
+            surface['line_count'] = len(lines_array)
+            surface['bytes'] += lines_array.nbytes
+            
+            glBindVertexArray(surface['line_vao'])
+            glBindBuffer(GL_ARRAY_BUFFER, surface['vbo_pos'])
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+            glEnableVertexAttribArray(0)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, surface['line_ibo'])
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, lines_array.nbytes, lines_array, GL_STATIC_DRAW)
+            glBindVertexArray(0)
+            self._create_edge_instancing(surface, surface['vbo_pos'], surface['line_ibo'],
+                                         len(coords_array), len(lines_array) // 2)
+        
+        self.aux_surfaces[name] = surface
+        return True
+    
+    def remove_aux_surface(self, name):
+        """Elimina una superficie auxiliar"""
+        surface = self.aux_surfaces.pop(name, None)
+        if surface:
+            self._delete_buffer_set(surface)
+    
+    def get_aux_surfaces(self):
+        """Retorna las superficies auxiliares activas"""
+        return self.aux_surfaces
+    
     def get_buffer(self, buffer_type):
         """Obtiene información de un buffer específico"""
         return self.buffers.get(buffer_type)
     
+    def get_model_memory(self):
+        """
+        Retorna (bytes del modelo en GPU, bytes que ocuparía en formato float);
+        ambos iguales si el formato compacto está desactivado
+        """
+        if self.line_vertices_buffer is None:
+            return 0, 0
+        # En formato float, sólido y gradiente tienen sus propias copias de posiciones e índices
+        float_bytes = 2 * (self.coords_array.nbytes + self.triangle_indices.nbytes)
+        float_bytes += len(self.coords_array) * np.dtype(np.float32).itemsize
+        float_bytes += len(self.line_indices) * 3 * np.dtype(np.float32).itemsize + self.line_indices.nbytes
+        return (self.compact_bytes if self.compact else float_bytes), float_bytes
+    
+    def get_memory_usage(self):
+        """Bytes subidos a la GPU en buffers de vértices e índices"""
+        total = self.get_model_memory()[0]
+        total += sum(buf['bytes'] for buf in self.lod_levels)
+        total += sum(surface['bytes'] for surface in self.aux_surfaces.values())
+        return total
+    
     def get_coords(self):
-        """Obtiene las coordenadas actuales"""
+        """Obtiene las coordenadas actuales (float32, relativas al origen del modelo)"""
         return self.coords_array
     
+    def _delete_buffer_set(self, buf_type):
+        """Elimina los objetos OpenGL de un conjunto de buffers"""
+        if buf_type.get('vao'):
+            glDeleteVertexArrays(1, [buf_type['vao']])
+        if buf_type.get('vbo'):
+            glDeleteBuffers(1, [buf_type['vbo']])
+        if buf_type.get('vbo_pos'):
+            glDeleteBuffers(1, [buf_type['vbo_pos']])
+        if buf_type.get('vbo_val'):
+            glDeleteBuffers(1, [buf_type['vbo_val']])
+        if buf_type.get('ibo'):
+            glDeleteBuffers(1, [buf_type['ibo']])
+        if buf_type.get('line_vao'):
+            glDeleteVertexArrays(1, [buf_type['line_vao']])
+        if buf_type.get('line_ibo'):
+            glDeleteBuffers(1, [buf_type['line_ibo']])
+        if buf_type.get('edge_vao'):
+            glDeleteVertexArrays(1, [buf_type['edge_vao']])
+        if buf_type.get('edge_vbo'):
+            glDeleteBuffers(1, [buf_type['edge_vbo']])
+        if buf_type.get('position_texture'):
+            glDeleteTextures(1, [buf_type['position_texture']])
+    
     def cleanup(self):
         """Limpia los recursos OpenGL"""
         try:
             for buf_type in self.buffers.values():
-                if buf_type.get('vao'):
-                    glDeleteVertexArrays(1, [buf_type['vao']])
-                if buf_type.get('vbo'):
-                    glDeleteBuffers(1, [buf_type['vbo']])
-                if buf_type.get('vbo_pos'):
-                    glDeleteBuffers(1, [buf_type['vbo_pos']])
-                if buf_type.get('vbo_val'):
-                    glDeleteBuffers(1, [buf_type['vbo_val']])
-                if buf_type.get('ibo'):
-                    glDeleteBuffers(1, [buf_type['ibo']])
+                self._delete_buffer_set(buf_type)
+            self.buffers = self._init_buffer_structure()
+            for name in list(self.aux_surfaces):
+                self.remove_aux_surface(name)
+            self.clear_lod_levels()
         except:
             pass
\ No newline at end of file
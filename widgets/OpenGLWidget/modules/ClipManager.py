@@ -0,0 +1,198 @@
+"""
+Módulo para gestión de planos de corte
+"""
+import numpy as np
+from OpenGL.GL import *
+
+class ClipManager:
+    """Gestiona los planos de corte (gl_ClipDistance) y la caja de corte"""
+    
+    MAX_PLANES = 6
+    
+    # Caras de la caja: (eje, signo). El signo indica hacia dónde apunta la normal
+    BOX_FACES = [(0, 1.0), (0, -1.0), (1, 1.0), (1, -1.0), (2, 1.0), (2, -1.0)]
+    BOX_FACE_NAMES = ["X mín", "X máx", "Y mín", "Y máx", "Z mín", "Z máx"]
+    
+    # Aristas de un cubo unitario para el gizmo
+    UNIT_CUBE_EDGES = np.array([
+        [0, 0, 0], [1, 0, 0], [1, 0, 0], [1, 1, 0], [1, 1, 0], [0, 1, 0], [0, 1, 0], [0, 0, 0],
+        [0, 0, 1], [1, 0, 1], [1, 0, 1], [1, 1, 1], [1, 1, 1], [0, 1, 1], [0, 1, 1], [0, 0, 1],
+        [0, 0, 0], [0, 0, 1], [1, 0, 0], [1, 0, 1], [1, 1, 0], [1, 1, 1], [0, 1, 0], [0, 1, 1]
+    ], dtype=np.float32)
+    
+    def __init__(self):
+        self.enabled = False
+        self.box_mode = True
+        self.show_gizmo = True
+        self.active_plane = 0
+        self.cap_color = (0.85, 0.55, 0.15, 1.0)
+        self.gizmo_color = (1.0, 1.0, 0.0, 1.0)
+        
+        self.bounds_min = np.zeros(3, dtype=np.float64)
+        self.bounds_max = np.ones(3, dtype=np.float64)
+        self.box_min = self.bounds_min.copy()
+        self.box_max = self.bounds_max.copy()
+        
+        # Planos (a, b, c, d): se conserva lo que cumple a*x + b*y + c*z + d >= 0
+        self.planes = np.zeros((self.MAX_PLANES, 4), dtype=np.float32)
+        self.planes[:, 3] = 1.0
+        self.plane_enabled = np.zeros(self.MAX_PLANES, dtype=bool)
+        
+        self.gizmo_vao = None
+        self.gizmo_vbo = None
+    
+    def create_buffers(self):
+        """Crea el buffer estático del gizmo (cubo unitario)"""
+        self.gizmo_vao = glGenVertexArrays(1)
+        self.gizmo_vbo = glGenBuffers(1)
+        
+        glBindVertexArray(self.gizmo_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.gizmo_vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.UNIT_CUBE_EDGES.nbytes, self.UNIT_CUBE_EDGES, GL_STATIC_DRAW)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+        glEnableVertexAttribArray(0)
+        glBindVertexArray(0)
+    
+    # ============ Caja de corte ============
+    
+    def set_model_bounds(self, bounds_min, bounds_max):
+        """Establece los límites del modelo y ajusta la caja a ellos"""
+        bounds_min = np.asarray(bounds_min, dtype=np.float64)
+        bounds_max = np.asarray(bounds_max, dtype=np.float64)
+        
+        # Holgura para que la caja inicial no recorte las caras del modelo
+        margin = np.maximum((bounds_max - bounds_min) * 1e-3, 1e-6)
+        self.bounds_min = bounds_min - margin
+        self.bounds_max = bounds_max + margin
+        self.set_box(self.bounds_min, self.bounds_max)
+    
+    def set_box(self, box_min, box_max):
+        """Establece la caja de corte a partir de sus esquinas"""
+        self.box_min = np.minimum(box_min, box_max).astype(np.float64)
+        self.box_max = np.maximum(box_min, box_max).astype(np.float64)
+        self.box_mode = True
+        self._update_box_planes()
+    
+    def _update_box_planes(self):
+        """Recalcula los seis planos de la caja"""
+        for i, (axis, sign) in enumerate(self.BOX_FACES):
+            normal = np.zeros(3)
+            normal[axis] = sign
+            limit = self.box_min[axis] if sign > 0 else self.box_max[axis]
+            self.planes[i, :3] = normal
+            self.planes[i, 3] = -sign * limit
+            self.plane_enabled[i] = True
+    
+    def set_box_face(self, face, fraction):
+        """Coloca una cara de la caja en una fracción [0, 1] de los límites del modelo"""
+        axis, sign = self.BOX_FACES[face]
+        value = self.bounds_min[axis] + fraction * (self.bounds_max[axis] - self.bounds_min[axis])
+        if sign > 0:
+            self.box_min[axis] = min(value, self.box_max[axis])
+        else:
+            self.box_max[axis] = max(value, self.box_min[axis])
+        self.box_mode = True
+        self._update_box_planes()
+    
+    def get_box_face_fraction(self, face):
+        """Retorna la posición de una cara como fracción de los límites del modelo"""
+        axis, sign = self.BOX_FACES[face]
+        value = self.box_min[axis] if sign > 0 else self.box_max[axis]
+        extent = max(self.bounds_max[axis] - self.bounds_min[axis], 1e-12)
+        return float((value - self.bounds_min[axis]) / extent)
+    
+    def move_plane(self, index, distance):
+        """Desplaza un plano a lo largo de su normal"""
+        if self.box_mode:
+            axis, sign = self.BOX_FACES[index]
+            if sign > 0:
+                self.box_min[axis] = np.clip(self.box_min[axis] + distance,
+                                             self.bounds_min[axis], self.box_max[axis])
+            else:
+                self.box_max[axis] = np.clip(self.box_max[axis] - distance,
+                                             self.box_min[axis], self.bounds_max[axis])
+            self._update_box_planes()
+        else:
+            self.planes[index, 3] -= distance
+    
+    def set_plane(self, index, normal, offset):
+        """Establece un plano arbitrario (normal · p + offset >= 0 se conserva)"""
+        normal = np.asarray(normal, dtype=np.float64)
+        length = np.linalg.norm(normal)
+        if length < 1e-12:
+            return False
+        self.planes[index, :3] = normal / length
+        self.planes[index, 3] = offset / length
+        self.plane_enabled[index] = True
+        self.box_mode = False
+        return True
+    
+    def disable_plane(self, index):
+        """Desactiva un plano individual"""
+        self.plane_enabled[index] = False
+    
+    def get_plane_normal(self, index):
+        """Retorna la normal de un plano"""
+        return self.planes[index, :3].astype(np.float64)
+    
+    def is_gizmo_visible(self):
+        """Retorna si se debe dibujar el gizmo de la caja"""
+        return self.enabled and self.box_mode and self.show_gizmo
+    
+    def is_active(self):
+        """Retorna si hay algún plano de corte en uso"""
+        return self.enabled and bool(self.plane_enabled.any())
+    
+    def get_active_planes(self):
+        """Retorna los planos (a, b, c, d) habilitados, vacío si el corte está inactivo"""
+        if not self.is_active():
+            return np.zeros((0, 4), dtype=np.float64)
+        return self.planes[self.plane_enabled].astype(np.float64)
+    
+    # ============ Estado OpenGL ============
+    
+    def apply(self, shader_manager, program, caps=True):
+        """Envía los planos al programa activo (solo uniforms, ningún buffer)"""
+        if self.is_active():
+            planes = self.planes.copy()
+            planes[~self.plane_enabled] = (0.0, 0.0, 0.0, 1.0)
+        else:
+            planes = np.tile(np.array([0.0, 0.0, 0.0, 1.0], dtype=np.float32), (self.MAX_PLANES, 1))
+        shader_manager.set_uniform_4fv(program, "clip_planes", planes)
+        shader_manager.set_uniform_1i(program, "clip_enabled", int(caps and self.is_active()))
+        shader_manager.set_uniform_4f(program, "clip_cap_color", self.cap_color)
+    
+    def enable_gl(self, state=None):
+        """Habilita las distancias de corte de los planos activos"""
+        active = self.is_active()
+        for i in range(self.MAX_PLANES):
+            enabled = active and self.plane_enabled[i]
+            if state is not None:
+                state.set_enabled(GL_CLIP_DISTANCE0 + i, enabled)
+            elif enabled:
+                glEnable(GL_CLIP_DISTANCE0 + i)
+            else:
+                glDisable(GL_CLIP_DISTANCE0 + i)
+    
+    def disable_gl(self, state=None):
+        """Deshabilita todas las distancias de corte"""
+        for i in range(self.MAX_PLANES):
+            if state is not None:
+                state.disable(GL_CLIP_DISTANCE0 + i)
+            else:
+                glDisable(GL_CLIP_DISTANCE0 + i)
+    
+    def get_gizmo_matrix(self, mvp_matrix):
+        """Matriz MVP que transforma el cubo unitario a la caja de corte"""
+        model = np.diag(np.append(self.box_max - self.box_min, 1.0))
+        model[3, :3] = self.box_min
+        return (model @ mvp_matrix).astype(np.float32)
+    
+    def cleanup(self):
+        """Limpia los recursos OpenGL"""
+        if self.gizmo_vao:
+            glDeleteVertexArrays(1, [self.gizmo_vao])
+            self.gizmo_vao = None
+        if self.gizmo_vbo:
+            glDeleteBuffers(1, [self.gizmo_vbo])
+            self.gizmo_vbo = None
@@ -113,9 +113,13 @@ class ColormapManager:
         """Retorna los colores de una paleta específica"""
         return self.COLOR_PALETTES.get(palette_name, None)
     
-    def bind_texture(self, texture_unit=0):
-        """Enlaza la textura a una unidad de textura"""
-        if self.texture:
+    def bind_texture(self, texture_unit=0, state=None):
+        """Enlaza la textura a una unidad de textura (a través de la caché de estado si se indica)"""
+        if not self.texture:
+            return
+        if state is not None:
+            state.bind_texture(texture_unit, GL_TEXTURE_1D, self.texture)
+        else:
             glActiveTexture(GL_TEXTURE0 + texture_unit)
             glBindTexture(GL_TEXTURE_1D, self.texture)
     
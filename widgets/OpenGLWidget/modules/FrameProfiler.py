@@ -0,0 +1,229 @@
+"""
+Módulo para medición de tiempos por pasada de renderizado
+"""
+import time
+from collections import deque
+import numpy as np
+from OpenGL.GL import *
+
+# GL_NVX_gpu_memory_info (valores en KB)
+GPU_MEMORY_INFO_TOTAL_AVAILABLE_MEMORY_NVX = 0x9048
+GPU_MEMORY_INFO_CURRENT_AVAILABLE_VIDMEM_NVX = 0x9049
+
+class FrameProfiler:
+    """
+    Mide el tiempo de GPU y de CPU de cada pasada del cuadro.
+    
+    Cada pasada se envuelve en una consulta GL_TIME_ELAPSED. Las consultas
+    forman un anillo de RING_SIZE cuadros: el resultado de un cuadro se lee
+    varios cuadros después y solo si ya está disponible, de modo que la
+    medición nunca detiene el pipeline. Los tiempos se promedian sobre una
+    ventana de WINDOW cuadros.
+    
+    Con frame_timing (aunque el perfilado esté desactivado) se mide además el
+    tiempo de GPU de cada cuadro completo, que take_frame_times() entrega
+    junto con la etiqueta de end_frame cuando llega, uno o dos cuadros tarde.
+    """
+    
+    RING_SIZE = 4
+    WINDOW = 60
+    # Consulta del cuadro completo cuando solo está activo frame_timing
+    FRAME_QUERY = "frame"
+    
+    def __init__(self):
+        self.enabled = False
+        self.frame_timing = False
+        self.supported = True
+        
+        # Anillo de cuadros: {'queries': {pasada: id}, 'order': [pasadas], 'pending': bool,
+        # 'tag': etiqueta de end_frame o None si el cuadro no se mide completo}
+        self.ring = [{'queries': {}, 'order': [], 'pending': False, 'tag': None}
+                     for _ in range(self.RING_SIZE)]
+        self.ring_index = 0
+        self.current = None
+        self.current_pass = None
+        self.pass_start = 0.0
+        
+        self.nvx_memory = None
+        self.reset()
+    
+    def reset(self):
+        """Descarta las mediciones acumuladas"""
+        self.gpu_times = {}
+        self.cpu_times = {}
+        self.frame_intervals = deque(maxlen=self.WINDOW)
+        self.frame_cpu_times = deque(maxlen=self.WINDOW)
+        self.last_frame_start = None
+        self.frame_start = 0.0
+        self.triangles = 0
+        self.lines = 0
+        self.frame_triangles = 0
+        self.frame_lines = 0
+        self.dropped_queries = 0
+        self.frame_times = []
+    
+    def create_queries(self):
+        """Detecta el soporte de consultas de tiempo y de memoria de GPU"""
+        try:
+            glGetQueryiv(GL_TIME_ELAPSED, GL_QUERY_COUNTER_BITS)
+        except Exception as e:
+            print(f"Advertencia: consultas GL_TIME_ELAPSED no disponibles ({e})")
+            self.supported = False
+        
+        extensions = [glGetStringi(GL_EXTENSIONS, i) for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))]
+        self.nvx_memory = b"GL_NVX_gpu_memory_info" in extensions
+    
+    def _query_for(self, name):
+        """Obtiene (o crea) la consulta de la pasada en el cuadro actual"""
+        queries = self.current['queries']
+        if name not in queries:
+            queries[name] = int(glGenQueries(1))
+        return queries[name]
+    
+    def _collect(self, slot):
+        """Lee los resultados de un cuadro anterior si la GPU ya los tiene; retorna False si no"""
+        available = np.zeros(1, dtype=np.int32)
+        for name in slot['order']:
+            glGetQueryObjectiv(slot['queries'][name], GL_QUERY_RESULT_AVAILABLE, available)
+            if not available[0]:
+                return False
+        
+        result = np.zeros(1, dtype=np.uint64)
+        total = 0.0
+        for name in slot['order']:
+            glGetQueryObjectui64v(slot['queries'][name], GL_QUERY_RESULT, result)
+            total += float(result[0]) / 1e6
+            if name != self.FRAME_QUERY:
+                self._push(self.gpu_times, name, float(result[0]) / 1e6)
+        if slot['tag'] is not None:
+            self.frame_times.append((total, slot['tag']))
+        slot['pending'] = False
+        return True
+    
+    def _push(self, table, name, value):
+        """Agrega una muestra a la ventana de una pasada"""
+        if name not in table:
+            table[name] = deque(maxlen=self.WINDOW)
+        table[name].append(value)
+    
+    def begin_frame(self):
+        """Inicia un cuadro: recoge los resultados ya disponibles y reserva la ranura del anillo"""
+        if not self.enabled and not self.frame_timing:
+            return
+        
+        now = time.perf_counter()
+        if self.enabled:
+            if self.last_frame_start is not None:
+                self.frame_intervals.append((now - self.last_frame_start) * 1000.0)
+            self.last_frame_start = now
+        self.frame_start = now
+        self.frame_triangles = 0
+        self.frame_lines = 0
+        
+        if self.supported:
+            # Ranuras antiguas primero, para conservar el orden de las muestras
+            for offset in range(1, self.RING_SIZE):
+                slot = self.ring[(self.ring_index + offset) % self.RING_SIZE]
+                if slot['pending']:
+                    self._collect(slot)
+            
+            self.current = self.ring[self.ring_index]
+            if self.current['pending'] and not self._collect(self.current):
+                # La GPU va más de RING_SIZE cuadros atrás: se pierde esa muestra
+                self.dropped_queries += 1
+            self.current['order'] = []
+            if not self.enabled:
+                # Sin pasadas medidas, una sola consulta cubre el cuadro
+                glBeginQuery(GL_TIME_ELAPSED, self._query_for(self.FRAME_QUERY))
+    
+    def begin_pass(self, name):
+        """Inicia la medición de una pasada (las pasadas no se anidan)"""
+        if not self.enabled:
+            return
+        
+        self.current_pass = name
+        self.pass_start = time.perf_counter()
+        if self.supported and self.current is not None:
+            glBeginQuery(GL_TIME_ELAPSED, self._query_for(name))
+    
+    def end_pass(self):
+        """Termina la medición de la pasada actual"""
+        if not self.enabled or self.current_pass is None:
+            return
+        
+        if self.supported and self.current is not None:
+            glEndQuery(GL_TIME_ELAPSED)
+            if self.current_pass not in self.current['order']:
+                self.current['order'].append(self.current_pass)
+        self._push(self.cpu_times, self.current_pass, (time.perf_counter() - self.pass_start) * 1000.0)
+        self.current_pass = None
+    
+    def add_primitives(self, triangles=0, lines=0):
+        """Cuenta las primitivas dibujadas en el cuadro"""
+        self.frame_triangles += int(triangles)
+        self.frame_lines += int(lines)
+    
+    def end_frame(self, tag=None):
+        """
+        Cierra el cuadro y avanza el anillo. Con tag (y frame_timing), el
+        tiempo de GPU del cuadro se entrega con esa etiqueta en take_frame_times()
+        """
+        if not self.enabled and not self.frame_timing:
+            return
+        
+        cpu_ms = (time.perf_counter() - self.frame_start) * 1000.0
+        if self.enabled:
+            self.frame_cpu_times.append(cpu_ms)
+            self.triangles = self.frame_triangles
+            self.lines = self.frame_lines
+        
+        tag = tag if self.frame_timing else None
+        if not self.supported:
+            # Sin consultas de tiempo, el cuadro se estima con su tiempo de CPU
+            if tag is not None:
+                self.frame_times.append((cpu_ms, tag))
+        elif self.current is not None:
+            if not self.enabled:
+                glEndQuery(GL_TIME_ELAPSED)
+                self.current['order'].append(self.FRAME_QUERY)
+            self.current['tag'] = tag
+            self.current['pending'] = bool(self.current['order'])
+            self.ring_index = (self.ring_index + 1) % self.RING_SIZE
+            self.current = None
+    
+    def take_frame_times(self):
+        """Retorna y descarta los tiempos de cuadro ya recogidos: [(ms de GPU, etiqueta)]"""
+        frame_times, self.frame_times = self.frame_times, []
+        return frame_times
+    
+    def get_gpu_memory(self):
+        """Retorna (en uso, total) en bytes según GL_NVX_gpu_memory_info, o None"""
+        if not self.nvx_memory:
+            return None
+        total = int(glGetIntegerv(GPU_MEMORY_INFO_TOTAL_AVAILABLE_MEMORY_NVX))
+        available = int(glGetIntegerv(GPU_MEMORY_INFO_CURRENT_AVAILABLE_VIDMEM_NVX))
+        return (total - available) * 1024, total * 1024
+    
+    def get_stats(self):
+        """Retorna las medias de la ventana: ms por pasada (GPU y CPU), fps y primitivas"""
+        interval = float(np.mean(self.frame_intervals)) if self.frame_intervals else 0.0
+        return {
+            'fps': 1000.0 / interval if interval > 0.0 else 0.0,
+            'frame_ms': interval,
+            'cpu_frame_ms': float(np.mean(self.frame_cpu_times)) if self.frame_cpu_times else 0.0,
+            'gpu_ms': {name: float(np.mean(v)) for name, v in self.gpu_times.items()},
+            'cpu_ms': {name: float(np.mean(v)) for name, v in self.cpu_times.items()},
+            'triangles': self.triangles,
+            'lines': self.lines,
+            'dropped_queries': self.dropped_queries
+        }
+    
+    def cleanup(self):
+        """Elimina las consultas OpenGL"""
+        for slot in self.ring:
+            if slot['queries']:
+                glDeleteQueries(len(slot['queries']), list(slot['queries'].values()))
+            slot['queries'] = {}
+            slot['order'] = []
+            slot['pending'] = False
+            slot['tag'] = None
@@ -0,0 +1,140 @@
+"""
+Módulo para filtrar cambios de estado OpenGL redundantes
+"""
+from OpenGL.GL import *
+
+class GLStateCache:
+    """
+    Recuerda el estado OpenGL enlazado y omite las llamadas que no lo cambian.
+    
+    Cubre programa, VAO, texturas por unidad, capacidades (glEnable/glDisable),
+    glPolygonOffset, glDepthMask y glColorMask. Como Qt y el código fuera del cuadro pueden
+    tocar el estado directamente, la caché solo se da por buena entre
+    begin_frame() y end_frame(): fuera de ese intervalo todo estado se
+    considera desconocido y la primera llamada siempre se emite.
+    
+    Cuenta por cuadro las llamadas emitidas y las omitidas.
+    """
+    
+    def __init__(self):
+        self.invalidate()
+        self.calls = 0
+        self.skipped = 0
+        self.last_frame_calls = 0
+        self.last_frame_skipped = 0
+    
+    def invalidate(self):
+        """Olvida todo el estado conocido"""
+        self.program = None
+        self.vao = None
+        self.active_unit = None
+        self.textures = {}
+        self.capabilities = {}
+        self.polygon_offset_value = None
+        self.depth_mask_value = None
+        self.color_mask_value = None
+    
+    def begin_frame(self):
+        """Inicia el conteo de un cuadro con el estado desconocido"""
+        self.invalidate()
+        self.calls = 0
+        self.skipped = 0
+    
+    def end_frame(self):
+        """Cierra el cuadro, guarda sus conteos y devuelve el VAO 0 a Qt"""
+        self.bind_vertex_array(0)
+        self.last_frame_calls = self.calls
+        self.last_frame_skipped = self.skipped
+        self.invalidate()
+    
+    def count(self, issued=1, skipped=0):
+        """Registra llamadas emitidas u omitidas fuera de la caché (dibujo, uniforms)"""
+        self.calls += issued
+        self.skipped += skipped
+    
+    def use_program(self, program_id):
+        """glUseProgram si el programa no está ya activo"""
+        if self.program == program_id:
+            self.skipped += 1
+            return
+        glUseProgram(program_id)
+        self.program = program_id
+        self.calls += 1
+    
+    def bind_vertex_array(self, vao):
+        """glBindVertexArray si el VAO no está ya enlazado"""
+        if self.vao == vao:
+            self.skipped += 1
+            return
+        glBindVertexArray(vao)
+        self.vao = vao
+        self.calls += 1
+    
+    def bind_texture(self, unit, target, texture):
+        """Enlaza una textura a una unidad, activando la unidad solo si cambia"""
+        if self.textures.get((unit, target)) == texture:
+            self.skipped += 1
+            return
+        if self.active_unit != unit:
+            glActiveTexture(GL_TEXTURE0 + unit)
+            self.active_unit = unit
+            self.calls += 1
+        glBindTexture(target, texture)
+        self.textures[(unit, target)] = texture
+        self.calls += 1
+    
+    def set_enabled(self, capability, enabled):
+        """glEnable/glDisable si la capacidad no está ya en ese estado"""
+        enabled = bool(enabled)
+        if self.capabilities.get(capability) == enabled:
+            self.skipped += 1
+            return
+        if enabled:
+            glEnable(capability)
+        else:
+            glDisable(capability)
+        self.capabilities[capability] = enabled
+        self.calls += 1
+    
+    def enable(self, capability):
+        """glEnable filtrado"""
+        self.set_enabled(capability, True)
+    
+    def disable(self, capability):
+        """glDisable filtrado"""
+        self.set_enabled(capability, False)
+    
+    def polygon_offset(self, factor, units):
+        """glPolygonOffset si los valores cambian"""
+        value = (float(factor), float(units))
+        if self.polygon_offset_value == value:
+            self.skipped += 1
+            return
+        glPolygonOffset(*value)
+        self.polygon_offset_value = value
+        self.calls += 1
+    
+    def depth_mask(self, flag):
+        """glDepthMask si la máscara cambia"""
+        flag = bool(flag)
+        if self.depth_mask_value == flag:
+            self.skipped += 1
+            return
+        glDepthMask(GL_TRUE if flag else GL_FALSE)
+        self.depth_mask_value = flag
+        self.calls += 1
+    
+    def color_mask(self, flag):
+        """glColorMask (los cuatro canales a la vez) si la máscara cambia"""
+        flag = bool(flag)
+        if self.color_mask_value == flag:
+            self.skipped += 1
+            return
+        value = GL_TRUE if flag else GL_FALSE
+        glColorMask(value, value, value, value)
+        self.color_mask_value = flag
+        self.calls += 1
+    
+    def get_stats(self):
+        """Retorna (llamadas emitidas, llamadas omitidas) del último cuadro"""
+        return self.last_frame_calls, self.last_frame_skipped
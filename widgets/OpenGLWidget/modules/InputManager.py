@@ -0,0 +1,100 @@
+"""
+Módulo para acumulación de entrada de cámara entre cuadros
+"""
+import time
+
+class InputManager:
+    """
+    Acumula los movimientos del mouse y la rueda entre cuadros.
+    
+    Los eventos solo suman desplazamientos; la cámara se actualiza una vez
+    por cuadro con el total acumulado. Lleva estadísticas de eventos por
+    cuadro, eventos fusionados y latencia desde el primer evento pendiente.
+    """
+    
+    def __init__(self):
+        self.reset_pending()
+        self.reset_stats()
+    
+    def reset_pending(self):
+        """Descarta la entrada pendiente"""
+        self.rotate = [0.0, 0.0]
+        self.pan = [0.0, 0.0]
+        self.clip = [0.0, 0.0]
+        self.zoom = 0.0
+        self.pending_events = 0
+        self.first_event_time = None
+    
+    def reset_stats(self):
+        """Reinicia las estadísticas"""
+        self.total_events = 0
+        self.merged_events = 0
+        self.frames_with_input = 0
+        self.last_events_per_frame = 0
+        self.max_events_per_frame = 0
+        self.latency_ms = 0.0
+    
+    def _register_event(self):
+        """Cuenta un evento y marca el inicio de la espera si es el primero"""
+        if self.first_event_time is None:
+            self.first_event_time = time.perf_counter()
+        self.pending_events += 1
+        self.total_events += 1
+    
+    def add_rotate(self, dx, dy):
+        """Acumula una rotación en píxeles"""
+        self.rotate[0] += dx
+        self.rotate[1] += dy
+        self._register_event()
+    
+    def add_pan(self, dx, dy):
+        """Acumula un desplazamiento en píxeles"""
+        self.pan[0] += dx
+        self.pan[1] += dy
+        self._register_event()
+    
+    def add_clip_drag(self, dx, dy):
+        """Acumula un arrastre del plano de corte en píxeles"""
+        self.clip[0] += dx
+        self.clip[1] += dy
+        self._register_event()
+    
+    def add_zoom(self, delta):
+        """Acumula pasos de la rueda"""
+        self.zoom += delta
+        self._register_event()
+    
+    def has_pending(self):
+        """Retorna si hay entrada sin aplicar"""
+        return self.pending_events > 0
+    
+    def take(self):
+        """
+        Retorna la entrada acumulada (rotate, pan, clip, zoom), la descarta
+        y actualiza las estadísticas del cuadro.
+        """
+        pending = (tuple(self.rotate), tuple(self.pan), tuple(self.clip), self.zoom)
+        
+        if self.pending_events > 0:
+            self.frames_with_input += 1
+            self.merged_events += self.pending_events - 1
+            self.last_events_per_frame = self.pending_events
+            self.max_events_per_frame = max(self.max_events_per_frame, self.pending_events)
+            latency = (time.perf_counter() - self.first_event_time) * 1000.0
+            self.latency_ms = latency if self.frames_with_input == 1 else 0.8 * self.latency_ms + 0.2 * latency
+        
+        self.reset_pending()
+        return pending
+    
+    def get_stats(self):
+        """Retorna las estadísticas de entrada"""
+        frames = max(self.frames_with_input, 1)
+        return {
+            'events': self.total_events,
+            'frames': self.frames_with_input,
+            'events_per_frame': self.total_events / frames,
+            'last_events_per_frame': self.last_events_per_frame,
+            'max_events_per_frame': self.max_events_per_frame,
+            'merged_events': self.merged_events,
+            'input_latency_ms': self.latency_ms
+        }
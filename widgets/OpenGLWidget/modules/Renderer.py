@@ -1,18 +1,37 @@
 """
 Módulo para renderizado OpenGL
 """
+import ctypes
 from OpenGL.GL import *
 
 class Renderer:
     """Gestiona el renderizado de la escena"""
     
-    def __init__(self, shader_manager, buffer_manager, colormap_manager):
+    def __init__(self, shader_manager, buffer_manager, colormap_manager, clip_manager):
         self.shader_manager = shader_manager
         self.buffer_manager = buffer_manager
         self.colormap_manager = colormap_manager
+        self.clip_manager = clip_manager
+        # Caché de estado compartida: omite glUseProgram/glBind*/glEnable redundantes
+        self.state = shader_manager.state
         
         self.line_width = 1.0
+        self.line_color = (1.0, 0.0, 0.0, 1.0)
+        self.solid_color = (0.196, 0.196, 0.196, 1.0)
         self.bg_color = (0.1, 0.1, 0.1)
+        self.model_visible = True
+        
+        # Nivel de detalle dibujado: 0 = malla completa
+        self.lod_level = 0
+        
+        # Ruta de las aristas: "instanced" (quads instanciados) o "geometry" (geometry shader)
+        self.line_method = "instanced"
+        
+        # Rangos de triángulos del modelo tras descartar clusters (por cuadro)
+        self.visible_ranges = None
+        
+        # Medición de tiempos por pasada (FrameProfiler, opcional)
+        self.profiler = None
         
         # Estado de gradientes
         self.gradient_enabled = False
@@ -29,22 +48,58 @@ class Renderer:
         """Limpia los buffers de color y profundidad"""
         glClearColor(*self.bg_color, 1.0)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        self.state.count(2)
     
     def render_solid(self, mvp_matrix):
         """Renderiza el modelo sólido"""
-        glPolygonOffset(1.0, 1.0)
-        glEnable(GL_POLYGON_OFFSET_FILL)
+        self.state.polygon_offset(1.0, 1.0)
+        self.state.enable(GL_POLYGON_OFFSET_FILL)
+        
+        program = self.shader_manager.use_program("solid")
+        if not program:
+            return
+        
+        self.shader_manager.set_uniform_matrix4fv(program, "mvp", mvp_matrix)
+        self.shader_manager.set_uniform_4f(program, "solid_color", self.solid_color)
+        self.clip_manager.apply(self.shader_manager, program)
         
+        self._set_decode(program, self._model_buffer('solid'))
+        vao, count, ranges = self._model_triangles('solid')
+        self.state.bind_vertex_array(vao)
+        if ranges is not None and self.buffer_manager.group_colors_enabled:
+            self._draw_colored_groups(program, ranges)
+        else:
+            self._draw_triangles(count, ranges)
+    
+    def render_depth(self, mvp_matrix):
+        """
+        Pre-pasada de profundidad: escribe solo la profundidad del modelo y de las
+        superficies auxiliares, con el mismo desplazamiento de polígonos que las
+        pasadas de relleno, para que luego solo pasen la prueba las aristas visibles.
+        """
         program = self.shader_manager.use_program("solid")
         if not program:
             return
         
+        self.state.color_mask(False)
+        self.state.polygon_offset(1.0, 1.0)
+        self.state.enable(GL_POLYGON_OFFSET_FILL)
         self.shader_manager.set_uniform_matrix4fv(program, "mvp", mvp_matrix)
+        self.clip_manager.apply(self.shader_manager, program)
+        
+        if self.model_visible:
+            self._set_decode(program, self._model_buffer('solid'))
+            vao, count, ranges = self._model_triangles('solid')
+            self.state.bind_vertex_array(vao)
+            self._draw_triangles(count, ranges)
+        self._set_decode(program, None)
+        for surface in self.buffer_manager.get_aux_surfaces().values():
+            self._count_primitives(triangles=surface['count'] // 3)
+            self.state.bind_vertex_array(surface['vao'])
+            self.state.count()
+            glDrawElements(GL_TRIANGLES, surface['count'], GL_UNSIGNED_INT, None)
         
-        buf = self.buffer_manager.get_buffer('solid')
-        glBindVertexArray(buf['vao'])
-        glDrawElements(GL_TRIANGLES, buf['count'], GL_UNSIGNED_INT, None)
-        glBindVertexArray(0)
+        self.state.color_mask(True)
     
     def render_gradient(self, mvp_matrix):
         """Renderiza el modelo con gradientes"""
@@ -52,8 +107,8 @@ class Renderer:
             self.render_solid(mvp_matrix)
             return
         
-        glPolygonOffset(1.0, 1.0)
-        glEnable(GL_POLYGON_OFFSET_FILL)
+        self.state.polygon_offset(1.0, 1.0)
+        self.state.enable(GL_POLYGON_OFFSET_FILL)
         
         program = self.shader_manager.use_program("gradient")
         if not program:
@@ -61,81 +116,357 @@ class Renderer:
         
         # Configurar uniformes
         self.shader_manager.set_uniform_matrix4fv(program, "mvp", mvp_matrix)
+        self.clip_manager.apply(self.shader_manager, program)
         
         # Configurar textura de colormap
-        self.colormap_manager.bind_texture(0)
+        self.colormap_manager.bind_texture(0, self.state)
         self.shader_manager.set_uniform_1i(program, "colormap", 0)
         
         # Configurar rango de valores
         self.shader_manager.set_uniform_1f(program, "value_min", self.value_min)
         self.shader_manager.set_uniform_1f(program, "value_max", self.value_max)
         
-        buf = self.buffer_manager.get_buffer('gradient')
-        glBindVertexArray(buf['vao'])
-        glDrawElements(GL_TRIANGLES, buf['count'], GL_UNSIGNED_INT, None)
-        glBindVertexArray(0)
+        self._set_decode(program, self._model_buffer('gradient'))
+        vao, count, ranges = self._model_triangles('gradient')
+        self.state.bind_vertex_array(vao)
+        self._draw_triangles(count, ranges)
+    
+    def _model_buffer(self, buffer_type):
+        """Conjunto de buffers del nivel de detalle activo, o el del modelo completo"""
+        level = self.buffer_manager.get_lod_level(self.lod_level)
+        if level is not None:
+            return level
+        return self.buffer_manager.get_buffer(buffer_type)
+    
+    def _model_triangles(self, buffer_type):
+        """Retorna (vao, count, ranges) de la malla completa o del nivel de detalle activo"""
+        level = self.buffer_manager.get_lod_level(self.lod_level)
+        if level is not None:
+            return level['vao'], level['count'], level['ranges']
+        buf = self.buffer_manager.get_buffer(buffer_type)
+        return buf['vao'], buf['count'], self.visible_ranges
+    
+    def _set_decode(self, program, buf):
+        """
+        Fija la decodificación de posiciones (y valores) cuantizados del conjunto
+        de buffers; identidad si son float o si buf es None
+        """
+        scale, offset = (buf or {}).get('position_decode', ((1.0, 1.0, 1.0), (0.0, 0.0, 0.0)))
+        self.shader_manager.set_uniform_3f(program, "position_scale", scale)
+        self.shader_manager.set_uniform_3f(program, "position_offset", offset)
+        value_scale, value_offset = (buf or {}).get('value_decode', (1.0, 0.0))
+        self.shader_manager.set_uniform_1f(program, "value_scale", value_scale)
+        self.shader_manager.set_uniform_1f(program, "value_offset", value_offset)
+    
+    def _count_primitives(self, triangles=0, lines=0):
+        """Suma primitivas dibujadas al contador del cuadro si hay medición activa"""
+        if self.profiler is not None and self.profiler.enabled:
+            self.profiler.add_primitives(triangles, lines)
+    
+    def _timed(self, name, render, *args):
+        """Ejecuta una pasada envuelta en la medición de tiempos"""
+        if self.profiler is None or not self.profiler.enabled:
+            render(*args)
+            return
+        self.profiler.begin_pass(name)
+        render(*args)
+        self.profiler.end_pass()
+    
+    def _draw_triangles(self, count, ranges):
+        """Dibuja el modelo completo o solo los rangos de los grupos visibles"""
+        if ranges is None:
+            self._count_primitives(triangles=count // 3)
+            self.state.count()
+            glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_INT, None)
+        elif len(ranges['tri_counts']) > 0:
+            self._count_primitives(triangles=ranges['tri_counts'].sum() // 3)
+            self.state.count()
+            if 'tri_basevertex' in ranges:
+                # Índices uint16 por trozos, cada pieza con su vértice base
+                glMultiDrawElementsBaseVertex(GL_TRIANGLES, ranges['tri_counts'], GL_UNSIGNED_SHORT,
+                                              ranges['tri_offsets'], len(ranges['tri_counts']),
+                                              ranges['tri_basevertex'])
+            else:
+                glMultiDrawElements(GL_TRIANGLES, ranges['tri_counts'], GL_UNSIGNED_INT,
+                                    ranges['tri_offsets'], len(ranges['tri_counts']))
+    
+    def _draw_colored_groups(self, program, ranges):
+        """Dibuja cada grupo visible con su propio color sólido"""
+        self._count_primitives(triangles=ranges['tri_counts'].sum() // 3)
+        bases = ranges.get('tri_basevertex')
+        for i, (material, count) in enumerate(zip(ranges['materials'], ranges['tri_counts'])):
+            color = self.buffer_manager.get_group_color(material, self.solid_color)
+            self.shader_manager.set_uniform_4f(program, "solid_color", color)
+            self.state.count()
+            offset = ctypes.c_void_p(ranges['tri_offsets'][i])
+            if bases is not None:
+                glDrawElementsBaseVertex(GL_TRIANGLES, int(count), GL_UNSIGNED_SHORT, offset, int(bases[i]))
+            else:
+                glDrawElements(GL_TRIANGLES, int(count), GL_UNSIGNED_INT, offset)
+        self.shader_manager.set_uniform_4f(program, "solid_color", self.solid_color)
+    
+    def render_aux_surfaces(self, mvp_matrix):
+        """Renderiza las superficies auxiliares (isosuperficies, filtros) con el programa de gradientes"""
+        surfaces = self.buffer_manager.get_aux_surfaces()
+        if not surfaces:
+            return
+        
+        program = self.shader_manager.use_program("gradient")
+        if not program:
+            return
+        
+        self.state.polygon_offset(1.0, 1.0)
+        self.state.enable(GL_POLYGON_OFFSET_FILL)
+        
+        self.shader_manager.set_uniform_matrix4fv(program, "mvp", mvp_matrix)
+        # Las superficies auxiliares son abiertas: ambas caras se colorean por valor
+        self.clip_manager.apply(self.shader_manager, program, caps=False)
+        self.colormap_manager.bind_texture(0, self.state)
+        self.shader_manager.set_uniform_1i(program, "colormap", 0)
+        self._set_decode(program, None)
+        
+        for surface in surfaces.values():
+            value_min, value_max = surface['value_range']
+            if abs(value_max - value_min) < 1e-10:
+                value_max = value_min + 1.0
+            self.shader_manager.set_uniform_1f(program, "value_min", value_min)
+            self.shader_manager.set_uniform_1f(program, "value_max", value_max)
+            
+            self._count_primitives(triangles=surface['count'] // 3)
+            self.state.bind_vertex_array(surface['vao'])
+            self.state.count()
+            glDrawElements(GL_TRIANGLES, surface['count'], GL_UNSIGNED_INT, None)
+    
+    def _use_line_program(self, instanced, mvp_matrix, viewport_width, viewport_height, buf=None):
+        """
+        Activa el programa de líneas (geometry shader o instanciado) con sus
+        uniforms; buf indica la decodificación de posiciones (None = float)
+        """
+        self.state.disable(GL_POLYGON_OFFSET_FILL)
+        
+        program = self.shader_manager.use_program("line_instanced" if instanced else "line")
+        if not program:
+            return None
+        
+        self.shader_manager.set_uniform_matrix4fv(program, "mvp", mvp_matrix)
+        self.shader_manager.set_uniform_1f(program, "line_width", self.line_width)
+        self.shader_manager.set_uniform_1f(program, "aspect_ratio", viewport_width / max(viewport_height, 1))
+        self.clip_manager.apply(self.shader_manager, program)
+        self._set_decode(program, buf)
+        self.shader_manager.set_uniform_4f(program, "line_color", self.line_color)
+        if instanced:
+            self.shader_manager.set_uniform_1i(program, "positions", 1)
+        return program
+    
+    def _instanced_lines(self, buf):
+        """Retorna si un conjunto de aristas se dibuja con quads instanciados"""
+        return (self.line_method == "instanced" and buf.get('edge_vao') is not None
+                and self.shader_manager.get_program("line_instanced") is not None)
+    
+    def _draw_edges_instanced(self, program, buf, ranges):
+        """Dibuja un quad instanciado por arista, completo o por rangos de grupos"""
+        self.shader_manager.set_uniform_1i(program, "packed_positions", int(buf.get('packed_positions', False)))
+        self.state.bind_texture(1, GL_TEXTURE_BUFFER, buf['position_texture'])
+        self.state.bind_vertex_array(buf['edge_vao'])
+        if ranges is None:
+            self._count_primitives(lines=buf['edge_count'])
+            self.state.count()
+            glDrawArraysInstanced(GL_TRIANGLE_STRIP, 0, 4, buf['edge_count'])
+            return
+        
+        # Sin base instance en GL 3.3: cada rango desplaza el atributo de aristas
+        glBindBuffer(GL_ARRAY_BUFFER, buf['edge_buffer'])
+        for first, count in zip(ranges['line_firsts'] // 2, ranges['line_counts'] // 2):
+            self._count_primitives(lines=count)
+            self.state.count(2)
+            glVertexAttribIPointer(0, 2, GL_UNSIGNED_INT, 0, ctypes.c_void_p(int(first) * 8))
+            glDrawArraysInstanced(GL_TRIANGLE_STRIP, 0, 4, int(count))
+        glVertexAttribIPointer(0, 2, GL_UNSIGNED_INT, 0, None)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.state.count(3)
     
     def render_wireframe(self, mvp_matrix, viewport_width, viewport_height):
         """Renderiza el modelo en alambre"""
-        glDisable(GL_POLYGON_OFFSET_FILL)
+        level = self.buffer_manager.get_lod_level(self.lod_level)
+        if level is not None:
+            buf, ranges = level, level['ranges']
+        else:
+            buf, ranges = self.buffer_manager.get_buffer('line'), self.buffer_manager.get_draw_ranges()
+        
+        instanced = self._instanced_lines(buf)
+        program = self._use_line_program(instanced, mvp_matrix, viewport_width, viewport_height, buf)
+        if not program:
+            return
+        
+        if instanced:
+            self._draw_edges_instanced(program, buf, ranges)
+            return
+        
+        if level is not None:
+            # Los niveles de detalle dibujan sus aristas indexadas
+            self.state.bind_vertex_array(level['line_vao'])
+            if ranges is None:
+                self._count_primitives(lines=level['line_count'] // 2)
+                self.state.count()
+                glDrawElements(GL_LINES, level['line_count'], GL_UNSIGNED_INT, None)
+            elif len(ranges['line_counts']) > 0:
+                self._count_primitives(lines=ranges['line_counts'].sum() // 2)
+                self.state.count()
+                glMultiDrawElements(GL_LINES, ranges['line_counts'], GL_UNSIGNED_INT,
+                                    ranges['line_offsets'], len(ranges['line_counts']))
+            return
+        
+        self.state.bind_vertex_array(buf['vao'])
+        if ranges is None:
+            self._count_primitives(lines=buf['count'] // 2)
+            self.state.count()
+            glDrawArrays(GL_LINES, 0, buf['count'])
+        elif len(ranges['line_counts']) > 0:
+            self._count_primitives(lines=ranges['line_counts'].sum() // 2)
+            self.state.count()
+            glMultiDrawArrays(GL_LINES, ranges['line_firsts'], ranges['line_counts'],
+                              len(ranges['line_counts']))
+    
+    def render_aux_wireframe(self, mvp_matrix, viewport_width, viewport_height):
+        """Renderiza las aristas de las superficies auxiliares que las tengan"""
+        surfaces = [s for s in self.buffer_manager.get_aux_surfaces().values() if s.get('line_vao')]
+        for instanced in (False, True):
+            group = [s for s in surfaces if self._instanced_lines(s) == instanced]
+            if not group:
+                continue
+            program = self._use_line_program(instanced, mvp_matrix, viewport_width, viewport_height)
+            if not program:
+                continue
+            for surface in group:
+                if instanced:
+                    self._draw_edges_instanced(program, surface, None)
+                    continue
+                self._count_primitives(lines=surface['line_count'] // 2)
+                self.state.bind_vertex_array(surface['line_vao'])
+                self.state.count()
+                glDrawElements(GL_LINES, surface['line_count'], GL_UNSIGNED_INT, None)
+    
+    def render_line_set(self, buf, method, mvp_matrix, viewport_width, viewport_height):
+        """Dibuja un conjunto de create_line_set() con el método indicado (para comparativas)"""
+        instanced = method == "instanced"
+        if instanced and buf.get('edge_vao') is None:
+            return False
+        program = self._use_line_program(instanced, mvp_matrix, viewport_width, viewport_height)
+        if not program:
+            return False
+        if instanced:
+            self._draw_edges_instanced(program, buf, None)
+        else:
+            self.state.bind_vertex_array(buf['vao'])
+            self.state.count()
+            glDrawArrays(GL_LINES, 0, buf['count'])
+        return True
+    
+    def render_clip_gizmo(self, mvp_matrix, viewport_width, viewport_height):
+        """Renderiza la caja de corte con el programa de líneas"""
+        if not self.clip_manager.is_gizmo_visible() or not self.clip_manager.gizmo_vao:
+            return
         
         program = self.shader_manager.use_program("line")
         if not program:
             return
         
-        self.shader_manager.set_uniform_matrix4fv(program, "mvp", mvp_matrix)
-        self.shader_manager.set_uniform_1f(program, "line_width", self.line_width)
+        # El gizmo no se recorta: se dibuja con los planos deshabilitados
+        self.clip_manager.disable_gl(self.state)
         
-        aspect = viewport_width / max(viewport_height, 1)
-        self.shader_manager.set_uniform_1f(program, "aspect_ratio", aspect)
+        gizmo_mvp = self.clip_manager.get_gizmo_matrix(mvp_matrix)
+        self.shader_manager.set_uniform_matrix4fv(program, "mvp", gizmo_mvp)
+        self.shader_manager.set_uniform_1f(program, "line_width", max(self.line_width, 1.5))
+        self.shader_manager.set_uniform_1f(program, "aspect_ratio", viewport_width / max(viewport_height, 1))
+        self.shader_manager.set_uniform_4f(program, "line_color", self.clip_manager.gizmo_color)
+        self._set_decode(program, None)
         
-        buf = self.buffer_manager.get_buffer('line')
-        glBindVertexArray(buf['vao'])
-        glDrawArrays(GL_LINES, 0, buf['count'])
-        glBindVertexArray(0)
+        self.state.disable(GL_POLYGON_OFFSET_FILL)
+        self.state.bind_vertex_array(self.clip_manager.gizmo_vao)
+        self.state.count()
+        glDrawArrays(GL_LINES, 0, len(self.clip_manager.UNIT_CUBE_EDGES))
+        
+        self.shader_manager.set_uniform_4f(program, "line_color", self.line_color)
     
     def render_scene(self, mode, mvp_matrix, viewport_width, viewport_height):
         """Renderiza la escena completa según el modo especificado"""
-        self.clear_screen()
+        self._timed("clear", self.clear_screen)
+        self.clip_manager.enable_gl(self.state)
+        self.visible_ranges = self.buffer_manager.get_visible_ranges(
+            mvp_matrix, self.clip_manager.get_active_planes())
+        
+        # Nombre de la pasada del modelo según el programa que realmente se usa
+        surface_pass = "gradient" if self.gradient_enabled else "solid"
+        viewport = (viewport_width, viewport_height)
         
         if mode == "solid":
-            if self.gradient_enabled:
-                self.render_gradient(mvp_matrix)
-            else:
-                self.render_solid(mvp_matrix)
+            if self.model_visible:
+                self._timed(surface_pass, self.render_gradient, mvp_matrix)
+            self._timed("aux", self.render_aux_surfaces, mvp_matrix)
         
         elif mode == "wireframe":
-            self.render_wireframe(mvp_matrix, viewport_width, viewport_height)
+            self._timed("aux", self.render_aux_surfaces, mvp_matrix)
+            if self.model_visible:
+                self._timed("wireframe", self.render_wireframe, mvp_matrix, *viewport)
+            self._timed("aux_wireframe", self.render_aux_wireframe, mvp_matrix, *viewport)
+        
+        elif mode == "hidden_line":
+            # Solo las aristas que quedan delante de la superficie
+            self._timed("depth", self.render_depth, mvp_matrix)
+            self.state.depth_mask(False)
+            if self.model_visible:
+                self._timed("wireframe", self.render_wireframe, mvp_matrix, *viewport)
+            self._timed("aux_wireframe", self.render_aux_wireframe, mvp_matrix, *viewport)
+            self.state.depth_mask(True)
         
         elif mode == "combined":
-            if self.gradient_enabled:
-                self.render_gradient(mvp_matrix)
-            else:
-                self.render_solid(mvp_matrix)
+            if self.model_visible:
+                self._timed(surface_pass, self.render_gradient, mvp_matrix)
+            self._timed("aux", self.render_aux_surfaces, mvp_matrix)
             
-            glDepthMask(GL_FALSE)
-            self.render_wireframe(mvp_matrix, viewport_width, viewport_height)
-            glDepthMask(GL_TRUE)
+            self.state.depth_mask(False)
+            if self.model_visible:
+                self._timed("wireframe", self.render_wireframe, mvp_matrix, *viewport)
+            self._timed("aux_wireframe", self.render_aux_wireframe, mvp_matrix, *viewport)
+            self.state.depth_mask(True)
+        
+        self._timed("gizmo", self.render_clip_gizmo, mvp_matrix, *viewport)
+        self.clip_manager.disable_gl(self.state)
     
     # Setters
     def set_line_width(self, width):
         """Establece el grosor de línea"""
         self.line_width = max(0.1, width)
-        
+    
     def set_line_color(self,color):
-        """Establece el color de línea"""
-        program = self.shader_manager.use_program("line")
-        self.shader_manager.set_uniform_4f(program,"line_color",color)
-        
+        """Establece el color de línea (se envía al dibujar, sin necesitar el contexto)"""
+        self.line_color = tuple(color)
+    
     def set_solid_color(self,color):
-        """Establece el color de solido"""
-        program = self.shader_manager.use_program("solid")
-        self.shader_manager.set_uniform_4f(program,"solid_color",color)
+        """Establece el color de solido (se envía al dibujar, sin necesitar el contexto)"""
+        self.solid_color = tuple(color)
     
     def set_bg_color(self, color):
         """Establece el color de fondo (tuple RGB)"""
         self.bg_color = color
     
+    def set_profiler(self, profiler):
+        """Asigna el medidor de tiempos por pasada (None para desactivarlo)"""
+        self.profiler = profiler
+    
+    def set_line_method(self, method):
+        """Selecciona la ruta de dibujo de aristas ("instanced" o "geometry")"""
+        if method in ("instanced", "geometry"):
+            self.line_method = method
+    
+    def set_lod_level(self, level):
+        """Selecciona el nivel de detalle a dibujar (0 = malla completa)"""
+        self.lod_level = max(0, int(level))
+    
+    def set_model_visible(self, visible):
+        """Muestra u oculta el modelo principal (las superficies auxiliares se siguen dibujando)"""
+        self.model_visible = visible
+    
     def set_gradient_enabled(self, enabled):
         """Habilita o deshabilita el renderizado con gradientes"""
         self.gradient_enabled = enabled
@@ -0,0 +1,168 @@
+"""
+Módulo para renderizado a resolución dinámica
+"""
+import numpy as np
+from OpenGL.GL import *
+
+class ResolutionManager:
+    """
+    Renderiza a un framebuffer reducido durante la interacción y lo escala al widget.
+    
+    La escena se dibuja en un FBO multimuestreo de tamaño escala * pantalla,
+    se resuelve a una textura del mismo tamaño (glBlitFramebuffer no puede
+    escalar hacia el framebuffer multimuestreo del widget) y la textura se
+    dibuja a pantalla completa con filtrado lineal.
+    """
+    
+    MIN_SCALE = 0.35
+    MAX_SCALE = 1.0
+    
+    def __init__(self, samples=4):
+        self.enabled = True
+        self.scale = self.MAX_SCALE
+        self.requested_samples = samples
+        self.samples = samples
+        
+        self.size = (0, 0)
+        self.msaa_fbo = None
+        self.color_rbo = None
+        self.depth_rbo = None
+        self.resolve_fbo = None
+        self.resolve_texture = None
+        self.empty_vao = None
+        self.active = False
+    
+    def create_buffers(self):
+        """Crea el VAO vacío del triángulo de pantalla completa"""
+        self.empty_vao = glGenVertexArrays(1)
+        self.samples = max(1, min(self.requested_samples, int(glGetIntegerv(GL_MAX_SAMPLES))))
+    
+    def _delete_targets(self):
+        """Elimina los framebuffers de la resolución anterior"""
+        if self.msaa_fbo:
+            glDeleteFramebuffers(1, [self.msaa_fbo])
+        if self.resolve_fbo:
+            glDeleteFramebuffers(1, [self.resolve_fbo])
+        if self.color_rbo:
+            glDeleteRenderbuffers(1, [self.color_rbo])
+        if self.depth_rbo:
+            glDeleteRenderbuffers(1, [self.depth_rbo])
+        if self.resolve_texture:
+            glDeleteTextures(1, [self.resolve_texture])
+        self.msaa_fbo = self.resolve_fbo = self.color_rbo = self.depth_rbo = self.resolve_texture = None
+        self.size = (0, 0)
+    
+    def _ensure_targets(self, width, height):
+        """Crea o redimensiona los framebuffers reducidos"""
+        if self.size == (width, height) and self.msaa_fbo:
+            return True
+        
+        self._delete_targets()
+        
+        # FBO multimuestreo: mismo antialiasing que el formato del widget
+        self.msaa_fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.msaa_fbo)
+        
+        self.color_rbo = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color_rbo)
+        glRenderbufferStorageMultisample(GL_RENDERBUFFER, self.samples, GL_RGBA8, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color_rbo)
+        
+        self.depth_rbo = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth_rbo)
+        glRenderbufferStorageMultisample(GL_RENDERBUFFER, self.samples, GL_DEPTH_COMPONENT24, width, height)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth_rbo)
+        msaa_ok = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        
+        # Textura donde se resuelve el multimuestreo
+        self.resolve_texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.resolve_texture)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, None)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+        
+        self.resolve_fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.resolve_fbo)
+        glFramebufferTexture2D(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_TEXTURE_2D, self.resolve_texture, 0)
+        resolve_ok = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        
+        glBindTexture(GL_TEXTURE_2D, 0)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        
+        if not (msaa_ok and resolve_ok):
+            print("Advertencia: framebuffer de resolución dinámica incompleto, se desactiva")
+            self._delete_targets()
+            self.enabled = False
+            return False
+        
+        self.size = (width, height)
+        return True
+    
+    def get_scaled_size(self, width, height):
+        """Tamaño del framebuffer reducido para la escala actual"""
+        return max(1, int(width * self.scale)), max(1, int(height * self.scale))
+    
+    def begin(self, width, height):
+        """
+        Dirige el renderizado al framebuffer reducido.
+        Retorna False si se debe dibujar directamente a resolución completa.
+        """
+        self.active = False
+        if not self.enabled or self.empty_vao is None or self.scale >= self.MAX_SCALE:
+            return False
+        
+        scaled_width, scaled_height = self.get_scaled_size(width, height)
+        if not self._ensure_targets(scaled_width, scaled_height):
+            return False
+        
+        glBindFramebuffer(GL_FRAMEBUFFER, self.msaa_fbo)
+        glViewport(0, 0, scaled_width, scaled_height)
+        self.active = True
+        return True
+    
+    def end(self, target_fbo, width, height, shader_manager):
+        """Resuelve el framebuffer reducido y lo escala al framebuffer del widget"""
+        if not self.active:
+            return
+        
+        scaled_width, scaled_height = self.size
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.msaa_fbo)
+        glBindFramebuffer(GL_DRAW_FRAMEBUFFER, self.resolve_fbo)
+        glBlitFramebuffer(0, 0, scaled_width, scaled_height, 0, 0, scaled_width, scaled_height,
+                          GL_COLOR_BUFFER_BIT, GL_NEAREST)
+        
+        glBindFramebuffer(GL_FRAMEBUFFER, target_fbo)
+        glViewport(0, 0, width, height)
+        
+        program = shader_manager.use_program("upscale")
+        if program:
+            state = shader_manager.state
+            state.disable(GL_DEPTH_TEST)
+            state.bind_texture(0, GL_TEXTURE_2D, self.resolve_texture)
+            shader_manager.set_uniform_1i(program, "source", 0)
+            state.bind_vertex_array(self.empty_vao)
+            glDrawArrays(GL_TRIANGLES, 0, 3)
+            state.count()
+            state.bind_texture(0, GL_TEXTURE_2D, 0)
+            state.enable(GL_DEPTH_TEST)
+        
+        self.active = False
+    
+    def adapt(self, elapsed_ms, budget_ms):
+        """
+        Ajusta la escala a partir del tiempo medido del cuadro.
+        El costo de relleno es proporcional al área, es decir, a escala².
+        """
+        if not self.enabled or elapsed_ms <= 0.0:
+            return
+        target = self.scale * np.sqrt(budget_ms / elapsed_ms)
+        self.scale = float(np.clip(0.5 * self.scale + 0.5 * target, self.MIN_SCALE, self.MAX_SCALE))
+    
+    def cleanup(self):
+        """Limpia los recursos OpenGL"""
+        self._delete_targets()
+        if self.empty_vao:
+            glDeleteVertexArrays(1, [self.empty_vao])
+            self.empty_vao = None
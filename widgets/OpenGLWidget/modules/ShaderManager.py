@@ -1,31 +1,101 @@
 """
 Módulo para gestión de shaders
 """
+import numpy as np
 from OpenGL.GL import *
 from OpenGL.GL.shaders import compileProgram, compileShader
+from .GLStateCache import GLStateCache
+
+class ShaderProgram:
+    """
+    Programa enlazado con sus uniforms reflejados una sola vez.
+    
+    Guarda la ubicación de cada uniform activo y el último valor enviado, de
+    modo que fijar un uniform no consulta al driver y reenviar el mismo valor
+    no emite ninguna llamada (los valores persisten en el programa).
+    """
+    
+    def __init__(self, program_id):
+        self.id = int(program_id)
+        self.locations = {}
+        self.values = {}
+        self._reflect_uniforms()
+    
+    def _reflect_uniforms(self):
+        """Lee las ubicaciones de todos los uniforms activos"""
+        try:
+            count = int(glGetProgramiv(self.id, GL_ACTIVE_UNIFORMS))
+            for index in range(count):
+                name = glGetActiveUniform(self.id, index)[0]
+                if isinstance(name, bytes):
+                    name = name.decode()
+                # Los arreglos se reportan como "nombre[0]"
+                name = name.split('[')[0]
+                self.locations[name] = glGetUniformLocation(self.id, name)
+        except Exception as e:
+            # Sin reflexión, las ubicaciones se consultan una vez al primer uso
+            print(f"Advertencia: no se pudieron reflejar los uniforms del programa {self.id} ({e})")
+    
+    def location(self, name):
+        """Ubicación de un uniform (-1 si no está activo)"""
+        loc = self.locations.get(name)
+        if loc is None:
+            loc = glGetUniformLocation(self.id, name)
+            self.locations[name] = loc
+        return loc
+    
+    def changed(self, name, value):
+        """Registra el valor de un uniform y retorna si difiere del último enviado"""
+        value = np.asarray(value)
+        previous = self.values.get(name)
+        if previous is not None and previous.shape == value.shape and np.array_equal(previous, value):
+            return False
+        self.values[name] = value.copy()
+        return True
 
 class ShaderManager:
     """Gestiona la compilación y uso de shaders"""
     
     # Vertex Shaders
+    # Las posiciones pueden llegar cuantizadas (unorm16 en la caja del modelo):
+    # position = in_position * position_scale + position_offset. Con buffers
+    # float la escala es 1 y el desplazamiento 0. Igual para los valores.
     VERTEX_SHADER = """
     #version 330 core
     uniform mat4 mvp;
+    uniform vec4 clip_planes[6];
+    uniform vec3 position_scale;
+    uniform vec3 position_offset;
     layout(location = 0) in vec3 in_position;
+    out float gl_ClipDistance[6];
     void main() {
-        gl_Position = mvp * vec4(in_position, 1.0);
+        vec4 position = vec4(in_position * position_scale + position_offset, 1.0);
+        gl_Position = mvp * position;
+        for (int i = 0; i < 6; i++) {
+            gl_ClipDistance[i] = dot(clip_planes[i], position);
+        }
     }
     """
     
     VERTEX_SHADER_GRADIENT = """
     #version 330 core
     uniform mat4 mvp;
+    uniform vec4 clip_planes[6];
+    uniform vec3 position_scale;
+    uniform vec3 position_offset;
+    uniform float value_scale;
+    uniform float value_offset;
     layout(location = 0) in vec3 in_position;
     layout(location = 1) in float in_value;
     out float frag_value;
+    out float gl_ClipDistance[6];
     void main() {
-        gl_Position = mvp * vec4(in_position, 1.0);
-        frag_value = in_value;
+        vec4 position = vec4(in_position * position_scale + position_offset, 1.0);
+        gl_Position = mvp * position;
+        frag_value = in_value * value_scale + value_offset;
+        for (int i = 0; i < 6; i++) {
+            gl_ClipDistance[i] = dot(clip_planes[i], position);
+        }
     }
     """
     
@@ -38,6 +108,18 @@ class ShaderManager:
     uniform float line_width;
     uniform float aspect_ratio;
     
+    out float gl_ClipDistance[6];
+    
+    // Las distancias de corte se copian del extremo correspondiente
+    void copy_clip(int k) {
+        gl_ClipDistance[0] = gl_in[k].gl_ClipDistance[0];
+        gl_ClipDistance[1] = gl_in[k].gl_ClipDistance[1];
+        gl_ClipDistance[2] = gl_in[k].gl_ClipDistance[2];
+        gl_ClipDistance[3] = gl_in[k].gl_ClipDistance[3];
+        gl_ClipDistance[4] = gl_in[k].gl_ClipDistance[4];
+        gl_ClipDistance[5] = gl_in[k].gl_ClipDistance[5];
+    }
+    
     void main() {
         vec4 p0 = gl_in[0].gl_Position;
         vec4 p1 = gl_in[1].gl_Position;
@@ -54,21 +136,82 @@ class ShaderManager:
         dir /= len_dir;
         vec2 normal = normalize(vec2(-dir.y, dir.x / aspect_ratio)) * line_width * 0.002;
         
-        gl_Position = vec4((ndc0.xy - normal) * p0.w, p0.z, p0.w); EmitVertex();
-        gl_Position = vec4((ndc0.xy + normal) * p0.w, p0.z, p0.w); EmitVertex();
-        gl_Position = vec4((ndc1.xy - normal) * p1.w, p1.z, p1.w); EmitVertex();
-        gl_Position = vec4((ndc1.xy + normal) * p1.w, p1.z, p1.w); EmitVertex();
+        gl_Position = vec4((ndc0.xy - normal) * p0.w, p0.z, p0.w); copy_clip(0); EmitVertex();
+        gl_Position = vec4((ndc0.xy + normal) * p0.w, p0.z, p0.w); copy_clip(0); EmitVertex();
+        gl_Position = vec4((ndc1.xy - normal) * p1.w, p1.z, p1.w); copy_clip(1); EmitVertex();
+        gl_Position = vec4((ndc1.xy + normal) * p1.w, p1.z, p1.w); copy_clip(1); EmitVertex();
         EndPrimitive();
     }
     """
     
+    # Líneas instanciadas: un quad (triangle strip de 4 vértices) por arista.
+    # Cada instancia recibe el par de índices de la arista y lee los extremos
+    # del buffer de posiciones a través de un texture buffer (R32F, 3 texels
+    # por vértice, o RGBA16 cuantizado, 1 texel por vértice), con la misma
+    # expansión en pantalla que el geometry shader.
+    VERTEX_SHADER_LINE_INSTANCED = """
+    #version 330 core
+    uniform mat4 mvp;
+    uniform vec4 clip_planes[6];
+    uniform float line_width;
+    uniform float aspect_ratio;
+    uniform samplerBuffer positions;
+    uniform bool packed_positions;
+    uniform vec3 position_scale;
+    uniform vec3 position_offset;
+    layout(location = 0) in uvec2 in_edge;
+    out float gl_ClipDistance[6];
+    
+    vec3 fetch_position(uint index) {
+        if (packed_positions) {
+            return texelFetch(positions, int(index)).xyz * position_scale + position_offset;
+        }
+        int base = int(index) * 3;
+        return vec3(texelFetch(positions, base).r,
+                    texelFetch(positions, base + 1).r,
+                    texelFetch(positions, base + 2).r) * position_scale + position_offset;
+    }
+    
+    void main() {
+        int endpoint = gl_VertexID >> 1;
+        float side = (gl_VertexID & 1) == 0 ? -1.0 : 1.0;
+        
+        vec3 a = fetch_position(in_edge.x);
+        vec3 b = fetch_position(in_edge.y);
+        vec3 own = endpoint == 0 ? a : b;
+        for (int i = 0; i < 6; i++) {
+            gl_ClipDistance[i] = dot(clip_planes[i], vec4(own, 1.0));
+        }
+        
+        vec4 p0 = mvp * vec4(a, 1.0);
+        vec4 p1 = mvp * vec4(b, 1.0);
+        vec2 dir = vec2(0.0);
+        if (abs(p0.w) >= 1e-6 && abs(p1.w) >= 1e-6) {
+            dir = p1.xy / p1.w - p0.xy / p0.w;
+        }
+        if (length(dir) < 1e-6) {
+            // Arista degenerada: quad de área nula fuera del volumen de recorte
+            gl_Position = vec4(0.0, 0.0, 2.0, 1.0);
+            return;
+        }
+        
+        dir = normalize(dir);
+        vec2 normal = normalize(vec2(-dir.y, dir.x / aspect_ratio)) * line_width * 0.002;
+        vec4 p = endpoint == 0 ? p0 : p1;
+        gl_Position = vec4((p.xy / p.w + side * normal) * p.w, p.z, p.w);
+    }
+    """
+    
     # Fragment Shaders
     FRAGMENT_SHADER_SOLID = """
     #version 330 core
     uniform vec4 solid_color;
+    uniform vec4 clip_cap_color;
+    uniform bool clip_enabled;
     out vec4 frag_color;
     void main() {
-        frag_color = solid_color;
+        // Las caras traseras solo son visibles a través de un plano de corte
+        frag_color = (clip_enabled && !gl_FrontFacing) ? clip_cap_color : solid_color;
     }
     """
     
@@ -89,15 +232,44 @@ class ShaderManager:
     uniform sampler1D colormap;
     uniform float value_min;
     uniform float value_max;
+    uniform vec4 clip_cap_color;
+    uniform bool clip_enabled;
     
     void main() {
+        if (clip_enabled && !gl_FrontFacing) {
+            frag_color = clip_cap_color;
+            return;
+        }
         float t = clamp((frag_value - value_min) / (value_max - value_min), 0.0, 1.0);
         frag_color = texture(colormap, t);
     }
     """
     
+    # Escalado de la imagen renderizada a resolución reducida
+    VERTEX_SHADER_UPSCALE = """
+    #version 330 core
+    out vec2 uv;
+    void main() {
+        // Triángulo que cubre toda la pantalla, sin buffers de vértices
+        vec2 pos = vec2((gl_VertexID << 1) & 2, gl_VertexID & 2);
+        uv = pos;
+        gl_Position = vec4(pos * 2.0 - 1.0, 0.0, 1.0);
+    }
+    """
+    
+    FRAGMENT_SHADER_UPSCALE = """
+    #version 330 core
+    in vec2 uv;
+    out vec4 frag_color;
+    uniform sampler2D source;
+    void main() {
+        frag_color = texture(source, uv);
+    }
+    """
+    
     def __init__(self):
         self.programs = {}
+        self.state = GLStateCache()
     
     def compile_all(self):
         """Compila todos los programas de shaders"""
@@ -106,17 +278,30 @@ class ShaderManager:
             
             # Shader sólido
             fs_solid = compileShader(self.FRAGMENT_SHADER_SOLID, GL_FRAGMENT_SHADER)
-            self.programs["solid"] = compileProgram(vs, fs_solid)
+            self.programs["solid"] = ShaderProgram(compileProgram(vs, fs_solid))
             
             # Shader de líneas con geometry shader
             gs = compileShader(self.GEOMETRY_SHADER, GL_GEOMETRY_SHADER)
             fs_line = compileShader(self.FRAGMENT_SHADER_LINE, GL_FRAGMENT_SHADER)
-            self.programs["line"] = compileProgram(vs, gs, fs_line)
+            self.programs["line"] = ShaderProgram(compileProgram(vs, gs, fs_line))
             
             # Shader de gradientes
             vs_grad = compileShader(self.VERTEX_SHADER_GRADIENT, GL_VERTEX_SHADER)
             fs_grad = compileShader(self.FRAGMENT_SHADER_GRADIENT, GL_FRAGMENT_SHADER)
-            self.programs["gradient"] = compileProgram(vs_grad, fs_grad)
+            self.programs["gradient"] = ShaderProgram(compileProgram(vs_grad, fs_grad))
+            
+            # Shader de escalado para resolución dinámica
+            vs_up = compileShader(self.VERTEX_SHADER_UPSCALE, GL_VERTEX_SHADER)
+            fs_up = compileShader(self.FRAGMENT_SHADER_UPSCALE, GL_FRAGMENT_SHADER)
+            self.programs["upscale"] = ShaderProgram(compileProgram(vs_up, fs_up))
+            
+            # Líneas instanciadas: opcional, si falla se usa el geometry shader
+            try:
+                vs_inst = compileShader(self.VERTEX_SHADER_LINE_INSTANCED, GL_VERTEX_SHADER)
+                fs_inst = compileShader(self.FRAGMENT_SHADER_LINE, GL_FRAGMENT_SHADER)
+                self.programs["line_instanced"] = ShaderProgram(compileProgram(vs_inst, fs_inst))
+            except Exception as e:
+                print(f"Advertencia: shader de líneas instanciadas no disponible ({e})")
             
             print("Shaders compilados exitosamente")
             
@@ -129,33 +314,56 @@ class ShaderManager:
         return self.programs.get(name)
     
     def use_program(self, name):
-        """Activa un programa de shader"""
+        """Activa un programa de shader (sin llamada si ya está activo)"""
         program = self.programs.get(name)
         if program:
-            glUseProgram(program)
+            self.state.use_program(program.id)
             return program
         return None
     
+    def _uniform_location(self, program, name, value):
+        """Ubicación del uniform si hay que enviarlo, o -1 si no existe o no cambió"""
+        loc = program.location(name)
+        if loc == -1:
+            return -1
+        if not program.changed(name, value):
+            self.state.count(issued=0, skipped=1)
+            return -1
+        self.state.count()
+        return loc
+    
     def set_uniform_matrix4fv(self, program, name, matrix):
         """Establece un uniform de tipo mat4"""
-        loc = glGetUniformLocation(program, name)
+        loc = self._uniform_location(program, name, matrix)
         if loc != -1:
             glUniformMatrix4fv(loc, 1, GL_FALSE, matrix)
     
     def set_uniform_1f(self, program, name, value):
         """Establece un uniform de tipo float"""
-        loc = glGetUniformLocation(program, name)
+        loc = self._uniform_location(program, name, value)
         if loc != -1:
             glUniform1f(loc, value)
             
+    def set_uniform_3f(self, program, name, values):
+        """Establece un uniform de tipo vec3"""
+        loc = self._uniform_location(program, name, values)
+        if loc != -1:
+            glUniform3f(loc, *values)
+    
     def set_uniform_4f(self, program, name, values):
         """Establece un uniform de tipo vec4"""
-        loc = glGetUniformLocation(program, name)
+        loc = self._uniform_location(program, name, values)
         if loc != -1:
             glUniform4f(loc, *values)
     
+    def set_uniform_4fv(self, program, name, values):
+        """Establece un uniform de tipo arreglo de vec4"""
+        loc = self._uniform_location(program, name, values)
+        if loc != -1:
+            glUniform4fv(loc, len(values), values)
+    
     def set_uniform_1i(self, program, name, value):
         """Establece un uniform de tipo int"""
-        loc = glGetUniformLocation(program, name)
+        loc = self._uniform_location(program, name, value)
         if loc != -1:
             glUniform1i(loc, value)
\ No newline at end of file
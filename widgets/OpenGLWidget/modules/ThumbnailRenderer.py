@@ -0,0 +1,227 @@
+"""
+Módulo para renderizar miniaturas en un contexto OpenGL fuera de pantalla
+"""
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL.shaders import compileProgram, compileShader
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QSurfaceFormat, QOpenGLContext, QOffscreenSurface, QImage
+import utils.Matrix44 as Matrix44
+
+class ThumbnailRenderer:
+    """
+    Dibuja una superficie en un framebuffer pequeño y retorna la imagen.
+    
+    Usa su propio contexto y una superficie fuera de pantalla, sin compartir
+    recursos con el widget: el estado del visor no se toca y el contexto del
+    widget no necesita estar activo. Se dibuja al doble del lado pedido y se
+    reduce con filtrado suave en lugar de usar multimuestreo. El fondo es
+    transparente y el sombreado es plano con una luz en la posición del ojo.
+    """
+    
+    VERTEX_SHADER = """
+    #version 330 core
+    uniform mat4 mvp;
+    layout(location = 0) in vec3 in_position;
+    out vec3 position;
+    void main() {
+        position = in_position;
+        gl_Position = mvp * vec4(in_position, 1.0);
+    }
+    """
+    
+    FRAGMENT_SHADER = """
+    #version 330 core
+    uniform vec3 color;
+    uniform vec3 light_dir;
+    in vec3 position;
+    out vec4 frag_color;
+    void main() {
+        vec3 normal = normalize(cross(dFdx(position), dFdy(position)));
+        float diffuse = abs(dot(normal, light_dir));
+        frag_color = vec4(color * (0.25 + 0.75 * diffuse), 1.0);
+    }
+    """
+    
+    # Vista oblicua fija: rotaciones de la cámara del visor (radianes)
+    ROTATION_X = 0.45
+    ROTATION_Y = 0.75
+    FOV = 30.0
+    
+    def __init__(self, size=96, color=(0.75, 0.78, 0.82)):
+        self.size = size
+        self.color = color
+        self.context = None
+        self.surface = None
+        self.program = None
+        self.fbo = None
+        self.color_rbo = None
+        self.depth_rbo = None
+        self.vao = None
+        self.vbo = None
+        self.ebo = None
+        self.failed = False
+    
+    def initialize(self):
+        """
+        Crea el contexto, la superficie, el programa y el framebuffer (debe
+        llamarse desde el hilo de la interfaz). Retorna False si no es posible.
+        """
+        if self.context is not None:
+            return True
+        if self.failed:
+            return False
+        
+        fmt = QSurfaceFormat()
+        fmt.setVersion(3, 3)
+        fmt.setProfile(QSurfaceFormat.OpenGLContextProfile.CoreProfile)
+        fmt.setDepthBufferSize(24)
+        
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(fmt)
+        self.surface.create()
+        self.context = QOpenGLContext()
+        self.context.setFormat(fmt)
+        if not self.surface.isValid() or not self.context.create() or not self.context.makeCurrent(self.surface):
+            print("Advertencia: no se pudo crear el contexto de miniaturas")
+            self.context = None
+            self.surface = None
+            self.failed = True
+            return False
+        
+        try:
+            self.program = compileProgram(
+                compileShader(self.VERTEX_SHADER, GL_VERTEX_SHADER),
+                compileShader(self.FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+            ok = self._create_framebuffer()
+        except Exception as e:
+            print(f"Advertencia: error al preparar el renderizado de miniaturas: {e}")
+            ok = False
+        
+        if ok:
+            self.vao = glGenVertexArrays(1)
+            self.vbo = glGenBuffers(1)
+            self.ebo = glGenBuffers(1)
+            glBindVertexArray(self.vao)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glEnableVertexAttribArray(0)
+            glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 0, None)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
+            glBindVertexArray(0)
+        self.context.doneCurrent()
+        
+        if not ok:
+            self.cleanup()
+            self.failed = True
+        return ok
+    
+    def _create_framebuffer(self):
+        """Framebuffer de color y profundidad al doble del lado de la miniatura"""
+        side = self.size * 2
+        self.fbo = glGenFramebuffers(1)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        
+        self.color_rbo = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color_rbo)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, side, side)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color_rbo)
+        
+        self.depth_rbo = glGenRenderbuffers(1)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth_rbo)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, side, side)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth_rbo)
+        
+        complete = glCheckFramebufferStatus(GL_FRAMEBUFFER) == GL_FRAMEBUFFER_COMPLETE
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if not complete:
+            print("Advertencia: framebuffer de miniaturas incompleto")
+        return complete
+    
+    def _camera(self, coords):
+        """Matriz mvp que encuadra la esfera envolvente y dirección hacia el ojo"""
+        radius = max(float(np.linalg.norm(coords, axis=1).max()), 1e-6)
+        direction = np.array([
+            np.cos(self.ROTATION_Y) * np.cos(self.ROTATION_X),
+            np.sin(self.ROTATION_X),
+            np.sin(self.ROTATION_Y) * np.cos(self.ROTATION_X)
+        ])
+        distance = radius / np.sin(np.radians(self.FOV) / 2.0)
+        eye = direction * distance
+        
+        view = Matrix44.look_at(eye, np.zeros(3), np.array([0.0, 1.0, 0.0]))
+        proj = Matrix44.perspective_projection(self.FOV, 1.0, distance - radius * 1.01,
+                                               distance + radius * 1.01)
+        return (view @ proj).astype(np.float32), direction.astype(np.float32)
+    
+    def render(self, coords, triangle_indices):
+        """
+        Dibuja la superficie (coords centradas en el origen) y retorna una
+        QImage ARGB de size x size, o None si no hay contexto
+        """
+        if not self.initialize():
+            return None
+        
+        coords = np.ascontiguousarray(coords, dtype=np.float32)
+        indices = np.ascontiguousarray(triangle_indices, dtype=np.uint32).reshape(-1)
+        mvp, light_dir = self._camera(coords)
+        side = self.size * 2
+        
+        if not self.context.makeCurrent(self.surface):
+            return None
+        try:
+            glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+            glViewport(0, 0, side, side)
+            glClearColor(0.0, 0.0, 0.0, 0.0)
+            glEnable(GL_DEPTH_TEST)
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            
+            glUseProgram(self.program)
+            glUniformMatrix4fv(glGetUniformLocation(self.program, "mvp"), 1, GL_FALSE, mvp)
+            glUniform3f(glGetUniformLocation(self.program, "color"), *self.color)
+            glUniform3f(glGetUniformLocation(self.program, "light_dir"), *light_dir)
+            
+            glBindVertexArray(self.vao)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBufferData(GL_ARRAY_BUFFER, coords.nbytes, coords, GL_STREAM_DRAW)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STREAM_DRAW)
+            glDrawElements(GL_TRIANGLES, len(indices), GL_UNSIGNED_INT, None)
+            glBindVertexArray(0)
+            glUseProgram(0)
+            
+            glPixelStorei(GL_PACK_ALIGNMENT, 1)
+            data = glReadPixels(0, 0, side, side, GL_RGBA, GL_UNSIGNED_BYTE)
+            glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        finally:
+            self.context.doneCurrent()
+        
+        # OpenGL entrega las filas de abajo hacia arriba
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(side, side, 4)[::-1].copy()
+        image = QImage(pixels.data, side, side, side * 4, QImage.Format.Format_RGBA8888).copy()
+        return image.scaled(self.size, self.size, Qt.AspectRatioMode.KeepAspectRatio,
+                            Qt.TransformationMode.SmoothTransformation)
+    
+    def cleanup(self):
+        """Libera los recursos y el contexto"""
+        if self.context is None:
+            return
+        if self.context.makeCurrent(self.surface):
+            if self.program:
+                glDeleteProgram(self.program)
+            if self.fbo:
+                glDeleteFramebuffers(1, [self.fbo])
+            for rbo in (self.color_rbo, self.depth_rbo):
+                if rbo:
+                    glDeleteRenderbuffers(1, [rbo])
+            for buffer in (self.vbo, self.ebo):
+                if buffer:
+                    glDeleteBuffers(1, [buffer])
+            if self.vao:
+                glDeleteVertexArrays(1, [self.vao])
+            self.context.doneCurrent()
+        self.program = self.fbo = self.color_rbo = self.depth_rbo = None
+        self.vao = self.vbo = self.ebo = None
+        self.context = None
+        if self.surface is not None:
+            self.surface.destroy()
+        self.surface = None
@@ -3,9 +3,15 @@ Modulos de OpenGLWidget
 """
 
 from .BufferManager import BufferManager
-from .ShaderManager import ShaderManager
+from .ShaderManager import ShaderManager, ShaderProgram
+from .GLStateCache import GLStateCache
 from .ColormapManager import ColormapManager
 from .cameraController import Camera
 from .Renderer import Renderer
+from .ClipManager import ClipManager
+from .ResolutionManager import ResolutionManager
+from .InputManager import InputManager
+from .FrameProfiler import FrameProfiler
+from .ThumbnailRenderer import ThumbnailRenderer
 
-__all__ = ['BufferManager','ShaderManager','ColormapManager','Camera','Renderer']
\ No newline at end of file
+__all__ = ['BufferManager','ShaderManager','ColormapManager','Camera','Renderer','ClipManager','ResolutionManager','InputManager','FrameProfiler','ShaderProgram','GLStateCache','ThumbnailRenderer']
\ No newline at end of file
@@ -56,7 +56,9 @@ class Camera:
         self.center = self.center + move
 
     def zoom(self, amount):
-        self.distance *= 1.0 - amount * self.zoom_speed
+        # Cada paso multiplica la distancia: varios pasos fusionados en un
+        # cuadro dan el mismo resultado que aplicados uno por uno
+        self.distance *= (1.0 - self.zoom_speed) ** amount
         self.distance = np.clip(self.distance, self.radius * 0.05, self.radius * 10.0)
         
     def set_model_bounds(self, center, radius):